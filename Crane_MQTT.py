@@ -2,6 +2,10 @@ import paho.mqtt.client as mqtt
 import json
 import queue
 import uuid
+from metrics import REGISTRY
+
+MQTT_PUBLISHED = REGISTRY.counter("va_mqtt_publish_total", "MQTT publish 수")
+MQTT_RECEIVED = REGISTRY.counter("va_mqtt_received_total", "MQTT 수신 메시지 수")
 
 class MQTTClient:
     def __init__(self):
@@ -13,13 +17,27 @@ class MQTTClient:
             "10521C894128": "솔리메틱스1호기"
         }
         self.Module_list = list(self.Mac_dict.keys())
-        self.message_queue = queue.Queue() # 메시지 큐 생성
+        # 메시지 큐 생성 (가져가는 쪽이 없을 때 끝없이 쌓이지 않도록 상한, 넘치면 오래된 것부터 버림)
+        self.message_queue = queue.Queue(maxsize=1000)
+        self._listeners = []   # add_listener 로 등록한 수신 콜백 (처리하지 않은 메시지만 큐로)
+        REGISTRY.gauge("va_mqtt_queue_depth", "처리 대기 중인 MQTT 수신 메시지 수", fn=self.message_queue.qsize)
         
     def get_message(self): 
         if not self.message_queue.empty(): 
             return self.message_queue.get() 
         return None
         
+    def add_listener(self, callback):
+        """
+        수신 메시지(str)마다 callback(payload) 호출 (paho 네트워크 스레드에서, 짧게 끝나야 함).
+        callback 이 True 를 돌려주면 처리한 메시지로 보고, 어느 리스너도 처리하지 않은 메시지는
+        지금처럼 message_queue 에 넣어 get_message() 로 가져갈 수 있다.
+        """
+        self._listeners = self._listeners + [callback]
+
+    def remove_listener(self, callback):
+        self._listeners = [c for c in self._listeners if c != callback]
+
     def mqtt_connecting(self):
         return self.Mqtt_Connection
     
@@ -41,9 +59,32 @@ class MQTTClient:
         #print("subscribed: " + str(mid) + " " + str(granted_qos))
         pass    
     def on_message(self,client,userdata,msg):
-        self.message_queue.put(msg.payload.decode("utf-8"))
+        MQTT_RECEIVED.inc()
+        payload = msg.payload.decode("utf-8")
+        handled = False
+        for callback in self._listeners:
+            try:
+                handled = bool(callback(payload)) or handled
+            except Exception as e:
+                print(f"[MQTT] [ERROR] 수신 콜백 예외: {e}")
+        if not handled:
+            self._enqueue(payload)
+
+    def _enqueue(self, payload):
+        try:
+            self.message_queue.put_nowait(payload)
+        except queue.Full:
+            try:
+                self.message_queue.get_nowait()   # 가장 오래된 메시지를 버리고 다시 시도
+            except queue.Empty:
+                pass
+            try:
+                self.message_queue.put_nowait(payload)
+            except queue.Full:
+                pass
     
     def Analysis_msg(self,topics,message):
+        MQTT_PUBLISHED.inc()
         self.client.publish(topics,message, 1) #Event/T-MDS/YJSensing/
     
     def subscribe(self):
@@ -2,41 +2,96 @@ import threading
 import time
 import struct
 import json
+from collections import deque
 from datetime import datetime
 from Crane_MQTT import MQTTClient # Crane_MQTT.py 파일이 있다고 가정
 from shared_state import SharedState
 import zlib  # CRC32 계산을 위한 zlib 모듈 임포트
+from metrics import REGISTRY, LoopMonitor
 
 class Update_Can_Data:
+    """
+    MQTT 로 들어오는 하체 경사(INCLINATION_X/Y)를 shared_state 에 반영.
+
+    MQTT 수신 콜백은 경사 메시지를 쌓아 두고 워커 스레드를 깨운다. 워커는 메시지가 오거나
+    stop() 될 때만 깨어나고, 처리 중에 여러 개가 밀려 오면 축별 마지막 값만 모아 한 번에 반영한다.
+    메시지에 없는 축은 이전 값을 유지한다. 경사 값이 없는 메시지는 처리하지 않고 MQTTClient 의
+    message_queue 로 넘긴다 (get_message() 를 쓰는 다른 소비자용).
+    """
+
+    AXES = (("INCLINATION_X", "body_angle_x"), ("INCLINATION_Y", "body_angle_y"))
+    RATE_WINDOW_SEC = 5.0
+
     def __init__(self,shared_state, mqttclient, period_sec=1):
         self.body_angle_x = 0.00 # 하체 각도 x
         self.body_angle_y = 0.00 # 하체 각도 y
-        self.period_sec = period_sec
+        self.period_sec = period_sec   # 수신 이벤트 기반이라 사용하지 않음 (호출부 호환용)
         self._stop = threading.Event()
         self._th = None
 
         # MQTT 클라이언트와 같은 내부 객체는 여기서 생성합니다.
         self.mqtt = mqttclient
         self.shared_state =shared_state
-    
+
+        self._cond = threading.Condition()
+        self._pending = []                # 아직 처리하지 않은 메시지
+        self._rx_times = deque(maxlen=512)  # 수신 시각 (수신율 계산용)
+        # 수신 메시지 간격 (주기 없이 메시지 처리 시점 기준)
+        self.loop_monitor = LoopMonitor("can_data")
+        self._received = REGISTRY.counter("va_can_messages_total", "수신한 경사 메시지 수")
+        self._coalesced = REGISTRY.counter("va_can_coalesced_total", "처리 전에 새 메시지로 대체된 경사 메시지 수")
+        self._ignored = REGISTRY.counter("va_can_ignored_total", "경사 값이 없어 처리하지 않은 MQTT 메시지 수")
+        REGISTRY.gauge("va_can_message_rate", f"최근 {self.RATE_WINDOW_SEC:g}초 경사 메시지 수신율 (Hz)",
+                       fn=self.message_rate)
+
+    def _on_message(self, payload):
+        """ MQTT 네트워크 스레드에서 호출: 경사 메시지면 쌓고 워커를 깨움. 처리했으면 True """
+        if "INCLINATION_" not in payload:
+            self._ignored.inc()
+            return False
+        self._received.inc()
+        with self._cond:
+            if self._pending:
+                self._coalesced.inc()
+            self._pending.append(payload)
+            self._rx_times.append(time.monotonic())
+            self._cond.notify()
+        return True
+
+    def message_rate(self):
+        now = time.monotonic()
+        with self._cond:
+            n = sum(1 for t in self._rx_times if now - t <= self.RATE_WINDOW_SEC)
+        return n / self.RATE_WINDOW_SEC
+
     def _run(self):
+        self.mqtt.add_listener(self._on_message)
         try:
-            # 3. 주기 루프
-            while not self._stop.is_set():
-                start = time.time()
-                # 1. MQTT 메시지 수신 및 처리
-                msg = self.mqtt.get_message()
-                if msg is not None:
+            while True:
+                # 메시지가 오거나 stop() 될 때까지 대기
+                with self._cond:
+                    self._cond.wait_for(lambda: self._pending or self._stop.is_set())
+                    if self._stop.is_set():
+                        break
+                    msgs, self._pending = self._pending, []
+
+                self.loop_monitor.tick()
+                changes = {}
+                for msg in msgs:
                     try:
                         jsonObject = json.loads(msg)
-                        self.body_angle_x = jsonObject.get('INCLINATION_X', [0])[0]
-                        self.body_angle_y = jsonObject.get('INCLINATION_Y', [0])[0]
-                        self.shared_state.set_body_angle_x(self.body_angle_x)
-                        self.shared_state.set_body_angle_y(self.body_angle_y)
-                    except (TypeError, json.JSONDecodeError) as e:
+                        for key, field in self.AXES:
+                            if key in jsonObject:
+                                changes[field] = jsonObject[key][0]
+                    except (TypeError, IndexError, json.JSONDecodeError) as e:
                         print(f"Error decoding JSON: {e}")
-                        continue
+                if not changes:
+                    continue
+                self.body_angle_x = changes.get("body_angle_x", self.body_angle_x)
+                self.body_angle_y = changes.get("body_angle_y", self.body_angle_y)
+                self.shared_state.update(changes)
         finally:
+            self.mqtt.remove_listener(self._on_message)
             print("[Worker] 데이터 시뮬레이터 쓰레드 종료.")
 
     # --- start, stop, join 메소드는 modbus_worker와 동일 ---
@@ -49,7 +104,9 @@ class Update_Can_Data:
 
     def stop(self):
         self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
 
     def join(self, timeout=None):
         if self._th:
-            self._th.join(timeout)
\ No newline at end of file
+            self._th.join(timeout)
@@ -1,18 +1,34 @@
+import copy
 import cv2
+import json
 import math
+from collections import OrderedDict
 import numpy as np
 import threading
 import time
 from flask import Flask, Response, jsonify, request
-from processor import YOLORealSenseProcessor
+from frame_pipeline import PipelinedProcessor
+from perf_stats import StartupProfile
+from jpeg_cache import JpegVariantCache
+from jpeg_encoder import JpegEncoderPool, make_jpeg_backend
+from broadcast import Broadcaster
+from detection_history import DetectionHistory
+from metrics import REGISTRY, LoopMonitor, StageMetricsTimer
 
 class AnalysisApp:
-    def __init__(self, host="0.0.0.0", port=5000, shared_state=None):
+    def __init__(self, host="0.0.0.0", port=5000, shared_state=None, pipelined=False,
+                 frame_source=None, defer_vision=False, startup_profile=None,
+                 processor_options=None, jpeg_backend="auto", jpeg_workers=2,
+                 governor=None, history_capacity=200000, metrics=True,
+                 cameras=None, camera_processes=False):
         # ===== 스트림 / 레이더 기본 설정 =====
         self.STREAM_W = 640          # 스트림 가로 리사이즈(원본이 더 크면 축소)
         self.JPEG_QUALITY = 40       # JPEG 품질(50~70 추천)
         self.HFOV_DEG = 87.0         # 카메라 수평 FOV(도)
         self.DMAX_M = 20.0            # 레이더 최대 표시 거리(미터)
+        self.MAX_STREAMS = 4         # /video_feed 동시 시청자 상한 (초과 시 503)
+        self.MAX_INFO_STREAMS = 16   # /info/stream (SSE) 동시 구독 상한
+        self.RADAR_CACHE_SIZE = 8    # 레이더 배경/PNG 캐시 항목 수 (LRU)
 
         # Radar helpers 색
         self.GRID = (60, 220, 110)   # 라인 색(초록)
@@ -22,21 +38,76 @@ class AnalysisApp:
 
         # 최신 인식 결과(비디오 루프/백그라운드에서 갱신)
         self._latest_objects = []
+        self._detection_seq = 0          # 검출 결과 갱신 카운터 (레이더 캐시/ETag 기준)
+        # 검출 이력 (고정 용량 링 버퍼, /history 로 조회). history_capacity=0 이면 기록 안 함
+        self.history = DetectionHistory(history_capacity) if history_capacity else None
         self._lock = threading.Lock()
 
+        # 레이더: (w, h, hfov) 별 배경, (w, h, hfov, dmax) 별 마지막 PNG (검출 프레임 id 와 함께)
+        self._radar_lock = threading.Lock()
+        self._radar_bg_cache = OrderedDict()
+        self._radar_png_cache = OrderedDict()
+        self._radar_epoch = f"{int(time.time()):x}"   # 재시작 후 ETag 충돌 방지
+        self.radar_renders = 0
+        self.radar_hits = 0
+
+        # 단계별 시간 측정 (perf_stats.StageTimer, set_timer 로 연결)
+        # metrics=True 면 /metrics 의 단계별 히스토그램으로 기록
+        self.timer = StageMetricsTimer() if metrics else None
+
         # 백그라운드 캡처 스레드 제어
         self._stop_evt = threading.Event()
         self._bg_thread = None
+        # 마지막으로 프레임을 처리한 시각 (monotonic). 캡처 루프가 돌아도 이 시간 이상 프레임이 없으면
+        # 카메라 분리/멈춤으로 보고 is_vision_alive() 가 False (supervisor 가 재시작)
+        self.VISION_STALL_SEC = 10.0
+        self._last_frame_t = 0.0
+
+        # 기동 단계 기록 (main 과 공유 가능)
+        self.startup = startup_profile or StartupProfile()
+        self._vision_ready = threading.Event()
+        self._vision_thread = None
+        self._vision_error = None
+        self._closing = False
 
         # 프로세서 & Flask
-        self.processor = YOLORealSenseProcessor()
+        # frame_source=None 이면 RealSense 카메라, 녹화 세션(RecordedFrameSource)으로 교체 가능
+        self._frame_source = frame_source
+        # YOLORealSenseProcessor 추가 인자 (예: {"detect_interval": 3})
+        self._processor_options = dict(processor_options or {})
+        self._pipelined = pipelined
+        # 다중 카메라 (camera_worker.CameraConfig 목록): 카메라별 워커의 검출을 병합
+        # camera_processes=True 면 카메라마다 별도 프로세스에서 추론
+        self._cameras = list(cameras or [])
+        self._camera_processes = camera_processes
+        self.processor = None
+        self.frame_pipeline = None
+        # rate_governor.RateGovernor 를 넘기면 고정 TARGET_FPS 대신 처리 지연/CPU/온도로 목표 FPS 조절
+        # (프로세서 연결은 _init_vision 에서)
+        self.governor = governor
+        if not defer_vision:
+            # defer_vision=True 면 start_vision_async() 에서 백그라운드로 로드
+            self._init_vision()
         self.app = Flask(__name__)
         self._register_routes()
         
-        # 공유 프레임 버퍼
-        self._latest_jpeg = None         # bytes (인코딩된 JPEG)
+        # 공유 프레임 버퍼: 캡처 루프는 프레임만 넘기고, 인코딩은 시청자가 요청한
+        # (폭, 품질) 별로 프레임당 한 번만 수행 (구독자 0 이면 그리기/인코딩 모두 생략)
+        self.jpeg_cache = JpegVariantCache(self._encode_stream_jpeg,
+                                           default_width=self.STREAM_W,
+                                           default_quality=self.JPEG_QUALITY)
+        # JPEG 백엔드 (TurboJPEG 가 있으면 사용, 없으면 cv2) + 미리 인코딩하는 워커 풀
+        # jpeg_workers=0 이면 풀 없이 스트림 스레드에서 인코딩
+        self.jpeg_backend = make_jpeg_backend(jpeg_backend)
+        self.jpeg_pool = None
+        if jpeg_workers:
+            self.jpeg_pool = JpegEncoderPool(self.jpeg_cache, workers=jpeg_workers)
+            self.jpeg_cache.pool = self.jpeg_pool
         self._last_frame_id = 0          # 프레임 증가 카운터
-        self._new_frame_evt = threading.Event()
+        # 새 프레임 알림: 시청자마다 최신 프레임 id 만 보고, 느린 시청자는 프레임을 건너뜀
+        self.frame_broadcast = Broadcaster(max_subscribers=self.MAX_STREAMS, name="video_feed")
+        # 검출 결과 푸시 (SSE): 검출 갱신마다 한 번 직렬화한 이벤트를 모든 구독자가 공유
+        self.info_broadcast = Broadcaster(max_subscribers=self.MAX_INFO_STREAMS, name="info_stream")
         
         # 연결할 네트워크 의 정보. 
         self.host = host
@@ -52,7 +123,17 @@ class AnalysisApp:
             self.FRAME_INTERVAL = 1.0 / self.TARGET_FPS
         else:
             self.FRAME_INTERVAL = 0
+        self.supervisor = None   # main 의 Supervisor (있으면 /pipeline_stats 에 유닛 상태 표시)
+        self.scheduler = None    # 주기 워커 스케줄러 (있으면 /pipeline_stats 에 작업별 지터/overrun 표시)
+        # 다른 프로세스의 유닛/스케줄러 상태를 돌려주는 함수 (MULTIPROCESS 텔레메트리, 없거나 오래되면 None)
+        self.remote_stats = None
             
+        # /metrics 계측 (캡처 루프 주기, 스트림 전송량, 큐 길이 등)
+        self.capture_monitor = LoopMonitor("capture", self.FRAME_INTERVAL)
+        self._jpeg_bytes = REGISTRY.counter("va_jpeg_bytes_served_total", "/video_feed 로 보낸 JPEG 바이트")
+        self._jpeg_frames = REGISTRY.counter("va_jpeg_frames_served_total", "/video_feed 로 보낸 프레임 수")
+        self._register_gauges()
+
         # 종료 엔드포인트를 앱에 추가합니다.
         @self.app.route('/shutdown', methods=['POST'])
         def shutdown():
@@ -69,18 +150,189 @@ class AnalysisApp:
         with self._lock:
             return list(self._latest_objects)
 
+    def set_timer(self, timer):
+        """ 처리 단계 + JPEG 인코딩 시간 기록기 연결 (벤치마크/모니터링) """
+        self.timer = timer
+        if self.processor is not None:
+            self.processor.set_timer(timer)
+
+    def _register_gauges(self):
+        reg = REGISTRY
+        reg.gauge("va_stream_clients", "/video_feed 시청자 수", fn=self.frame_broadcast.subscriber_count)
+        reg.gauge("va_info_stream_clients", "/info/stream 구독자 수", fn=self.info_broadcast.subscriber_count)
+        reg.gauge("va_vision_ready", "비전 스택 준비 여부", fn=lambda: int(self.is_vision_ready()))
+        reg.gauge("va_detections", "최근 프레임의 검출 수", fn=lambda: len(self._latest_objects))
+        if self.jpeg_pool is not None:
+            reg.gauge("va_queue_depth", "큐 길이", {"queue": "jpeg_encode"}, fn=self.jpeg_pool.backlog)
+        if self.history is not None:
+            reg.gauge("va_history_records", "검출 이력 레코드 수", fn=lambda: len(self.history))
+        if self.governor is not None:
+            reg.gauge("va_target_fps", "캡처 루프 목표 FPS", fn=lambda: self.governor.target_fps)
+
+        # 파이프라인 큐는 비전 기동 후에 생기므로 수집 시점에 조회
+        def queue_depth(name):
+            def fn():
+                if self.frame_pipeline is None:
+                    return None
+                return self.frame_pipeline.stats()["queues"].get(name, {}).get("depth")
+            return fn
+        for name in ("acquire->infer", "infer->post", "post->out"):
+            reg.gauge("va_queue_depth", "큐 길이", {"queue": name}, fn=queue_depth(name))
+
+    def has_stream_clients(self):
+        return self.jpeg_cache.subscriber_count() > 0
+
+    def is_vision_ready(self):
+        return self._vision_ready.is_set()
+
+    def get_startup_report(self):
+        return {
+            "vision_ready": self.is_vision_ready(),
+            "vision_error": self._vision_error,
+            "last_frame_age_sec": round(self.last_frame_age(), 2) if self._last_frame_t else None,
+            "phases": self.startup.report(),
+        }
+
+    def start_vision_async(self, warmup=2, start_capture=True):
+        """
+        비전 스택(torch/ultralytics import, 모델 로드, 카메라, 워밍업 추론)을 백그라운드에서 기동.
+        그동안 텔레메트리 워커와 HTTP 서버는 먼저 동작한다.
+        """
+        if self._vision_thread and self._vision_thread.is_alive():
+            return
+        if self.processor is not None:
+            if start_capture:
+                self.start_background_capture()
+            return
+
+        self._closing = False
+        self._vision_error = None
+
+        def _boot():
+            try:
+                self._init_vision(warmup=warmup)
+                if start_capture and not self._closing:
+                    self.start_background_capture()
+            except Exception as e:
+                self._vision_error = str(e)
+                print(f"[Vision] [ERROR] 비전 기동 실패: {e}")
+
+        self._vision_thread = threading.Thread(target=_boot, name="vision-boot", daemon=True)
+        self._vision_thread.start()
+
+    def last_frame_age(self):
+        """ 마지막으로 프레임을 처리한 뒤 지난 시간 (초) """
+        return time.monotonic() - self._last_frame_t
+
+    def is_vision_alive(self):
+        """
+        비전 기동 중이거나 캡처 루프가 프레임을 계속 처리하고 있으면 True.
+        기동 실패, 캡처 루프 종료, VISION_STALL_SEC 이상 프레임이 없을 때(카메라 분리/멈춤) False.
+        """
+        if self._vision_thread is not None and self._vision_thread.is_alive():
+            return True
+        if self._bg_thread is None or not self._bg_thread.is_alive():
+            return False
+        return self.last_frame_age() < self.VISION_STALL_SEC
+
+    def wait_vision_ready(self, timeout=None):
+        return self._vision_ready.wait(timeout)
+
+    def _init_vision(self, warmup=0):
+        if self._cameras:
+            self._init_cameras()
+            return
+        with self.startup.phase("vision_import"):
+            from processor import YOLORealSenseProcessor
+            import torch        # noqa: F401 (import 시간 측정)
+            import ultralytics  # noqa: F401
+        with self.startup.phase("vision_init"):
+            processor = YOLORealSenseProcessor(frame_source=self._frame_source,
+                                               **self._processor_options)
+        if warmup:
+            with self.startup.phase("vision_warmup"):
+                processor.warmup(warmup)
+        if self.timer is not None:
+            processor.set_timer(self.timer)
+
+        self.processor = processor
+        if self.governor is not None:
+            self.governor.attach(processor)
+        # 파이프라인 모드: 취득/추론/후처리를 별도 스레드로 분리
+        if self._pipelined:
+            self.frame_pipeline = PipelinedProcessor(processor)
+        self._vision_ready.set()
+        self.startup.mark("vision_ready")
+
+    def _init_cameras(self):
+        from camera_worker import MultiCameraProcessor
+        cameras = []
+        for cfg in self._cameras:
+            # 공통 processor_options 위에 카메라별 옵션. 호출자의 CameraConfig 는 건드리지 않고,
+            # MotionGate 처럼 상태를 가진 옵션은 카메라마다 따로 갖도록 깊은 복사
+            cam = copy.copy(cfg)
+            cam.processor_options = copy.deepcopy({**self._processor_options, **cfg.processor_options})
+            cameras.append(cam)
+        with self.startup.phase("vision_init"):
+            processor = MultiCameraProcessor(cameras, processes=self._camera_processes)
+            processor.start()
+        if self.timer is not None:
+            processor.set_timer(self.timer)
+        for w in processor.workers:
+            REGISTRY.gauge("va_camera_fps", "카메라별 처리 FPS", {"camera": w.name}, fn=w.fps)
+        # 카메라별 워커가 각자 처리하므로 파이프라인/imgsz 조절은 사용하지 않음
+        self.processor = processor
+        self._vision_ready.set()
+        self.startup.mark("vision_ready")
+
+    def get_pipeline_stats(self):
+        """ 검출/추적 비율 + 파이프라인 모드의 단계별/큐별 카운터 (비전 준비 전이면 None) """
+        if self.processor is None:
+            return None
+        if self._cameras:
+            return {"cameras": self.processor.camera_stats()}
+        stats = {"detection": self.processor.detection_stats()}
+        if self.frame_pipeline is not None:
+            stats.update(self.frame_pipeline.stats())
+        return stats
+
     def start_background_capture(self):
         """ /video_feed 연결 없이도 latest를 계속 갱신 """
         if self._bg_thread and self._bg_thread.is_alive():
             return
+        if self.processor is None:
+            # 비전 스택이 아직 로드 중이면 준비되는 대로 start_vision_async 가 시작
+            self.start_vision_async()
+            return
+        # 재시작이면 stop_background_capture 에서 닫은 카메라를 다시 연다 (실패하면 예외 -> supervisor 재시도)
+        if self.frame_pipeline is not None:
+            self.frame_pipeline.start()
+        else:
+            self.processor.start()
         self._stop_evt.clear()
+        self.frame_broadcast.reopen()
+        self.info_broadcast.reopen()
+        if self.jpeg_pool is not None:
+            self.jpeg_pool.start()
+        self._last_frame_t = time.monotonic()   # 첫 프레임까지의 대기도 VISION_STALL_SEC 안에
         self._bg_thread = threading.Thread(target=self._capture_loop, daemon=True)
         self._bg_thread.start()
 
     def stop_background_capture(self):
+        self._closing = True
         self._stop_evt.set()
+        # 대기 중인 /video_feed 스트림 종료
+        self.frame_broadcast.close()
+        self.info_broadcast.close()
         if self._bg_thread:
             self._bg_thread.join(timeout=1.0)
+        # 카메라도 닫음 (다시 시작하면 start_background_capture 에서 다시 연다)
+        if self.frame_pipeline is not None:
+            self.frame_pipeline.close()
+        elif self.processor is not None:
+            self.processor.stop()
+        if self.jpeg_pool is not None:
+            self.jpeg_pool.stop()
 
     def run_server(self, host="0.0.0.0", port=5000, debug=False, threaded=True):
         print(f"➡ 접속: http://{host}:{port}/")
@@ -90,7 +342,7 @@ class AnalysisApp:
         """라즈베리파이 아닌 PC에서 로컬 미리보기"""
         try:
             while True:
-                frame, _ = self.processor.get_frame(return_depth_vis=False)
+                frame, _ = self.processor.get_frame(return_depth_vis=False, annotate=True)
                 if frame is None:
                     continue
                 cv2.imshow("Local Preview", frame)
@@ -107,63 +359,151 @@ class AnalysisApp:
         while not self._stop_evt.is_set():
             # 1. 루프 시작 시간 기록
             start_time = time.time()
-            
-            frame, detections = self.processor.get_frame(return_depth_vis=False)
-            if frame is None:
+            self.capture_monitor.tick()
+
+            if not self._capture_once():
                 time.sleep(0.005)
                 continue
 
-            if isinstance(detections, list):
-                with self._lock:
-                    self._latest_objects = detections
-                distance = 99.00
-                count = 0
-                for o in detections:
-                    if not isinstance(o, dict):
-                        continue
-                    
-                    d = o.get("distance")
-                                     
-                    # 유효한 숫자인지 확인 후 포맷팅 (거리 소수점 2자리, 센터 3자리)
-                    if isinstance(d, (int, float)):
-                        val = float(d)
-                        count += 1
-                        if val < distance:
-                            distance = round(val, 2)
-
-                # 3. 메서드 호출하여 딕셔너리 통째로 넘기기
-                self.shared_state.set_obj_info(count, distance)
-                
-            # 스트리밍용 JPEG 프레임을 미리 만들어 공유 버퍼에 저장
-            h, w = frame.shape[:2]
-            if w > self.STREAM_W:
-                new_h = int(h * (self.STREAM_W / w))
-                frame_resized = cv2.resize(frame, (self.STREAM_W, new_h), interpolation=cv2.INTER_AREA)
-            else:
-                frame_resized = frame
-
-            ok, jpeg = cv2.imencode('.jpg', frame_resized,
-                                    [int(cv2.IMWRITE_JPEG_QUALITY), self.JPEG_QUALITY])
-            if ok:
-                with self._lock:
-                    self._latest_jpeg = jpeg.tobytes()
-                    self._last_frame_id += 1
-                self._new_frame_evt.set()   # 새 프레임 신호
-                self._new_frame_evt.clear()
-
             # [수정] 프레임 제한 로직 적용
             # 처리하는 데 걸린 시간 계산
             elapsed_time = time.time() - start_time
             
+            frame_interval = self.FRAME_INTERVAL
+            if self.governor is not None:
+                # 카메라 대기 시간은 빼고 처리 시간만 (카메라 FPS 를 낮췄을 때 상한이 같이 내려가지 않도록)
+                if self.frame_pipeline is not None:
+                    self.governor.observe(self.frame_pipeline.processing_latency())
+                else:
+                    self.governor.observe(self.processor.last_process_sec)
+                self.governor.update()
+                frame_interval = self.governor.frame_interval()
+                self.capture_monitor.period_sec = frame_interval
+            if self.frame_pipeline is not None:
+                # 파이프라인 모드는 취득/추론 스레드가 따로 돌므로 추론 단계에도 목표 간격을 적용
+                self.frame_pipeline.min_interval_sec = frame_interval
+
             # 목표 시간보다 빨리 처리했다면 남은 시간만큼 대기
-            if self.FRAME_INTERVAL > 0:
-                wait_time = self.FRAME_INTERVAL - elapsed_time
+            if frame_interval > 0:
+                wait_time = frame_interval - elapsed_time
                 if wait_time > 0:
                     time.sleep(wait_time)
             else:
                 # FPS 제한이 없으면 최소한의 대기만 수행
                 time.sleep(0.001)
 
+    def _capture_once(self):
+        """ 프레임 1장 처리: 인식 -> 결과 공유 -> 스트림 JPEG 갱신. 프레임이 없으면 False """
+        source = self.frame_pipeline or self.processor
+        # 시청자가 없으면 박스 그리기와 JPEG 인코딩을 모두 생략 (검출만 수행)
+        streaming = self.has_stream_clients()
+        frame, detections = source.get_frame(return_depth_vis=False, annotate=streaming)
+        if frame is None:
+            return False
+        self._last_frame_t = time.monotonic()
+
+        if isinstance(detections, list):
+            self._publish_detections(detections)
+
+        if not streaming:
+            # 다음 시청자에게 오래된 프레임을 주지 않도록
+            self.jpeg_cache.clear()
+            return True
+
+        # 스트리밍용 프레임 공유 (JPEG 인코딩은 시청자 variant 별로 jpeg_cache 에서)
+        with self._lock:
+            self._last_frame_id += 1
+            frame_id = self._last_frame_id
+        self.jpeg_cache.publish(frame, frame_id)
+        self.frame_broadcast.publish(seq=frame_id)   # 새 프레임 신호 (대기 중인 시청자 깨움)
+        return True
+
+    def _publish_detections(self, detections):
+        with self._lock:
+            self._latest_objects = detections
+            self._detection_seq += 1
+            seq = self._detection_seq
+        if self.history is not None:
+            self.history.append(detections, seq)
+        # SSE 구독자가 있을 때만 직렬화 (프레임당 한 번)
+        if self.info_broadcast.subscriber_count() > 0:
+            self.info_broadcast.publish(self._info_event(seq, detections), seq=seq)
+        distance = 99.00
+        count = 0
+        for o in detections:
+            if not isinstance(o, dict):
+                continue
+
+            d = o.get("distance")
+
+            # 유효한 숫자인지 확인 후 포맷팅 (거리 소수점 2자리, 센터 3자리)
+            if isinstance(d, (int, float)):
+                val = float(d)
+                count += 1
+                if val < distance:
+                    distance = round(val, 2)
+
+        # 3. 메서드 호출하여 딕셔너리 통째로 넘기기
+        if self.shared_state is not None:
+            self.shared_state.set_obj_info(count, distance)
+
+    @staticmethod
+    def _info_objects(objects):
+        """ /info 응답용 객체 목록 (label, distance, est_distance, bbox, center 만) """
+        objs = []
+        for o in objects:
+            if not isinstance(o, dict):
+                continue
+
+            dist = o.get("distance")         # depth
+            est  = o.get("est_distance")     # bbox estimate
+            bw   = o.get("bbox_w")
+            bh   = o.get("bbox_h")
+            center = o.get("center")
+            label  = o.get("label", "obj")
+
+            # center는 숫자만 통과
+            if not isinstance(center, (int, float)):
+                continue
+
+            objs.append({
+                "label": label,
+                "distance": dist,                 # None 가능
+                "est_distance": est,              # 항상 숫자여야 함(위에서 round로 넣음)
+                "bbox_w": bw,
+                "bbox_h": bh,
+                "center": round(float(center), 3)
+            })
+            if "camera" in o:
+                # 다중 카메라: 어느 카메라의 검출인지 + 크레인 기준 방위각
+                objs[-1]["camera"] = o["camera"]
+                objs[-1]["bearing_deg"] = o.get("bearing_deg")
+        return objs
+
+    def _info_event(self, seq, objects):
+        """ 검출 결과 1건을 SSE 이벤트 bytes 로 직렬화 """
+        objs = self._info_objects(objects)
+        data = json.dumps({"frame_id": seq, "ts": round(time.time(), 3),
+                           "count": len(objs), "objects": objs}, separators=(",", ":"))
+        return f"id: {seq}\ndata: {data}\n\n".encode("utf-8")
+
+    def _encode_stream_jpeg(self, frame, width=None, quality=None):
+        """ 스트림 폭(기본 STREAM_W)으로 축소 후 JPEG 인코딩. 실패 시 None """
+        width = self.STREAM_W if width is None else width
+        quality = self.JPEG_QUALITY if quality is None else quality
+        t0 = time.perf_counter()
+        h, w = frame.shape[:2]
+        if w > width:
+            new_h = int(h * (width / w))
+            frame_resized = cv2.resize(frame, (width, new_h), interpolation=cv2.INTER_AREA)
+        else:
+            frame_resized = frame
+
+        jpeg = self.jpeg_backend.encode(frame_resized, quality)
+        if self.timer is not None:
+            self.timer.record("jpeg_encode", time.perf_counter() - t0)
+        return jpeg
+
     # -------------------------------
     # 레이더 도우미
     # -------------------------------
@@ -226,6 +566,132 @@ class AnalysisApp:
 
         return img, origin, R
 
+    def make_radar_bg_multi(self, width=720, height=420, margin=26):
+        """ 다중 카메라용 전방위 레이더 (크레인 중심, 위쪽이 정면, 카메라별 시야각 표시) """
+        img = np.full((height, width, 3), self.BG, np.uint8)
+        cx, cy = width // 2, height // 2
+        origin = (cx, cy)
+        R = max(min(width, height) // 2 - margin, 60)
+
+        for r in (int(R * 0.30), int(R * 0.55), int(R * 0.80), R):
+            cv2.circle(img, origin, r, self.GRID, 2, cv2.LINE_AA)
+
+        for cam in self._cameras:
+            for b in (cam.yaw_deg - cam.hfov_deg / 2.0, cam.yaw_deg + cam.hfov_deg / 2.0):
+                a = math.radians(b)
+                x = int(cx + R * math.sin(a))
+                y = int(cy - R * math.cos(a))
+                cv2.line(img, origin, (x, y), self.EDGE, 2, cv2.LINE_AA)
+            a = math.radians(cam.yaw_deg)
+            org = (int(cx + (R + 4) * math.sin(a)) - 10, int(cy - (R + 4) * math.cos(a)))
+            cv2.putText(img, cam.name, org, cv2.FONT_HERSHEY_SIMPLEX, 0.5, self.GRID, 1, cv2.LINE_AA)
+
+        # 크레인(중심) 표시
+        cv2.rectangle(img, (cx - 10, cy - 10), (cx + 10, cy + 10), self.GRID, 2, cv2.LINE_AA)
+        return img, origin, R
+
+    def pol2pix_from_bearing(self, bearing_deg, dist_m, origin, R, dmax=None):
+        if dmax is None:
+            dmax = self.DMAX_M
+        cx, cy = origin
+        a = math.radians(float(bearing_deg))
+        r = int(max(0.0, min(1.0, float(dist_m) / max(dmax, 1e-6))) * R)
+        return int(cx + r * math.sin(a)), int(cy - r * math.cos(a))
+
+    def get_radar_bg(self, width=720, height=420, hfov_deg=None):
+        """ make_radar_bg 결과를 (w, h, hfov) 별로 캐시 (LRU). 반환 이미지는 읽기 전용으로 사용 """
+        if hfov_deg is None:
+            hfov_deg = self.HFOV_DEG
+        key = (int(width), int(height), float(hfov_deg))
+        with self._radar_lock:
+            hit = self._radar_bg_cache.get(key)
+            if hit is not None:
+                self._radar_bg_cache.move_to_end(key)
+                return hit
+        if self._cameras:
+            bg = self.make_radar_bg_multi(width=key[0], height=key[1])
+        else:
+            bg = self.make_radar_bg(width=key[0], height=key[1], hfov_deg=key[2])
+        bg[0].setflags(write=False)
+        with self._radar_lock:
+            self._radar_bg_cache[key] = bg
+            while len(self._radar_bg_cache) > self.RADAR_CACHE_SIZE:
+                self._radar_bg_cache.popitem(last=False)
+        return bg
+
+    def draw_radar_objects(self, img, objects, origin, R, hfov_deg=None, dmax=None):
+        for o in objects:
+            if not isinstance(o, dict):
+                continue
+            dist = o.get('distance')
+            center = o.get('center')
+            if not isinstance(dist, (int, float)) or not isinstance(center, (int, float)):
+                continue
+
+            bearing = o.get('bearing_deg')
+            if self._cameras and isinstance(bearing, (int, float)):
+                # 다중 카메라: 카메라 yaw 가 반영된 방위각으로 표시
+                px, py = self.pol2pix_from_bearing(bearing, dist, origin, R, dmax=dmax)
+            else:
+                px, py = self.pol2pix_from_center(center, dist, origin, R, hfov_deg=hfov_deg, dmax=dmax)
+
+            # === 점 더 크고 진하게 ===
+            radius = 14
+            # 빨간 실체
+            cv2.circle(img, (px, py), radius, (0, 0, 255), -1, cv2.LINE_AA)
+            # 검은 외곽선
+            cv2.circle(img, (px, py), radius + 2, (0, 0, 0), 2, cv2.LINE_AA)
+
+            # === 거리 텍스트 더 크게 + 아웃라인 처리 ===
+            label = f"{dist:.2f}m"
+            org = (px + 14, py - 10)
+            font = cv2.FONT_HERSHEY_SIMPLEX
+            font_scale = 1.2
+            thickness = 2
+
+            # 검은 외곽선
+            cv2.putText(img, label, org, font, font_scale, (0, 0, 0), thickness + 2, cv2.LINE_AA)
+            # 흰 본문
+            cv2.putText(img, label, org, font, font_scale, (255, 255, 255), thickness, cv2.LINE_AA)
+        return img
+
+    def render_radar_png(self, width=720, height=420, hfov_deg=None, dmax=None):
+        """
+        레이더 PNG 를 (etag, bytes) 로 반환. 같은 검출 프레임 + 같은 파라미터면 캐시된 결과 재사용
+        (시청자가 N 명이어도 검출 프레임당 한 번만 렌더링/인코딩). 실패 시 (None, None)
+        """
+        hfov_deg = self.HFOV_DEG if hfov_deg is None else float(hfov_deg)
+        dmax = self.DMAX_M if dmax is None else float(dmax)
+        key = (int(width), int(height), hfov_deg, dmax)
+        with self._lock:
+            seq = self._detection_seq
+            lo = list(self._latest_objects)
+
+        with self._radar_lock:
+            hit = self._radar_png_cache.get(key)
+            if hit is not None and hit[0] == seq:
+                self._radar_png_cache.move_to_end(key)
+                self.radar_hits += 1
+                return hit[1], hit[2]
+
+        bg, origin, R = self.get_radar_bg(width=key[0], height=key[1], hfov_deg=hfov_deg)
+        img = self.draw_radar_objects(bg.copy(), lo, origin, R, hfov_deg=hfov_deg, dmax=dmax)
+        ok, buf = cv2.imencode('.png', img)
+        if not ok:
+            return None, None
+        etag = f"r{self._radar_epoch}-{seq}-{key[0]}x{key[1]}-{hfov_deg:g}-{dmax:g}"
+        png = buf.tobytes()
+
+        with self._radar_lock:
+            self.radar_renders += 1
+            cur = self._radar_png_cache.get(key)
+            if cur is None or cur[0] <= seq:
+                self._radar_png_cache[key] = (seq, etag, png)
+                self._radar_png_cache.move_to_end(key)
+            while len(self._radar_png_cache) > self.RADAR_CACHE_SIZE:
+                self._radar_png_cache.popitem(last=False)
+        return etag, png
+
     def pol2pix_from_center(self, center_norm, dist_m, origin, R, hfov_deg=None, dmax=None):
         if hfov_deg is None:
             hfov_deg = self.HFOV_DEG
@@ -248,59 +714,136 @@ class AnalysisApp:
 
         @app.route('/video_feed')
         def video_feed():
+            # ?w=320&q=30 처럼 폭/품질 지정 가능 (같은 조합의 시청자는 인코딩 결과를 공유)
+            variant = self.jpeg_cache.variant(request.args.get('w', type=int),
+                                              request.args.get('q', type=int))
+
+            sub = self.frame_broadcast.subscribe()
+            if sub is None:
+                # 동시 스트림 상한 초과 (또는 종료 중)
+                resp = Response("too many streams", status=503, mimetype='text/plain')
+                resp.headers['Retry-After'] = '5'
+                return resp
+
             def gen():
-                last_id = -1
-                while True:
-                    # 새 프레임이 올 때까지 잠깐 대기 (최대 100fps 수준)
-                    self._new_frame_evt.wait(timeout=0.05)
-                    with self._lock:
-                        cur_id = self._last_frame_id
-                        jpeg = self._latest_jpeg
-                    if jpeg is None or cur_id == last_id:
-                        # 아직 새 프레임 없음
-                        time.sleep(0.01)
+                self.jpeg_cache.subscribe(variant)
+                try:
+                    yield from stream()
+                finally:
+                    # 클라이언트 연결 종료 시 (GeneratorExit) 구독 해제
+                    self.jpeg_cache.unsubscribe(variant)
+                    sub.close()
+
+            def stream():
+                while not sub.closed:
+                    # 새 프레임까지 대기 (놓친 프레임은 건너뛰고 최신 프레임만)
+                    frame_id, _ = sub.next(timeout=1.0)
+                    if frame_id is None:
+                        continue
+                    _, jpeg = self.jpeg_cache.get(variant)
+                    if jpeg is None:
                         continue
-                    last_id = cur_id
 
+                    self._jpeg_bytes.inc(len(jpeg))
+                    self._jpeg_frames.inc()
                     yield (b'--frame\r\n'
                         b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
             resp = Response(gen(), mimetype='multipart/x-mixed-replace; boundary=frame')
+            # 제너레이터가 한 번도 시작되지 않고 닫혀도 슬롯 반환
+            resp.call_on_close(sub.close)
             resp.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
             resp.headers['Pragma'] = 'no-cache'
             resp.headers['Expires'] = '0'
             return resp
 
+        @app.route('/startup')
+        def startup():
+            return jsonify(self.get_startup_report())
+
+        @app.route('/pipeline_stats')
+        def pipeline_stats():
+            stats = dict(self.get_pipeline_stats() or {})
+            stats["jpeg_cache"] = self.jpeg_cache.stats()
+            stats["jpeg_encoder"] = {"backend": self.jpeg_backend.name}
+            if self.jpeg_pool is not None:
+                stats["jpeg_encoder"].update(self.jpeg_pool.stats())
+            stats["video_feed"] = self.frame_broadcast.stats()
+            if self.governor is not None:
+                stats["governor"] = self.governor.stats()
+            stats["radar"] = {"renders": self.radar_renders, "hits": self.radar_hits}
+            if self.supervisor is not None:
+                stats["units"] = self.supervisor.stats()
+            if self.scheduler is not None:
+                stats["scheduler"] = self.scheduler.stats()
+            if self.remote_stats is not None:
+                remote = self.remote_stats() or {}
+                stats["telemetry_process"] = {"units": remote.get("units"),
+                                              "scheduler": remote.get("scheduler")}
+            return jsonify(stats)
+
         @app.route('/info')
         def info():
             # distance, center만 간결히 반환
             with self._lock:
                 lo = list(self._latest_objects)
-            objs = []
-            for o in lo:
-                if not isinstance(o, dict):
-                    continue
+            objs = self._info_objects(lo)
+            return jsonify({"count": len(objs), "objects": objs})
 
-                dist = o.get("distance")         # depth
-                est  = o.get("est_distance")     # bbox estimate
-                bw   = o.get("bbox_w")
-                bh   = o.get("bbox_h")
-                center = o.get("center")
-                label  = o.get("label", "obj")
+        @app.route('/metrics')
+        def metrics():
+            # Prometheus 텍스트 형식
+            return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
-                # center는 숫자만 통과
-                if not isinstance(center, (int, float)):
-                    continue
+        @app.route('/history')
+        def history():
+            # ?last=300 (최근 N초) 또는 ?since=&until= (unix time), ?records=100 이면 최근 레코드 포함
+            if self.history is None:
+                return jsonify({"error": "history disabled"}), 404
+            since = request.args.get('since', type=float)
+            until = request.args.get('until', type=float)
+            last = request.args.get('last', type=float)
+            if last is not None:
+                since = time.time() - last
+            out = self.history.summary(since, until)
+            n_rec = request.args.get('records', default=0, type=int)
+            if n_rec > 0:
+                recs = self.history.query(since, until)
+                out["records"] = self.history.to_dicts(recs[-min(n_rec, 5000):])
+            out["buffer"] = self.history.stats()
+            return jsonify(out)
 
-                objs.append({
-                    "label": label,
-                    "distance": dist,                 # None 가능
-                    "est_distance": est,              # 항상 숫자여야 함(위에서 round로 넣음)
-                    "bbox_w": bw,
-                    "bbox_h": bh,
-                    "center": round(float(center), 3)
-                })
+        @app.route('/info/stream')
+        def info_stream():
+            # 검출 결과가 갱신될 때마다 푸시 (Server-Sent Events)
+            sub = self.info_broadcast.subscribe()
+            if sub is None:
+                resp = Response("too many streams", status=503, mimetype='text/plain')
+                resp.headers['Retry-After'] = '5'
+                return resp
 
-            return jsonify({"count": len(objs), "objects": objs})
+            def gen():
+                try:
+                    # 접속 직후 현재 상태 한 번
+                    with self._lock:
+                        seq = self._detection_seq
+                        lo = list(self._latest_objects)
+                    sub.last_seq = seq
+                    yield b"retry: 2000\n" + self._info_event(seq, lo)
+                    while not sub.closed:
+                        seq, event = sub.next(timeout=15.0)
+                        if seq is None:
+                            # 연결 유지 + 끊긴 클라이언트 감지용 주석 라인
+                            yield b": keepalive\n\n"
+                            continue
+                        yield event
+                finally:
+                    sub.close()
+
+            resp = Response(gen(), mimetype='text/event-stream')
+            resp.call_on_close(sub.close)
+            resp.headers['Cache-Control'] = 'no-cache'
+            resp.headers['X-Accel-Buffering'] = 'no'
+            return resp
 
         @app.route('/radar.png')
         def radar_png():
@@ -310,49 +853,16 @@ class AnalysisApp:
             hfov = float(request.args.get('hfov', self.HFOV_DEG))
             dmax = float(request.args.get('dmax', self.DMAX_M))
 
-            # 레이더 배경 생성
-            img, origin, R = self.make_radar_bg(width=width, height=height, hfov_deg=hfov)
-
-            # 최신 객체들 표시
-            with self._lock:
-                lo = list(self._latest_objects)
-            for o in lo:
-                if not isinstance(o, dict):
-                    continue
-                dist = o.get('distance')
-                center = o.get('center')
-                if not isinstance(dist, (int, float)) or not isinstance(center, (int, float)):
-                    continue
-
-                px, py = self.pol2pix_from_center(center, dist, origin, R, hfov_deg=hfov, dmax=dmax)
-
-                # === 점 더 크고 진하게 ===
-                radius = 14
-                # 빨간 실체
-                cv2.circle(img, (px, py), radius, (0, 0, 255), -1, cv2.LINE_AA)
-                # 검은 외곽선
-                cv2.circle(img, (px, py), radius + 2, (0, 0, 0), 2, cv2.LINE_AA)
-
-                # === 거리 텍스트 더 크게 + 아웃라인 처리 ===
-                label = f"{dist:.2f}m"
-                org = (px + 14, py - 10)
-                font = cv2.FONT_HERSHEY_SIMPLEX
-                font_scale = 1.2
-                thickness = 2
-
-                # 검은 외곽선
-                cv2.putText(img, label, org, font, font_scale, (0, 0, 0), thickness + 2, cv2.LINE_AA)
-                # 흰 본문
-                cv2.putText(img, label, org, font, font_scale, (255, 255, 255), thickness, cv2.LINE_AA)
-
-
-            ok, buf = cv2.imencode('.png', img)
-            if not ok:
+            etag, png = self.render_radar_png(width, height, hfov, dmax)
+            if png is None:
                 return Response(status=500)
-            resp = Response(buf.tobytes(), mimetype='image/png')
-            resp.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-            resp.headers['Pragma'] = 'no-cache'
-            resp.headers['Expires'] = '0'
+            # 같은 검출 프레임이면 다시 받을 필요 없음
+            if etag in request.if_none_match:
+                resp = Response(status=304)
+            else:
+                resp = Response(png, mimetype='image/png')
+            resp.set_etag(etag)
+            resp.headers['Cache-Control'] = 'no-cache'
             return resp
 
         @app.route('/')
@@ -400,14 +910,11 @@ class AnalysisApp:
                 <div class="card" style="margin-top:12px">
                   <div class="title">실시간 인식 정보</div>
                   <pre id="info">초기화 중…</pre>
-                  <div class="muted">0.5초 간격으로 갱신됩니다.</div>
+                  <div class="muted" id="info-mode">검출될 때마다 갱신됩니다.</div>
                 </div>
               </div>
               <script>
-                async function tick(){
-                  try{
-                    const r = await fetch('/info', {cache:'no-store'});
-                    const d = await r.json();
+                function render(d){
                     let lines = [];
                     lines.push(`[인지된 사람 수 : ${d.count}명]`);
                     (d.objects || []).forEach((o,i)=>{
@@ -429,17 +936,51 @@ class AnalysisApp:
                         ? o.center.toFixed(3)
                         : 'N/A';
 
+                    const cam = o.camera ? `[${o.camera}] ` : '';
+
                     lines.push(
-                        `${i+1}. depth=${dist} | est=${est} | bbox(w,h)=(${bw},${bh}) | center=${cx}`
+                        `${i+1}. ${cam}depth=${dist} | est=${est} | bbox(w,h)=(${bw},${bh}) | center=${cx}`
                     );
                     });
                     document.getElementById('info').textContent = lines.join('\\n');
+                }
+                async function tick(){
+                  try{
+                    const r = await fetch('/info', {cache:'no-store'});
+                    render(await r.json());
                   }catch(e){
                     document.getElementById('info').textContent = '데이터 수신 오류: ' + e.message;
                   }
                 }
-                setInterval(tick, 500); tick();
-                setInterval(()=>{ document.getElementById('radar').src = '/radar.png?t='+Date.now(); }, 1000);
+                let pollTimer = null;
+                function startPolling(){
+                  if(pollTimer) return;
+                  document.getElementById('info-mode').textContent = '0.5초 간격으로 갱신됩니다.';
+                  pollTimer = setInterval(tick, 500); tick();
+                }
+                // 검출 결과 푸시 (SSE). 지원하지 않거나 거절(503)되면 폴링으로 대체
+                if(window.EventSource){
+                  const es = new EventSource('/info/stream');
+                  es.onmessage = (ev)=>{ try{ render(JSON.parse(ev.data)); }catch(e){} };
+                  es.onerror = ()=>{ if(es.readyState === EventSource.CLOSED) startPolling(); };
+                }else{
+                  startPolling();
+                }
+                // ETag 로 재검증: 검출 결과가 그대로면 304 (이미지 교체 생략)
+                let radarTag = null;
+                async function radarTick(){
+                  try{
+                    const r = await fetch('/radar.png', {cache:'no-cache'});
+                    const tag = r.headers.get('ETag');
+                    if(!r.ok || (tag && tag === radarTag)) return;
+                    radarTag = tag;
+                    const img = document.getElementById('radar');
+                    const old = img.src;
+                    img.src = URL.createObjectURL(await r.blob());
+                    if(old.startsWith('blob:')) URL.revokeObjectURL(old);
+                  }catch(e){}
+                }
+                setInterval(radarTick, 1000);
               </script>
             </body>
             </html>
@@ -467,8 +1008,21 @@ class AnalysisApp:
 # 실행부
 # -------------------------------
 if __name__ == '__main__':
-    app = AnalysisApp()
-    if app.is_raspberry_pi():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recording", default=None,
+                        help="카메라 대신 재생할 녹화 세션 디렉터리 (frame_source.py 로 녹화)")
+    parser.add_argument("--fast", action="store_true", help="녹화 세션을 실시간보다 빠르게 재생")
+    args = parser.parse_args()
+
+    source = None
+    if args.recording:
+        from frame_source import RecordedFrameSource
+        source = RecordedFrameSource(args.recording, realtime=not args.fast)
+
+    app = AnalysisApp(frame_source=source)
+    if app.is_raspberry_pi() or source is not None:
+        app.start_background_capture()
         app.run_server(host='0.0.0.0', port=5000, debug=False, threaded=True)
     else:
-        app.run_local_preview()
+        app.run_local_preview()
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+비전 처리 단계별 벤치마크.
+
+processor.get_frame -> _capture_loop 의 JPEG 인코딩 경로를 합성 프레임 또는 녹화 세션으로 돌리고
+단계별 p50/p95/p99 와 지속 FPS 를 출력한다. --json 으로 저장해 두면 --compare 로 이전 실행과 비교.
+
+  python bench_vision.py --frames 300 --json before.json
+  python bench_vision.py --recording rec/session1 --json after.json --compare before.json
+"""
+import argparse
+import json
+import platform
+import time
+
+from analysis import AnalysisApp
+from frame_source import RecordedFrameSource, SyntheticFrameSource
+from perf_stats import StageTimer
+
+# 출력 순서 (실제로 측정된 단계만 표시)
+STAGE_ORDER = ("wait", "read", "align", "depth_filters", "predict", "box_extract",
+               "depth_sampling", "draw", "depth_vis", "jpeg_encode", "frame_total")
+
+
+def run_benchmark(source, frames=200, warmup=10, pipelined=False, headless=False, jpeg_backend="auto"):
+    # 인코딩 시간이 frame_total 에 포함되도록 워커 풀 없이 측정
+    app = AnalysisApp(frame_source=source, pipelined=pipelined, jpeg_backend=jpeg_backend, jpeg_workers=0)
+    timer = StageTimer(maxlen=max(frames, 1))
+    viewer = app.jpeg_cache.variant()
+    if not headless:
+        # 시청자 1명을 가정해서 그리기 + JPEG 인코딩 경로까지 측정
+        app.jpeg_cache.subscribe(viewer)
+
+    def capture_and_encode():
+        if not app._capture_once():
+            return False
+        if not headless:
+            app.jpeg_cache.get(viewer)
+        return True
+
+    try:
+        # 워밍업 (모델 초기화, 캐시) - 측정 제외
+        for _ in range(warmup):
+            capture_and_encode()
+
+        app.set_timer(timer)
+        done = 0
+        t_start = time.perf_counter()
+        while done < frames:
+            t0 = time.perf_counter()
+            if not capture_and_encode():
+                continue
+            timer.record("frame_total", time.perf_counter() - t0)
+            done += 1
+        wall = time.perf_counter() - t_start
+    finally:
+        app.set_timer(None)
+        if app.frame_pipeline is not None:
+            app.frame_pipeline.close()
+        else:
+            app.processor.stop()
+
+    summary = timer.summary()
+    stages = {k: summary[k] for k in STAGE_ORDER if k in summary}
+    for k, v in summary.items():
+        stages.setdefault(k, v)
+
+    return {
+        "frames": done,
+        "wall_sec": round(wall, 3),
+        "fps": round(done / wall, 2) if wall > 0 else 0.0,
+        "stages": stages,
+        "env": {
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "python": platform.python_version(),
+            "raspberry_pi": app.processor._is_raspberry_pi,
+            "imgsz": app.processor.imgsz,
+            "pipelined": pipelined,
+            "headless": headless,
+            "jpeg_backend": app.jpeg_backend.name,
+            "source": type(source).__name__,
+        },
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def print_report(result, baseline=None):
+    print(f"[Bench] frames={result['frames']} wall={result['wall_sec']}s fps={result['fps']}")
+    if baseline:
+        print(f"[Bench] baseline fps={baseline.get('fps')}")
+    header = f"{'stage':<16}{'p50':>10}{'p95':>10}{'p99':>10}{'mean':>10}"
+    if baseline:
+        header += f"{'Δp50':>10}"
+    print(header)
+    base_stages = (baseline or {}).get("stages", {})
+    for name, st in result["stages"].items():
+        line = f"{name:<16}{st['p50_ms']:>10.2f}{st['p95_ms']:>10.2f}{st['p99_ms']:>10.2f}{st['mean_ms']:>10.2f}"
+        if baseline:
+            b = base_stages.get(name)
+            line += f"{st['p50_ms'] - b['p50_ms']:>+10.2f}" if b else f"{'-':>10}"
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="비전 처리 단계별 벤치마크")
+    parser.add_argument("--recording", default=None, help="녹화 세션 디렉터리 (없으면 합성 프레임)")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--objects", type=int, default=3, help="합성 프레임의 물체 수")
+    parser.add_argument("--pipelined", action="store_true", help="파이프라인 모드로 측정")
+    parser.add_argument("--headless", action="store_true", help="시청자 없음 (그리기/인코딩 생략) 상태로 측정")
+    parser.add_argument("--jpeg-backend", default="auto", choices=("auto", "turbojpeg", "cv2"),
+                        help="JPEG 인코더 백엔드")
+    parser.add_argument("--json", default=None, help="결과 JSON 저장 경로 ('-' 이면 stdout)")
+    parser.add_argument("--compare", default=None, help="비교할 이전 결과 JSON")
+    args = parser.parse_args()
+
+    if args.recording:
+        src = RecordedFrameSource(args.recording, realtime=False, loop=True)
+    else:
+        src = SyntheticFrameSource(n_objects=args.objects)
+
+    result = run_benchmark(src, frames=args.frames, warmup=args.warmup, pipelined=args.pipelined,
+                           headless=args.headless, jpeg_backend=args.jpeg_backend)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+
+    if args.json == "-":
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    else:
+        print_report(result, baseline)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(result, f, indent=2, ensure_ascii=False)
+            print(f"[Bench] 결과 저장: {args.json}")
@@ -0,0 +1,115 @@
+import threading
+
+
+class Subscription:
+    """
+    Broadcaster 구독 하나. 최신 항목 하나만 보므로 (버퍼 1) 느린 구독자는 중간 항목을 건너뛴다.
+    """
+
+    def __init__(self, broadcaster):
+        self._b = broadcaster
+        self.last_seq = 0
+        self.received = 0
+        self.skipped = 0
+        self.closed = False
+
+    def next(self, timeout=None):
+        """
+        last_seq 이후의 새 항목을 기다려 (seq, item) 반환.
+        timeout 이 지나거나 broadcaster 가 닫히면 (None, None)
+        """
+        b = self._b
+        with b._cond:
+            if not b._cond.wait_for(lambda: b._closed or self.closed or b._seq > self.last_seq,
+                                    timeout=timeout):
+                return None, None
+            if b._closed:
+                self.closed = True
+            if self.closed:
+                return None, None
+            seq, item = b._seq, b._item
+        if self.last_seq and seq > self.last_seq + 1:
+            self.skipped += seq - self.last_seq - 1
+        self.last_seq = seq
+        self.received += 1
+        return seq, item
+
+    def close(self):
+        self._b._release(self)
+
+
+class Broadcaster:
+    """
+    최신값 브로드캐스터 (Condition 기반).
+
+    - publish() 는 최신 (seq, item) 을 바꾸고 notify_all 만 하므로 구독자 수와 무관하게 O(1),
+      생산자(캡처 스레드)는 느린 구독자 때문에 멈추지 않는다.
+    - Event.set()/clear() 와 달리 seq 로 비교하므로 깨어남을 놓치지 않는다.
+    - max_subscribers 를 넘는 subscribe() 는 None (동시 스트림 수 제한).
+    """
+
+    def __init__(self, max_subscribers=None, name="broadcast"):
+        self.name = name
+        self.max_subscribers = max_subscribers
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._item = None
+        self._closed = False
+        self._subs = set()
+
+        # 통계
+        self.published = 0
+        self.rejected = 0
+
+    def publish(self, item=None, seq=None):
+        with self._cond:
+            self._seq = self._seq + 1 if seq is None else int(seq)
+            self._item = item
+            self.published += 1
+            self._cond.notify_all()
+
+    def latest(self):
+        with self._cond:
+            return self._seq, self._item
+
+    def subscribe(self):
+        with self._cond:
+            if self._closed:
+                return None
+            if self.max_subscribers is not None and len(self._subs) >= self.max_subscribers:
+                self.rejected += 1
+                return None
+            sub = Subscription(self)
+            self._subs.add(sub)
+            return sub
+
+    def _release(self, sub):
+        with self._cond:
+            sub.closed = True
+            self._subs.discard(sub)
+            self._cond.notify_all()
+
+    def subscriber_count(self):
+        with self._cond:
+            return len(self._subs)
+
+    def close(self):
+        """ 대기 중인 구독자를 모두 깨워 종료시킴 (서버 종료 시) """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reopen(self):
+        with self._cond:
+            self._closed = False
+
+    def stats(self):
+        with self._cond:
+            return {
+                "seq": self._seq,
+                "subscribers": len(self._subs),
+                "max_subscribers": self.max_subscribers,
+                "published": self.published,
+                "rejected": self.rejected,
+                "skipped": sum(s.skipped for s in self._subs),
+            }
@@ -0,0 +1,347 @@
+"""
+다중 카메라 지원.
+
+카메라마다 YOLORealSenseProcessor 하나를 별도 워커(스레드 또는 프로세스)에서 돌리고,
+MultiCameraProcessor 가 각 카메라의 최신 결과를 모아 YOLORealSenseProcessor 와 같은
+get_frame() 형태로 돌려준다 (검출 목록 병합 + 스트림용 가로 모자이크).
+
+프로세스 모드는 카메라별 추론이 서로 다른 코어에서 GIL 없이 돈다. 자식 프로세스는 검출 결과만
+보내고, 스트림 시청자가 있을 때만 그려진 프레임을 함께 보낸다.
+"""
+import multiprocessing as mp
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class CameraConfig:
+    """
+    카메라 1대 설정.
+    yaw_deg: 크레인 정면 기준 카메라 방향 (시계 방향 +), 레이더/방위각 계산에 사용
+    recording: 카메라 대신 재생할 녹화 세션 (프로세스 모드에서도 사용 가능)
+    frame_source: 스레드 모드 전용 (열린 소스 객체는 다른 프로세스로 넘길 수 없음)
+    """
+
+    def __init__(self, name, serial=None, yaw_deg=0.0, hfov_deg=87.0, fps=None,
+                 recording=None, frame_source=None, processor_options=None):
+        self.name = str(name)
+        self.serial = serial
+        self.yaw_deg = float(yaw_deg)
+        self.hfov_deg = float(hfov_deg)
+        self.fps = fps
+        self.recording = recording
+        self.frame_source = frame_source
+        self.processor_options = dict(processor_options or {})
+
+    def bearing(self, center_norm):
+        """ 정규화 중심 x (0~1) -> 크레인 기준 방위각 (도, -180~180) """
+        b = self.yaw_deg + (float(center_norm) - 0.5) * self.hfov_deg
+        return (b + 180.0) % 360.0 - 180.0
+
+
+def _make_processor(cfg):
+    """ 워커(스레드/자식 프로세스) 안에서 카메라별 프로세서 생성 """
+    from processor import YOLORealSenseProcessor
+    from frame_source import RealSenseFrameSource, RecordedFrameSource
+
+    source = cfg.frame_source
+    if source is None and cfg.recording:
+        source = RecordedFrameSource(cfg.recording)
+    if source is None:
+        is_pi = YOLORealSenseProcessor._detect_raspberry_pi()
+        fps = cfg.fps or (15 if is_pi else 30)
+        filters = cfg.processor_options.get("enable_depth_filters")
+        if filters is None:
+            filters = not is_pi
+        source = RealSenseFrameSource(width=640, height=360, fps=fps, serial=cfg.serial,
+                                      enable_depth_filters=filters)
+    return YOLORealSenseProcessor(frame_source=source, **cfg.processor_options)
+
+
+class _RateMeter:
+    """ 최근 window 초 동안의 처리율 (Hz) """
+
+    def __init__(self, window=2.0):
+        self.window = window
+        self._t = []
+
+    def tick(self, now=None):
+        now = time.monotonic() if now is None else now
+        self._t.append(now)
+        cut = now - self.window
+        while self._t and self._t[0] < cut:
+            self._t.pop(0)
+
+    def rate(self):
+        if len(self._t) < 2:
+            return 0.0
+        span = self._t[-1] - self._t[0]
+        return (len(self._t) - 1) / span if span > 0 else 0.0
+
+
+class _CameraWorkerBase:
+    def __init__(self, cfg, on_result=None):
+        self.cfg = cfg
+        self.name = cfg.name
+        self.on_result = on_result    # 새 결과마다 호출 (MultiCameraProcessor 가 대기 해제용으로 사용)
+        self._lock = threading.Lock()
+        self._latest = (0, None, [], 0.0)   # (seq, frame, detections, ts)
+        self._meter = _RateMeter()
+        self.error = None
+        self.detection_stats = None
+
+    def _store(self, frame, detections, ts):
+        for o in detections:
+            if isinstance(o, dict):
+                o["camera"] = self.name
+                c = o.get("center")
+                if isinstance(c, (int, float)):
+                    o["bearing_deg"] = round(self.cfg.bearing(c), 2)
+        with self._lock:
+            seq = self._latest[0] + 1
+            self._latest = (seq, frame, detections, ts)
+        self._meter.tick()
+        if self.on_result is not None:
+            self.on_result()
+
+    def latest(self):
+        with self._lock:
+            return self._latest
+
+    def fps(self):
+        return self._meter.rate()
+
+    def stats(self):
+        seq, _, dets, ts = self.latest()
+        return {
+            "serial": self.cfg.serial,
+            "yaw_deg": self.cfg.yaw_deg,
+            "fps": round(self.fps(), 2),
+            "frames": seq,
+            "detections": len(dets),
+            "age_sec": round(time.time() - ts, 2) if ts else None,
+            "error": self.error,
+            "detection": self.detection_stats,
+        }
+
+
+class ThreadCameraWorker(_CameraWorkerBase):
+    """ 같은 프로세스의 스레드에서 카메라 1대 처리 """
+
+    def __init__(self, cfg, on_result=None):
+        super().__init__(cfg, on_result)
+        self.processor = None
+        self.streaming = False
+        self._stop = threading.Event()
+        self._th = None
+
+    def set_streaming(self, on):
+        self.streaming = bool(on)
+
+    def start(self):
+        if self.processor is None:
+            self.processor = _make_processor(self.cfg)
+        if self._th and self._th.is_alive():
+            return
+        self.processor.start()   # stop() 에서 닫은 프레임 소스를 다시 연다
+        self._stop.clear()
+        self._th = threading.Thread(target=self._run, name=f"camera-{self.name}", daemon=True)
+        self._th.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                frame, dets = self.processor.get_frame(return_depth_vis=False, annotate=self.streaming)
+            except Exception as e:
+                self.error = str(e)
+                print(f"[Camera:{self.name}] [ERROR] {e}")
+                time.sleep(0.5)
+                continue
+            if frame is None:
+                time.sleep(0.005)
+                continue
+            self.detection_stats = self.processor.detection_stats()
+            self._store(frame if self.streaming else None, dets, time.time())
+
+    def stop(self):
+        self._stop.set()
+        if self._th:
+            self._th.join(timeout=1.0)
+        if self.processor is not None:
+            self.processor.stop()
+
+
+def _camera_process_main(cfg, out_q, streaming, stop_evt):
+    """ 자식 프로세스: 프로세서를 만들어 결과를 out_q 로 보냄 (가득 차면 이번 결과는 버림) """
+    try:
+        processor = _make_processor(cfg)
+    except Exception as e:
+        out_q.put(("error", str(e)))
+        return
+    n = 0
+    try:
+        while not stop_evt.is_set():
+            on = bool(streaming.value)
+            frame, dets = processor.get_frame(return_depth_vis=False, annotate=on)
+            if frame is None:
+                time.sleep(0.005)
+                continue
+            n += 1
+            stats = processor.detection_stats() if n % 30 == 0 else None
+            try:
+                out_q.put_nowait(("result", frame if on else None, dets, time.time(), stats))
+            except queue.Full:
+                pass
+    finally:
+        processor.stop()
+
+
+class ProcessCameraWorker(_CameraWorkerBase):
+    """ 별도 프로세스에서 카메라 1대 처리 (spawn: torch 를 fork 하지 않도록) """
+
+    def __init__(self, cfg, on_result=None, ctx=None):
+        super().__init__(cfg, on_result)
+        if cfg.frame_source is not None:
+            raise ValueError("프로세스 모드에서는 frame_source 대신 serial 또는 recording 을 지정하세요")
+        self._ctx = ctx or mp.get_context("spawn")
+        self._q = self._ctx.Queue(maxsize=2)
+        self._streaming = self._ctx.Value("b", 0)
+        self._stop_evt = self._ctx.Event()
+        self._proc = None
+        self._reader = None
+
+    def set_streaming(self, on):
+        self._streaming.value = 1 if on else 0
+
+    def start(self):
+        if self._proc and self._proc.is_alive():
+            return
+        self._stop_evt.clear()
+        self._proc = self._ctx.Process(target=_camera_process_main, name=f"camera-{self.name}",
+                                       args=(self.cfg, self._q, self._streaming, self._stop_evt),
+                                       daemon=True)
+        self._proc.start()
+        self._reader = threading.Thread(target=self._read_loop, name=f"camera-{self.name}-rx", daemon=True)
+        self._reader.start()
+
+    def _read_loop(self):
+        while not self._stop_evt.is_set():
+            try:
+                msg = self._q.get(timeout=0.5)
+            except queue.Empty:
+                if self._proc is not None and not self._proc.is_alive():
+                    self.error = self.error or f"프로세스 종료 (exitcode={self._proc.exitcode})"
+                    return
+                continue
+            if msg[0] == "error":
+                self.error = msg[1]
+                print(f"[Camera:{self.name}] [ERROR] {msg[1]}")
+                return
+            _, frame, dets, ts, stats = msg
+            if stats is not None:
+                self.detection_stats = stats
+            self._store(frame, dets, ts)
+
+    def stop(self):
+        self._stop_evt.set()
+        if self._proc is not None:
+            self._proc.join(timeout=2.0)
+            if self._proc.is_alive():
+                self._proc.terminate()
+        if self._reader is not None:
+            self._reader.join(timeout=1.0)
+
+
+class MultiCameraProcessor:
+    """
+    여러 카메라 워커의 최신 결과를 모아 하나의 프로세서처럼 제공.
+
+    get_frame() 은 어느 카메라든 새 결과가 오면 (frame, detections) 를 돌려준다.
+    detections 는 모든 카메라의 최신 검출을 합친 목록 (각 항목에 camera, bearing_deg 추가),
+    frame 은 annotate=True 일 때 카메라별 프레임을 같은 높이로 가로로 이어 붙인 모자이크.
+    """
+
+    def __init__(self, cameras, processes=False, stale_sec=2.0):
+        self.cameras = list(cameras)
+        self.stale_sec = stale_sec   # 이보다 오래된 카메라 결과는 병합에서 제외 (멈춘 카메라)
+        self._cond = threading.Condition()
+        self._gen = 0
+        worker_cls = ProcessCameraWorker if processes else ThreadCameraWorker
+        self.workers = [worker_cls(cfg, on_result=self._notify) for cfg in self.cameras]
+        self.processes = processes
+        self.imgsz = None
+        self.last_process_sec = 0.0
+        self._last_gen = 0
+        self._mosaic_h = 360
+        self._is_raspberry_pi = False
+
+    def _notify(self):
+        with self._cond:
+            self._gen += 1
+            self._cond.notify_all()
+
+    def start(self):
+        for w in self.workers:
+            w.start()
+
+    def warmup(self, n=2):
+        pass
+
+    def set_timer(self, timer):
+        for w in self.workers:
+            p = getattr(w, "processor", None)
+            if p is not None:
+                p.set_timer(timer)
+
+    def get_frame(self, return_depth_vis=False, annotate=True, timeout=1.0):
+        for w in self.workers:
+            w.set_streaming(annotate)
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._gen != self._last_gen, timeout=timeout):
+                return None, []
+            self._last_gen = self._gen
+
+        t0 = time.perf_counter()
+        detections = []
+        frames = []
+        now = time.time()
+        for w in self.workers:
+            _, frame, dets, ts = w.latest()
+            if not ts or now - ts > self.stale_sec:
+                continue
+            detections.extend(dets)
+            if annotate and frame is not None:
+                frames.append(frame)
+        mosaic = self._mosaic(frames) if annotate else None
+        self.last_process_sec = time.perf_counter() - t0
+        # 스트림을 안 볼 때는 자리만 채우는 빈 프레임 (캡처 루프는 frame None 을 '프레임 없음' 으로 봄)
+        if mosaic is None:
+            mosaic = np.zeros((1, 1, 3), dtype=np.uint8)
+        return mosaic, detections
+
+    def _mosaic(self, frames):
+        if not frames:
+            return None
+        if len(frames) == 1:
+            return frames[0]
+        h = min(f.shape[0] for f in frames)
+        tiles = []
+        for f in frames:
+            if f.shape[0] != h:
+                w = int(round(f.shape[1] * h / f.shape[0]))
+                f = cv2.resize(f, (w, h), interpolation=cv2.INTER_AREA)
+            tiles.append(f)
+        return np.hstack(tiles)
+
+    def detection_stats(self):
+        return {"cameras": self.camera_stats()}
+
+    def camera_stats(self):
+        return {w.name: w.stats() for w in self.workers}
+
+    def stop(self):
+        for w in self.workers:
+            w.stop()
@@ -0,0 +1,68 @@
+import numpy as np
+import cv2
+
+
+class DepthColorizer:
+    """
+    z16 depth -> BGR 컬러맵 변환을 65536 항목 LUT 한 번의 gather 로 처리.
+
+    LUT 는 depth_scale / 표시 범위 / 컬러맵이 바뀔 때만 다시 만든다.
+    결과는 미리 할당한 버퍼(n_buffers 개를 순환)에 쓰므로 프레임마다 큰 배열을 새로 만들지 않는다.
+    버퍼를 순환하는 이유: 이전 프레임을 아직 다른 스레드(인코딩/파이프라인 큐)가 쓰고 있을 수 있음.
+    """
+
+    def __init__(self, clip_min_m=0.0, clip_max_m=4.0, colormap=cv2.COLORMAP_JET, n_buffers=3):
+        self.clip_min_m = clip_min_m
+        self.clip_max_m = clip_max_m
+        self.colormap = colormap
+        self.n_buffers = max(1, int(n_buffers))
+
+        self._lut = None
+        self._lut_key = None
+        self._pools = {}   # shape -> [버퍼 리스트, 다음 인덱스]
+
+    def _ensure_lut(self, depth_scale):
+        key = (float(depth_scale), float(self.clip_min_m), float(self.clip_max_m), int(self.colormap))
+        if self._lut is not None and self._lut_key == key:
+            return self._lut
+
+        # 기존 프레임별 계산식과 같은 순서로 계산 (float32 m -> clip -> 0~255 -> uint8)
+        raw = np.arange(65536, dtype=np.uint16)
+        depth_m = raw.astype(np.float32) * depth_scale
+        depth_clip = np.clip(depth_m, self.clip_min_m, self.clip_max_m)
+        span = max(self.clip_max_m - self.clip_min_m, 1e-6)
+        depth_u8 = (((depth_clip - self.clip_min_m) / span) * 255).astype(np.uint8)
+        lut = cv2.applyColorMap(depth_u8.reshape(-1, 1), self.colormap).reshape(65536, 3)
+
+        self._lut = np.ascontiguousarray(lut)
+        self._lut_key = key
+        return self._lut
+
+    def _next_buffer(self, shape):
+        pool = self._pools.get(shape)
+        if pool is None:
+            pool = [[np.empty(shape, dtype=np.uint8) for _ in range(self.n_buffers)], 0]
+            self._pools[shape] = pool
+        bufs, idx = pool
+        pool[1] = (idx + 1) % len(bufs)
+        return bufs[idx]
+
+    def colorize(self, depth_img, depth_scale, out=None):
+        lut = self._ensure_lut(depth_scale)
+        if out is None:
+            out = self._next_buffer(depth_img.shape[:2] + (3,))
+        np.take(lut, depth_img, axis=0, out=out)
+        return out
+
+    def compose(self, color_img, depth_img, depth_scale):
+        """color 와 depth 컬러맵을 좌우로 붙인 이미지 (np.hstack 대체)"""
+        H, W = color_img.shape[:2]
+        combined = self._next_buffer((H, W * 2, 3))
+        combined[:, :W] = color_img
+        if depth_img.shape[:2] == (H, W):
+            self.colorize(depth_img, depth_scale, out=combined[:, W:])
+        else:
+            # 해상도가 다를 때만 리사이즈 (정렬된 depth 는 보통 color 와 같은 크기)
+            depth_color = self.colorize(depth_img, depth_scale)
+            combined[:, W:] = cv2.resize(depth_color, (W, H))
+        return combined
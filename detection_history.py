@@ -0,0 +1,148 @@
+import threading
+import time
+
+import numpy as np
+
+
+# 검출 1건 = 레코드 1개 (distance 가 없으면 NaN)
+HISTORY_DTYPE = np.dtype([
+    ("ts", "f8"),            # time.time()
+    ("frame_id", "i8"),
+    ("distance", "f4"),      # depth 거리 (m)
+    ("est_distance", "f4"),  # bbox 기반 추정 거리 (m)
+    ("x1", "i2"), ("y1", "i2"), ("x2", "i2"), ("y2", "i2"),
+    ("center", "f4"),        # 정규화된 중심 x (0~1)
+])
+
+
+class DetectionHistory:
+    """
+    검출 결과 시간 인덱스 링 버퍼 (고정 용량, 미리 할당한 NumPy structured array).
+
+    append() 는 프레임의 검출 목록을 레코드로 추가하고, 가득 차면 가장 오래된 것부터 덮어쓴다.
+    timestamp 가 단조 증가하므로 query() 는 링의 두 구간에 searchsorted(이진 탐색)를 써서
+    since~until 범위를 찾는다. 오래 켜 둬도 메모리는 capacity * itemsize 로 일정.
+    """
+
+    def __init__(self, capacity=200000):
+        self.capacity = max(1, int(capacity))
+        self._buf = np.zeros(self.capacity, dtype=HISTORY_DTYPE)
+        self._head = 0      # 다음에 쓸 위치
+        self._size = 0
+        self._last_ts = -np.inf
+        self._lock = threading.Lock()
+        self.appended = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, detections, frame_id, ts=None):
+        ts = time.time() if ts is None else float(ts)
+        rows = []
+        for o in detections:
+            if not isinstance(o, dict):
+                continue
+            d = o.get("distance")
+            est = o.get("est_distance")
+            center = o.get("center")
+            x1, y1, x2, y2 = o.get("bbox") or (0, 0, 0, 0)
+            rows.append((ts, frame_id,
+                         d if isinstance(d, (int, float)) else np.nan,
+                         est if isinstance(est, (int, float)) else np.nan,
+                         x1, y1, x2, y2,
+                         center if isinstance(center, (int, float)) else np.nan))
+        if not rows:
+            return 0
+
+        recs = np.array(rows, dtype=HISTORY_DTYPE)
+        n = len(recs)
+        with self._lock:
+            # 시계가 뒤로 가도 (NTP 보정 등) 정렬이 깨지지 않도록
+            if ts < self._last_ts:
+                recs["ts"] = self._last_ts
+            self._last_ts = float(recs["ts"][0])
+            if n >= self.capacity:
+                recs = recs[-self.capacity:]
+                n = self.capacity
+            end = self._head + n
+            if end <= self.capacity:
+                self._buf[self._head:end] = recs
+            else:
+                k = self.capacity - self._head
+                self._buf[self._head:] = recs[:k]
+                self._buf[:n - k] = recs[k:]
+            self._head = end % self.capacity
+            self._size = min(self.capacity, self._size + n)
+            self.appended += n
+        return n
+
+    def _segments(self):
+        """ 오래된 순서의 연속 구간 (최대 2개) """
+        start = (self._head - self._size) % self.capacity
+        if start + self._size <= self.capacity:
+            return [self._buf[start:start + self._size]]
+        return [self._buf[start:], self._buf[:self._head]]
+
+    def query(self, since=None, until=None):
+        """ since <= ts <= until 인 레코드 (복사본, 오래된 순) """
+        lo = -np.inf if since is None else float(since)
+        hi = np.inf if until is None else float(until)
+        parts = []
+        with self._lock:
+            for seg in self._segments():
+                ts = seg["ts"]
+                i = np.searchsorted(ts, lo, side="left")
+                j = np.searchsorted(ts, hi, side="right")
+                if j > i:
+                    parts.append(seg[i:j].copy())
+        if not parts:
+            return np.zeros(0, dtype=HISTORY_DTYPE)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def summary(self, since=None, until=None):
+        """ 범위 내 검출 수 / 프레임 수 / 최소 거리(와 그 시각) """
+        recs = self.query(since, until)
+        out = {
+            "since": since,
+            "until": until,
+            "detections": int(recs.size),
+            "frames": int(np.unique(recs["frame_id"]).size) if recs.size else 0,
+            "min_distance": None,
+            "min_distance_ts": None,
+            "min_est_distance": None,
+        }
+        if recs.size:
+            d = recs["distance"]
+            if np.any(~np.isnan(d)):
+                i = int(np.nanargmin(d))
+                out["min_distance"] = round(float(d[i]), 2)
+                out["min_distance_ts"] = float(recs["ts"][i])
+            est = recs["est_distance"]
+            if np.any(~np.isnan(est)):
+                out["min_est_distance"] = round(float(np.nanmin(est)), 2)
+        return out
+
+    @staticmethod
+    def to_dicts(recs):
+        out = []
+        for r in recs.tolist():
+            ts, fid, d, est, x1, y1, x2, y2, c = r
+            out.append({
+                "ts": ts,
+                "frame_id": fid,
+                "distance": None if d != d else round(d, 2),
+                "est_distance": None if est != est else round(est, 2),
+                "bbox": [x1, y1, x2, y2],
+                "center": None if c != c else round(c, 4),
+            })
+        return out
+
+    def stats(self):
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "size": self._size,
+                "appended": self.appended,
+                "bytes": int(self._buf.nbytes),
+                "oldest_ts": float(self._segments()[0]["ts"][0]) if self._size else None,
+            }
@@ -0,0 +1,242 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class LatestQueue:
+    """최신 항목만 유지하는 크기 제한 큐 (가득 차면 가장 오래된 항목을 버림)"""
+
+    def __init__(self, maxsize=1, name="queue"):
+        self.name = name
+        self.maxsize = max(1, int(maxsize))
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # 통계
+        self.put_count = 0
+        self.get_count = 0
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()   # drop-oldest
+                self.dropped += 1
+            self._items.append(item)
+            self.put_count += 1
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """항목이 들어올 때까지 대기. 타임아웃/종료 시 None"""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait_for(lambda: self._items or self._closed, timeout=timeout)
+            if not self._items:
+                return None
+            self.get_count += 1
+            return self._items.popleft()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reopen(self):
+        with self._cond:
+            self._closed = False
+            self._items.clear()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "depth": len(self._items),
+                "maxsize": self.maxsize,
+                "put": self.put_count,
+                "get": self.get_count,
+                "dropped": self.dropped,
+            }
+
+
+class _StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.processed = 0
+        self.errors = 0
+        self.busy_sec = 0.0
+        self.last_sec = 0.0
+
+    def record(self, dt):
+        self.processed += 1
+        self.busy_sec += dt
+        self.last_sec = dt
+
+    def as_dict(self):
+        avg = self.busy_sec / self.processed if self.processed else 0.0
+        return {
+            "processed": self.processed,
+            "errors": self.errors,
+            "avg_ms": round(avg * 1000.0, 2),
+            "last_ms": round(self.last_sec * 1000.0, 2),
+        }
+
+
+class PipelinedProcessor:
+    """
+    YOLORealSenseProcessor 의 단계를 별도 스레드로 분리해서 실행.
+
+      acquire(취득+정렬+필터) -> infer(YOLO) -> post(거리 계산+시각화)
+
+    단계 사이는 LatestQueue 로 연결되어, 느린 단계가 있으면 오래된 프레임은 버려지고
+    처리량은 전체 합이 아니라 가장 느린 단계에 수렴한다.
+    get_frame() 은 YOLORealSenseProcessor.get_frame() 과 같은 형태로 결과를 돌려준다.
+    min_interval_sec 를 주면 추론 단계는 그 간격보다 자주 돌지 않는다 (RateGovernor 목표 FPS).
+    """
+
+    STAGES = ("acquire", "infer", "post")
+
+    def __init__(self, processor, queue_size=1, return_depth_vis=False, annotate=True,
+                 min_interval_sec=0.0):
+        self.processor = processor
+        self.return_depth_vis = return_depth_vis
+        self.annotate = annotate
+        # 추론 최소 간격 (초). 캡처 루프가 governor.frame_interval() 로 갱신
+        self.min_interval_sec = min_interval_sec
+        self._last_infer = 0.0
+
+        self._q_infer = LatestQueue(queue_size, name="acquire->infer")
+        self._q_post = LatestQueue(queue_size, name="infer->post")
+        self._q_out = LatestQueue(queue_size, name="post->out")
+
+        self._stage_stats = {name: _StageStats(name) for name in self.STAGES}
+        self._stop_evt = threading.Event()
+        self._threads = []
+        self._start_lock = threading.Lock()
+
+    # -------------------------------
+    # 수명 관리
+    # -------------------------------
+    def start(self):
+        with self._start_lock:
+            if any(th.is_alive() for th in self._threads):
+                return
+            # close() 로 프레임 소스를 닫은 뒤 다시 시작하는 경우 소스부터 다시 연다
+            self.processor.start()
+            self._stop_evt.clear()
+            for q in (self._q_infer, self._q_post, self._q_out):
+                q.reopen()
+            targets = (self._acquire_loop, self._infer_loop, self._post_loop)
+            self._threads = [
+                threading.Thread(target=t, name=f"pipeline-{n}", daemon=True)
+                for n, t in zip(self.STAGES, targets)
+            ]
+            for th in self._threads:
+                th.start()
+
+    def stop(self):
+        """ 단계 스레드만 멈춘다 (프로세서/카메라는 유지, start() 로 다시 시작 가능) """
+        self._stop_evt.set()
+        for q in (self._q_infer, self._q_post, self._q_out):
+            q.close()
+        for th in self._threads:
+            th.join(timeout=1.0)
+
+    def close(self):
+        """ 단계 스레드를 멈추고 프레임 소스(카메라)까지 닫는다. start() 하면 소스를 다시 연다 """
+        self.stop()
+        self.processor.stop()
+
+    def is_running(self):
+        return any(th.is_alive() for th in self._threads)
+
+    # -------------------------------
+    # 외부 인터페이스
+    # -------------------------------
+    def get_frame(self, return_depth_vis=False, annotate=True, timeout=1.0):
+        if not self.is_running():
+            self.start()
+        # 후처리 단계는 다음 프레임부터 이 설정을 따른다
+        self.return_depth_vis = return_depth_vis
+        self.annotate = annotate
+        item = self._q_out.get(timeout=timeout)
+        if item is None:
+            return None, []
+        return item
+
+    def processing_latency(self):
+        """ 카메라 대기를 뺀 가장 느린 처리 단계의 최근 소요 시간 (초) """
+        return max(self._stage_stats["infer"].last_sec, self._stage_stats["post"].last_sec)
+
+    def stats(self):
+        return {
+            "stages": {n: s.as_dict() for n, s in self._stage_stats.items()},
+            "queues": {q.name: q.stats() for q in (self._q_infer, self._q_post, self._q_out)},
+        }
+
+    # -------------------------------
+    # 단계별 루프
+    # -------------------------------
+    def _run_stage(self, name, fn):
+        stats = self._stage_stats[name]
+        while not self._stop_evt.is_set():
+            try:
+                # fn 은 실제 처리 시간(큐 대기 제외)을 돌려주고, 처리할 것이 없으면 None
+                dt = fn()
+                if dt is not None:
+                    stats.record(dt)
+            except Exception as e:
+                stats.errors += 1
+                print(f"[Pipeline] [ERROR] {name} 단계 예외: {e}")
+                time.sleep(0.05)
+
+    def _acquire_loop(self):
+        def step():
+            t0 = time.perf_counter()
+            color_img, depth_img = self.processor._acquire()
+            if color_img is None:
+                return None
+            # RealSense 프레임 버퍼는 재사용되므로 다음 단계로 넘기기 전에 복사
+            item = (np.array(color_img, copy=True), np.array(depth_img, copy=True))
+            dt = time.perf_counter() - t0
+            self._q_infer.put(item)
+            return dt
+        self._run_stage("acquire", step)
+
+    def _infer_loop(self):
+        def step():
+            # 목표 FPS 보다 빨리 추론하지 않음. 기다리는 동안 들어온 프레임은 LatestQueue 가 최신 것만 남긴다
+            wait = self._last_infer + self.min_interval_sec - time.monotonic()
+            if wait > 0 and self._stop_evt.wait(wait):
+                return None
+            item = self._q_infer.get(timeout=0.2)
+            if item is None:
+                return None
+            self._last_infer = time.monotonic()
+            t0 = time.perf_counter()
+            color_img, depth_img = item
+            boxes, scores, clses, names_map = self.processor._infer_or_track(color_img, depth_img)
+            dt = time.perf_counter() - t0
+            self._q_post.put((color_img, depth_img, boxes, scores, clses, names_map))
+            return dt
+        self._run_stage("infer", step)
+
+    def _post_loop(self):
+        def step():
+            item = self._q_post.get(timeout=0.2)
+            if item is None:
+                return None
+            t0 = time.perf_counter()
+            color_img, depth_img, boxes, scores, clses, names_map = item
+            out = self.processor._postprocess(color_img, depth_img, boxes, scores, clses, names_map,
+                                              return_depth_vis=self.return_depth_vis,
+                                              annotate=self.annotate)
+            dt = time.perf_counter() - t0
+            self._q_out.put(out)
+            return dt
+        self._run_stage("post", step)
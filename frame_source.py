@@ -0,0 +1,449 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+
+class FrameSource:
+    """
+    color + depth 프레임 공급자 인터페이스.
+
+    read() 는 color(BGR uint8, HxWx3) 와 color 에 정렬된 depth(z16 uint16, HxW) 를 돌려준다.
+    프레임이 없으면 (None, None).
+    거리 계산에 필요한 fy / depth_scale 은 start() 이후 속성으로 제공한다.
+    """
+
+    width = 640
+    height = 360
+    fps = 15
+    fx = 0.0
+    fy = 0.0
+    ppx = 0.0
+    ppy = 0.0
+    depth_scale = 0.001
+
+    # 단계별 시간 측정 (perf_stats.StageTimer), processor.set_timer() 가 설정
+    timer = None
+
+    def _lap(self, stage, t0):
+        t1 = time.perf_counter()
+        if self.timer is not None:
+            self.timer.record(stage, t1 - t0)
+        return t1
+
+    def start(self):
+        pass
+
+    def read(self):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+    def set_fps(self, fps):
+        """ 프레임 속도 변경 (지원하지 않는 소스는 무시) """
+        self.fps = fps
+
+    def intrinsics(self):
+        return {
+            "width": int(self.width),
+            "height": int(self.height),
+            "fps": int(self.fps),
+            "fx": float(self.fx),
+            "fy": float(self.fy),
+            "ppx": float(self.ppx),
+            "ppy": float(self.ppy),
+            "depth_scale": float(self.depth_scale),
+        }
+
+
+class RealSenseFrameSource(FrameSource):
+    """RealSense 카메라 (정렬 + spatial/temporal 필터 포함)"""
+
+    def __init__(self, width=640, height=360, fps=15, serial=None,
+                 enable_depth_filters=True, laser_power=360):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.serial = serial
+        self.enable_depth_filters = enable_depth_filters
+        self.laser_power = laser_power
+
+        self.pipeline = None
+        self.profile = None
+        self.align = None
+        self.spatial = None
+        self.temporal = None
+        # set_fps() 의 파이프라인 재시작과 read() 가 겹치지 않도록
+        self._lock = threading.Lock()
+
+    def start(self):
+        import pyrealsense2 as rs
+
+        # RealSense 파이프라인
+        self.pipeline = rs.pipeline()
+        config = rs.config()
+        if self.serial:
+            config.enable_device(str(self.serial))
+        config.enable_stream(rs.stream.depth, self.width, self.height, rs.format.z16, self.fps)
+        config.enable_stream(rs.stream.color, self.width, self.height, rs.format.bgr8, self.fps)
+        self.profile = self.pipeline.start(config)
+        color_stream = self.profile.get_stream(rs.stream.color).as_video_stream_profile()
+        intr = color_stream.get_intrinsics()
+        self.fx = float(intr.fx)
+        self.fy = float(intr.fy)
+        self.ppx = float(intr.ppx)
+        self.ppy = float(intr.ppy)
+
+        sensor = self.profile.get_device().first_depth_sensor()
+        self.depth_scale = sensor.get_depth_scale()
+        try:
+            sensor.set_option(rs.option.laser_power, self.laser_power)  # 기기별 허용 범위 다름
+        except Exception:
+            pass
+
+        self.align = rs.align(rs.stream.color)
+
+        # Depth 필터
+        if self.enable_depth_filters:
+            self.spatial = rs.spatial_filter()
+            self.spatial.set_option(rs.option.filter_magnitude, 5)
+            self.spatial.set_option(rs.option.filter_smooth_alpha, 0.5)
+            self.spatial.set_option(rs.option.filter_smooth_delta, 20)
+
+            self.temporal = rs.temporal_filter()
+        else:
+            self.spatial = None
+            self.temporal = None
+        # self.hole_filling = rs.hole_filling_filter()
+        # self.hole_filling.set_option(rs.option.holes_fill, 2)
+
+    def read(self):
+        with self._lock:
+            if self.pipeline is None:
+                return None, None
+            return self._read()
+
+    def _read(self):
+        t0 = time.perf_counter()
+        frames = self.pipeline.wait_for_frames()
+        t0 = self._lap("wait", t0)
+        aligned = self.align.process(frames)
+        depth_frame = aligned.get_depth_frame()
+        color_frame = aligned.get_color_frame()
+        if not depth_frame or not color_frame:
+            return None, None
+        t0 = self._lap("align", t0)
+
+        # 필터 적용
+        if self.spatial is not None:
+            depth_frame = self.spatial.process(depth_frame)
+        if self.temporal is not None:
+            depth_frame = self.temporal.process(depth_frame)
+        # depth_frame = self.hole_filling.process(depth_frame)
+
+        color_img = np.asanyarray(color_frame.get_data())
+        depth_img = np.asanyarray(depth_frame.get_data())
+        self._lap("depth_filters", t0)
+        return color_img, depth_img
+
+    def stop(self):
+        if self.pipeline is None:
+            return
+        try:
+            self.pipeline.stop()
+        except Exception:
+            pass
+        self.pipeline = None
+
+    def set_fps(self, fps):
+        """ 카메라 FPS 변경 (파이프라인 재시작, 수백 ms 소요). 실패하면 이전 FPS 로 복구 """
+        fps = int(fps)
+        if fps == self.fps:
+            return
+        with self._lock:
+            old = self.fps
+            self.stop()
+            self.fps = fps
+            try:
+                self.start()
+            except Exception as e:
+                print(f"[FrameSource] [ERROR] {fps}fps 재시작 실패, {old}fps 로 복구: {e}")
+                self.fps = old
+                self.start()
+
+
+# -------------------------------
+# 녹화 파일 포맷
+#   <dir>/meta.json      : 해상도, fps, intrinsics, depth_scale
+#   <dir>/color.u8       : N x H x W x 3 (BGR)
+#   <dir>/depth.u16      : N x H x W (z16, color 정렬)
+#   <dir>/timestamps.f64 : N (녹화 시작 기준 초)
+# -------------------------------
+META_FILE = "meta.json"
+COLOR_FILE = "color.u8"
+DEPTH_FILE = "depth.u16"
+TS_FILE = "timestamps.f64"
+
+
+class RecordedFrameSource(FrameSource):
+    """
+    SessionRecorder 로 녹화한 세션을 memmap 으로 재생.
+
+    realtime=True 면 녹화 시각에 맞춰 재생하고, False 면 가능한 한 빠르게 읽는다.
+    loop=True 면 끝에서 처음으로 돌아간다.
+    """
+
+    def __init__(self, path, realtime=True, loop=True, speed=1.0):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.speed = max(float(speed), 1e-6)
+
+        with open(os.path.join(path, META_FILE), "r") as f:
+            meta = json.load(f)
+        self.meta = meta
+        self.width = int(meta["width"])
+        self.height = int(meta["height"])
+        self.fps = int(meta.get("fps", 15))
+        self.fx = float(meta.get("fx", 0.0))
+        self.fy = float(meta.get("fy", 0.0))
+        self.ppx = float(meta.get("ppx", 0.0))
+        self.ppy = float(meta.get("ppy", 0.0))
+        self.depth_scale = float(meta["depth_scale"])
+
+        self._color = None
+        self._depth = None
+        self._ts = None
+        self.frame_count = 0
+        self._idx = 0
+        self._t0 = None
+        self._loop_offset = 0.0
+
+    def start(self):
+        H, W = self.height, self.width
+        color_path = os.path.join(self.path, COLOR_FILE)
+        depth_path = os.path.join(self.path, DEPTH_FILE)
+        ts_path = os.path.join(self.path, TS_FILE)
+
+        # 녹화가 중간에 끊겼을 수 있으므로 파일 크기로 완전한 프레임 수만 사용
+        n_color = os.path.getsize(color_path) // (H * W * 3)
+        n_depth = os.path.getsize(depth_path) // (H * W * 2)
+        n_ts = os.path.getsize(ts_path) // 8 if os.path.exists(ts_path) else n_color
+        n = min(n_color, n_depth, n_ts)
+        if n == 0:
+            raise RuntimeError(f"녹화 파일에 프레임이 없습니다: {self.path}")
+
+        self._color = np.memmap(color_path, dtype=np.uint8, mode="r", shape=(n, H, W, 3))
+        self._depth = np.memmap(depth_path, dtype=np.uint16, mode="r", shape=(n, H, W))
+        if os.path.exists(ts_path):
+            self._ts = np.memmap(ts_path, dtype=np.float64, mode="r", shape=(n,))
+        else:
+            self._ts = np.arange(n, dtype=np.float64) / max(self.fps, 1)
+        self.frame_count = n
+        self._idx = 0
+        self._t0 = None
+        self._loop_offset = 0.0
+
+    def read(self):
+        if self._color is None:
+            return None, None
+        if self._idx >= self.frame_count:
+            if not self.loop:
+                return None, None
+            # 한 바퀴 길이만큼 시간축을 밀어서 재생 간격 유지
+            self._loop_offset += float(self._ts[-1]) + 1.0 / max(self.fps, 1)
+            self._idx = 0
+
+        i = self._idx
+        self._idx += 1
+
+        if self.realtime:
+            now = time.perf_counter()
+            if self._t0 is None:
+                self._t0 = now - (float(self._ts[i]) + self._loop_offset) / self.speed
+            due = self._t0 + (float(self._ts[i]) + self._loop_offset) / self.speed
+            wait = due - now
+            if wait > 0:
+                time.sleep(wait)
+
+        # color 는 박스를 그리므로 복사, depth 는 읽기 전용 view 그대로
+        t0 = time.perf_counter()
+        color_img = np.array(self._color[i])
+        depth_img = self._depth[i]
+        self._lap("read", t0)
+        return color_img, depth_img
+
+    def stop(self):
+        self._color = None
+        self._depth = None
+        self._ts = None
+
+    def set_fps(self, fps):
+        # 녹화 시각대로 재생하므로 FPS 는 바꾸지 않음
+        pass
+
+
+class SyntheticFrameSource(FrameSource):
+    """
+    카메라/녹화 없이 쓰는 합성 프레임 (벤치마크용).
+
+    미리 만든 n_frames 장을 순환하므로 프레임 생성 비용은 측정에 섞이지 않는다.
+    사람 크기의 사각형 n_objects 개가 좌우로 움직이고, depth 는 원거리 배경 위에 물체만 가깝다.
+    """
+
+    def __init__(self, width=640, height=360, fps=15, n_frames=64, n_objects=3,
+                 depth_scale=0.001, fy=320.0, realtime=False, seed=0):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fx = fy
+        self.fy = fy
+        self.ppx = width / 2.0
+        self.ppy = height / 2.0
+        self.depth_scale = depth_scale
+        self.n_frames = n_frames
+        self.n_objects = n_objects
+        self.realtime = realtime
+        self.seed = seed
+        self._frames = []
+        self._idx = 0
+        self._next_due = None
+
+    def start(self):
+        rng = np.random.default_rng(self.seed)
+        H, W = self.height, self.width
+        base = rng.integers(40, 200, size=(H, W, 3), dtype=np.uint8)
+        bg_depth = np.uint16(8.0 / self.depth_scale)
+        box_w, box_h = max(8, W // 12), max(16, H // 3)
+        speeds = rng.uniform(2.0, 8.0, size=self.n_objects)
+        x0s = rng.uniform(0, W - box_w, size=self.n_objects)
+        ys = rng.uniform(0, H - box_h, size=self.n_objects).astype(int)
+        dists = rng.uniform(1.5, 6.0, size=self.n_objects)
+
+        self._frames = []
+        for t in range(self.n_frames):
+            color = base.copy()
+            depth = np.full((H, W), bg_depth, dtype=np.uint16)
+            for k in range(self.n_objects):
+                x = int((x0s[k] + speeds[k] * t) % max(1, W - box_w))
+                y = ys[k]
+                color[y:y + box_h, x:x + box_w] = (30, 30, 160)
+                depth[y:y + box_h, x:x + box_w] = np.uint16(dists[k] / self.depth_scale)
+            self._frames.append((color, depth))
+        self._idx = 0
+        self._next_due = None
+
+    def read(self):
+        if not self._frames:
+            return None, None
+        if self.realtime:
+            now = time.perf_counter()
+            if self._next_due is None:
+                self._next_due = now
+            wait = self._next_due - now
+            if wait > 0:
+                time.sleep(wait)
+            self._next_due += 1.0 / max(self.fps, 1)
+
+        t0 = time.perf_counter()
+        color, depth = self._frames[self._idx % len(self._frames)]
+        self._idx += 1
+        color_img = color.copy()
+        self._lap("read", t0)
+        return color_img, depth
+
+    def stop(self):
+        self._frames = []
+
+
+class SessionRecorder:
+    """FrameSource 에서 읽은 프레임을 RecordedFrameSource 포맷으로 저장"""
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = source
+        self.frames_written = 0
+        self._files = None
+        self._t0 = None
+
+    def open(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, META_FILE), "w") as f:
+            json.dump(self.source.intrinsics(), f, indent=2)
+        self._files = [
+            open(os.path.join(self.path, COLOR_FILE), "wb"),
+            open(os.path.join(self.path, DEPTH_FILE), "wb"),
+            open(os.path.join(self.path, TS_FILE), "wb"),
+        ]
+        self.frames_written = 0
+        self._t0 = None
+
+    def write(self, color_img, depth_img, ts=None):
+        if self._files is None:
+            self.open()
+        now = time.perf_counter()
+        if self._t0 is None:
+            self._t0 = now
+        if ts is None:
+            ts = now - self._t0
+        f_color, f_depth, f_ts = self._files
+        f_color.write(np.ascontiguousarray(color_img, dtype=np.uint8).tobytes())
+        f_depth.write(np.ascontiguousarray(depth_img, dtype=np.uint16).tobytes())
+        f_ts.write(np.float64(ts).tobytes())
+        self.frames_written += 1
+
+    def record(self, n_frames=None, duration_sec=None):
+        """소스에서 n_frames 개 또는 duration_sec 동안 녹화"""
+        self.open()
+        t_end = time.perf_counter() + duration_sec if duration_sec else None
+        try:
+            while True:
+                if n_frames is not None and self.frames_written >= n_frames:
+                    break
+                if t_end is not None and time.perf_counter() >= t_end:
+                    break
+                color_img, depth_img = self.source.read()
+                if color_img is None:
+                    continue
+                self.write(color_img, depth_img)
+        finally:
+            self.close()
+        return self.frames_written
+
+    def close(self):
+        if self._files is None:
+            return
+        for f in self._files:
+            f.close()
+        self._files = None
+
+
+# -------------------------------
+# 실행부: 실제 카메라에서 세션 녹화
+#   python frame_source.py rec/session1 --frames 300
+# -------------------------------
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="RealSense 세션 녹화")
+    parser.add_argument("path", help="저장할 디렉터리")
+    parser.add_argument("--frames", type=int, default=None, help="녹화할 프레임 수")
+    parser.add_argument("--seconds", type=float, default=None, help="녹화 시간(초)")
+    parser.add_argument("--fps", type=int, default=15)
+    parser.add_argument("--serial", default=None, help="카메라 시리얼 번호")
+    parser.add_argument("--no-filters", action="store_true", help="depth 필터 비활성화")
+    args = parser.parse_args()
+
+    if args.frames is None and args.seconds is None:
+        args.frames = 300
+
+    src = RealSenseFrameSource(fps=args.fps, serial=args.serial,
+                               enable_depth_filters=not args.no_filters)
+    src.start()
+    try:
+        n = SessionRecorder(args.path, src).record(n_frames=args.frames, duration_sec=args.seconds)
+        print(f"[Recorder] {n} 프레임 저장 완료: {args.path}")
+    finally:
+        src.stop()
@@ -0,0 +1,140 @@
+import threading
+
+
+class JpegVariantCache:
+    """
+    프레임 id 별 JPEG 인코딩 캐시. (폭, 품질) 조합(variant)마다 프레임당 최대 한 번만 인코딩한다.
+
+    - 캡처 루프는 publish() 로 원본(주석이 그려진) 프레임만 넘기고 인코딩은 하지 않는다.
+    - 스트림 클라이언트는 subscribe() 한 variant 로 get() 을 호출하고, 같은 프레임/variant 를
+      요청한 다른 클라이언트는 먼저 만든 결과를 그대로 공유한다.
+    - 구독자가 없는 variant 는 캐시에서 제거되고 인코딩되지 않는다.
+    - pool(jpeg_encoder.JpegEncoderPool) 을 연결하면 publish() 시점에 구독 중인 variant 를
+      워커가 미리 인코딩하고, get() 은 대부분 캐시 적중으로 끝난다.
+    """
+
+    def __init__(self, encode_fn, default_width=640, default_quality=40,
+                 min_width=64, max_width=1920, width_step=32, quality_step=5):
+        self.encode_fn = encode_fn      # encode_fn(frame, width, quality) -> bytes | None
+        self.default_width = default_width
+        self.default_quality = default_quality
+        self.min_width = min_width
+        self.max_width = max_width
+        self.width_step = width_step
+        self.quality_step = quality_step
+
+        self._lock = threading.Lock()
+        self._frame = None
+        self._frame_id = 0
+        self._encoded = {}        # variant -> (frame_id, bytes)
+        self._variant_locks = {}  # variant -> Lock (같은 variant 동시 인코딩 방지)
+        self._subscribers = {}    # variant -> 구독자 수
+        self.pool = None          # JpegEncoderPool (선택)
+
+        # 통계
+        self.encodes = 0
+        self.hits = 0
+
+    def variant(self, width=None, quality=None):
+        """요청 값을 정규화 (variant 가 무한히 늘어나지 않도록 폭/품질을 단계로 맞춤)"""
+        w = self.default_width if width is None else int(width)
+        q = self.default_quality if quality is None else int(quality)
+        w = max(self.min_width, min(self.max_width, w))
+        w = max(self.min_width, (w // self.width_step) * self.width_step)
+        q = max(10, min(95, q))
+        q = max(10, (q // self.quality_step) * self.quality_step)
+        return (w, q)
+
+    # -------------------------------
+    # 구독 관리
+    # -------------------------------
+    def subscribe(self, variant):
+        with self._lock:
+            self._subscribers[variant] = self._subscribers.get(variant, 0) + 1
+
+    def unsubscribe(self, variant):
+        with self._lock:
+            n = self._subscribers.get(variant, 0) - 1
+            if n > 0:
+                self._subscribers[variant] = n
+                return
+            # 마지막 구독자가 떠나면 캐시도 제거
+            self._subscribers.pop(variant, None)
+            self._encoded.pop(variant, None)
+            self._variant_locks.pop(variant, None)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(self._subscribers.values())
+
+    def active_variants(self):
+        with self._lock:
+            return list(self._subscribers.keys())
+
+    # -------------------------------
+    # 프레임 공급 / 조회
+    # -------------------------------
+    def publish(self, frame, frame_id):
+        with self._lock:
+            self._frame = frame
+            self._frame_id = frame_id
+            variants = list(self._subscribers.keys())
+        pool = self.pool
+        if pool is not None and variants:
+            pool.submit(frame_id, frame, variants)
+
+    def clear(self):
+        with self._lock:
+            self._frame = None
+            self._encoded.clear()
+
+    def latest_frame_id(self):
+        with self._lock:
+            return self._frame_id if self._frame is not None else None
+
+    def get(self, variant):
+        """현재 프레임의 variant JPEG. (frame_id, bytes) 또는 프레임이 없으면 (None, None)"""
+        with self._lock:
+            frame, fid = self._frame, self._frame_id
+            if frame is None:
+                return None, None
+            cached = self._encoded.get(variant)
+            if cached is not None and cached[0] == fid:
+                self.hits += 1
+                return cached
+        return self.encode_variant(variant, fid, frame)
+
+    def encode_variant(self, variant, fid, frame):
+        """frame(fid) 을 variant 로 인코딩해 캐시에 저장. 이미 있으면 캐시 반환"""
+        with self._lock:
+            vlock = self._variant_locks.setdefault(variant, threading.Lock())
+
+        with vlock:
+            # 기다리는 동안 다른 스레드(워커/클라이언트)가 인코딩했을 수 있음
+            with self._lock:
+                cached = self._encoded.get(variant)
+                if cached is not None and cached[0] >= fid:
+                    self.hits += 1
+                    return cached
+
+            jpeg = self.encode_fn(frame, variant[0], variant[1])
+            if jpeg is None:
+                return fid, None
+
+            entry = (fid, jpeg)
+            with self._lock:
+                self.encodes += 1
+                if variant in self._subscribers:
+                    cur = self._encoded.get(variant)
+                    if cur is None or cur[0] <= fid:
+                        self._encoded[variant] = entry
+            return entry
+
+    def stats(self):
+        with self._lock:
+            return {
+                "frame_id": self._frame_id,
+                "variants": {f"{w}x{q}": n for (w, q), n in self._subscribers.items()},
+                "encodes": self.encodes,
+                "hits": self.hits,
+            }
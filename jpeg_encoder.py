@@ -0,0 +1,147 @@
+import threading
+import time
+
+import cv2
+
+from perf_stats import StageTimer
+
+
+# -------------------------------
+# 인코더 백엔드
+# -------------------------------
+class CvJpegBackend:
+    """cv2.imencode (항상 사용 가능)"""
+    name = "cv2"
+
+    def encode(self, img, quality):
+        ok, buf = cv2.imencode('.jpg', img, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+        return buf.tobytes() if ok else None
+
+
+class TurboJpegBackend:
+    """libjpeg-turbo (PyTurboJPEG) 직접 호출. 설치되어 있지 않으면 생성 시 ImportError"""
+    name = "turbojpeg"
+
+    def __init__(self, lib_path=None):
+        from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420
+        self._tj = TurboJPEG(lib_path) if lib_path else TurboJPEG()
+        self._pf = TJPF_BGR
+        self._samp = TJSAMP_420   # cv2.imencode 기본값과 같은 4:2:0
+
+    def encode(self, img, quality):
+        try:
+            return self._tj.encode(img, quality=int(quality), pixel_format=self._pf,
+                                   jpeg_subsample=self._samp)
+        except Exception:
+            return None
+
+
+def make_jpeg_backend(name="auto"):
+    """
+    'auto' 면 TurboJPEG 를 먼저 시도하고 실패하면 cv2 로 대체.
+    'turbojpeg' / 'cv2' 로 지정 가능 (지정한 백엔드를 못 쓰면 cv2 로 대체하고 로그 출력)
+    """
+    if name in ("auto", "turbojpeg"):
+        try:
+            return TurboJpegBackend()
+        except Exception as e:
+            if name == "turbojpeg":
+                print(f"[JpegEncoder] TurboJPEG 사용 불가, cv2 로 대체: {e}")
+    return CvJpegBackend()
+
+
+# -------------------------------
+# 인코딩 워커 풀
+# -------------------------------
+class JpegEncoderPool:
+    """
+    새 프레임 id 가 들어오면 구독 중인 variant 들을 워커 스레드에서 미리 인코딩한다.
+
+    variant 마다 가장 최근 작업 하나만 대기시키므로 (이전 프레임 작업은 버림) 인코딩이
+    밀려도 대기열은 variant 수 이상으로 늘지 않는다. 실제 인코딩은 JpegVariantCache 의
+    encode_variant() 로 수행하므로 같은 프레임/variant 는 스트림 스레드와 합쳐 한 번만 인코딩된다.
+    """
+
+    def __init__(self, cache, workers=2, name="jpeg"):
+        self.cache = cache
+        self.workers = max(1, int(workers))
+        self.name = name
+
+        self._cond = threading.Condition()
+        self._pending = {}      # variant -> (frame_id, frame, 등록 시각)
+        self._threads = []
+        self._running = False
+
+        # 통계
+        self.timer = StageTimer(maxlen=512)
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._threads = [threading.Thread(target=self._worker, name=f"{self.name}-enc-{i}", daemon=True)
+                         for i in range(self.workers)]
+        for t in self._threads:
+            t.start()
+
+    def stop(self, timeout=1.0):
+        with self._cond:
+            self._running = False
+            self._pending.clear()
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads = []
+
+    def is_running(self):
+        return self._running
+
+    def submit(self, frame_id, frame, variants):
+        if not self._running:
+            return
+        now = time.perf_counter()
+        with self._cond:
+            for v in variants:
+                if v in self._pending:
+                    self.dropped += 1   # 아직 시작 못 한 이전 프레임 작업은 버림
+                self._pending[v] = (frame_id, frame, now)
+                self.submitted += 1
+            self._cond.notify(len(variants))
+
+    def backlog(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or not self._running)
+                if not self._running:
+                    return
+                variant, (frame_id, frame, t_submit) = self._pending.popitem()
+
+            self.timer.record("queue_wait", time.perf_counter() - t_submit)
+            t0 = time.perf_counter()
+            try:
+                self.cache.encode_variant(variant, frame_id, frame)
+            except Exception as e:
+                print(f"[JpegEncoder] [ERROR] 인코딩 실패 {variant}: {e}")
+            self.timer.record("encode", time.perf_counter() - t0)
+            with self._cond:
+                self.completed += 1
+
+    def stats(self):
+        with self._cond:
+            out = {
+                "workers": self.workers,
+                "backlog": len(self._pending),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "dropped": self.dropped,
+            }
+        out.update(self.timer.summary())
+        return out
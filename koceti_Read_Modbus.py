@@ -3,11 +3,17 @@ import threading
 import struct
 import logging
 import socket
+from metrics import REGISTRY
 
-from pymodbus.server import StartSerialServer
+from pymodbus.server import StartSerialServer, ServerStop
 from pymodbus.datastore import ModbusSequentialDataBlock
 from pymodbus.datastore import ModbusDeviceContext, ModbusServerContext
 
+UDP_RECEIVED = REGISTRY.counter("va_udp_packets_total", "안전센서 UDP 수신 패킷 수")
+UDP_DROPPED_SHORT = REGISTRY.counter("va_udp_dropped_total", "버린 안전센서 UDP 패킷 수", {"reason": "short"})
+UDP_DROPPED_PARSE = REGISTRY.counter("va_udp_dropped_total", "버린 안전센서 UDP 패킷 수", {"reason": "parse"})
+UDP_TIMEOUTS = REGISTRY.counter("va_udp_timeouts_total", "안전센서 UDP 수신 타임아웃 수 (센서 무응답)")
+
 class koceti_Read_Modbus:
     def __init__(self, target_ip ="0.0.0.0", port=5005, timeout=1):
         print(f"Modbus UDP 클라이언트 초기화: 주소={target_ip}, port={port}")
@@ -88,12 +94,19 @@ class koceti_Read_Modbus:
             return None
 
         # 1. 데이터를 '여기서' 실시간으로 읽습니다.
-        response, addr = self.safety_client.recvfrom(1024)
+        try:
+            response, addr = self.safety_client.recvfrom(1024)
+        except socket.timeout:
+            # 센서가 잠시 조용한 것은 정상 상태: 이번 사이클만 건너뜀 (워커 오류로 세지 않음)
+            UDP_TIMEOUTS.inc()
+            return None
+        UDP_RECEIVED.inc()
         print(f"[SAFETY][RAW] unit={addr}, response={response}")
 
         expected_length = 101 #25 -> LMI 데이터를 수신 하지 않을경우는 25 바이트, LMI 포함시 101 바이트
         if len(response) < expected_length:
             print(f"[ERROR] 데이터 길이가 부족합니다. 수신: {len(response)}B, 예상: {expected_length}B")
+            UDP_DROPPED_SHORT.inc()
             return None
 
         try:
@@ -101,6 +114,7 @@ class koceti_Read_Modbus:
             unpacked_data = struct.unpack('<6fB19f', response[:25]) # 패딩이 있는 경우 포맷: <6fB3x19f (3x는 3바이트를 건너뛴다는 뜻)
         except struct.error as e:
             print(f"[ERROR] 데이터 파싱 실패: {e}")
+            UDP_DROPPED_PARSE.inc()
             return None
 
         results = {
@@ -153,6 +167,21 @@ class koceti_Read_Modbus:
         self.server_thread = threading.Thread(target=_server_runner)
         self.server_thread.daemon = True
         self.server_thread.start()  
+
+    def stop_main_crane_server(self, timeout=2.0):
+        """메인 크레인 서버 종료 (시리얼 포트 해제). 워커를 다시 만들기 전에 호출해야 새 서버가 포트를 연다"""
+        th = self.server_thread
+        if th is None:
+            return
+        if th.is_alive():
+            try:
+                ServerStop()   # StartSerialServer 가 돌고 있는 이벤트 루프에 종료 요청
+            except Exception as e:
+                print(f"[Server Error] 종료 실패: {e}")
+            th.join(timeout)
+            if th.is_alive():
+                print("[Server] [WARNING] 메인 크레인 서버 쓰레드가 제때 종료되지 않았습니다.")
+        self.server_thread = None
               
     def get_main_crane_data(self):
         """Unit ID 2번 메모리(self.server_store)에서 데이터를 꺼내옴"""
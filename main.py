@@ -3,14 +3,22 @@
 # python -m venv .venv # 처음 한번 가상환경 생성...
 # C:\GitHub\solimatics\Video-analysis\.venv\Scripts\Activate.ps1
 
-from analysis import AnalysisApp
-import time
+from perf_stats import StartupProfile
+startup = StartupProfile()  # 기동 단계별 시간 기록
+
+from analysis import AnalysisApp  # 비전 스택(torch/ultralytics)은 여기서 import 하지 않음
 import socket
 from send_ip import send_ip
 from koceti_worker import koceti_worker
 from transmit_Crane_Data_Worker import transmit_Crane_Data_Worker
 from Update_Can_Data import Update_Can_Data
 from shared_state import SharedState
+from shared_state_shm import SharedMemoryState
+from supervisor import Supervisor, Unit, ThreadUnit, ProcessUnit
+from scheduler import default_scheduler
+from metrics import REGISTRY, RemoteStats
+from motion_gate import MotionGate
+from rate_governor import RateGovernor
 from flask import Flask, request # request 임포트 필요
 import requests # API 호출을 위해 임포트
 from Crane_MQTT import MQTTClient # Crane_MQTT.py 파일이 있다고 가정
@@ -19,7 +27,19 @@ from Crane_MQTT import MQTTClient # Crane_MQTT.py 파일이 있다고 가정
 from zeroconf import ServiceInfo, Zeroconf
 
 
-id_addr = send_ip()
+# True: 텔레메트리 워커(UDP/Modbus, CAN 수신, 업링크)를 비전과 다른 프로세스에서 실행
+#       (상태는 SharedMemoryState 로 공유, 텔레메트리 프로세스가 자체 MQTT 연결 사용)
+#       텔레메트리 프로세스의 계측/유닛/스케줄러 상태는 1초마다 부모로 보내서 /metrics (process="telemetry")
+#       와 /pipeline_stats 의 telemetry_process 에 표시한다
+MULTIPROCESS = False
+REMOTE_STATS_MAX_AGE_SEC = 10.0   # 이보다 오래된 텔레메트리 프로세스 통계는 표시하지 않음 (프로세스 종료 등)
+
+# 다중 카메라: 카메라마다 시리얼과 크레인 정면 기준 방향(yaw)을 지정. 비워 두면 단일 카메라.
+# 예) (from camera_worker import CameraConfig)
+#     [CameraConfig("front", serial="123456789012", yaw_deg=0),
+#      CameraConfig("rear", serial="234567890123", yaw_deg=180)]
+CAMERAS = []
+
 
 def make_local_url(port=5000):
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -37,57 +57,85 @@ def get_cpu_serial():
     except:
         return "ERROR"
     return "0000000000000000"
-# MQTT 클라이언트와 같은 내부 객체는 여기서 생성합니다.
-mqttclient = MQTTClient()
-shared_state = SharedState()
-
-# 2. 각 워커 객체 생성. 'shared_state'를 공통으로 전달합니다.
-koceti_poller = koceti_worker(
-    target_ip='0.0.0.0',    # Client Address
-    port=5005,    # Client port
-    main_crane_port='/dev/ttyUSB0', # Server (Passive)
-    shared_state=shared_state, 
-    period_sec=0.05
-)
-
-can_data = Update_Can_Data(
-    shared_state=shared_state,
-    mqttclient=mqttclient,
-    period_sec=0.2
-)
-
-data_simulator = transmit_Crane_Data_Worker(
-    shared_state=shared_state,
-    mqttclient=mqttclient,
-    period_sec=0.5
-)
-
-app = AnalysisApp(
-    host="0.0.0.0", 
-    port=5000,
-    shared_state=shared_state
-)
-
-# mDNS(ZeroConf) 객체 변수 준비
-zeroconf = None 
-
-try:
-    # --- MQTT 연결 및 루프 시작 ---
+
+
+# -------------------------------
+# 관리 유닛 구성
+# -------------------------------
+def telemetry_units(shared_state, mqttclient):
+    """ 텔레메트리 워커들. 재시작할 때마다 factory 로 새 워커를 만든다 """
+    return [
+        ThreadUnit("koceti", lambda: koceti_worker(
+            target_ip='0.0.0.0',    # Client Address
+            port=5005,    # Client port
+            main_crane_port='/dev/ttyUSB0', # Server (Passive)
+            shared_state=shared_state,
+            period_sec=0.05
+        )),
+        ThreadUnit("can_inbound", lambda: Update_Can_Data(
+            shared_state=shared_state,
+            mqttclient=mqttclient,
+            period_sec=0.2
+        )),
+        ThreadUnit("uplink", lambda: transmit_Crane_Data_Worker(
+            shared_state=shared_state,
+            mqttclient=mqttclient,
+            period_sec=0.5
+        )),
+    ]
+
+
+def telemetry_process_main(stop_evt, shared_state, remote_stats):
+    """ MULTIPROCESS 모드의 텔레메트리 프로세스: 자체 MQTT 연결 + 워커 감시 (stop_evt 까지 블록) """
+    mqttclient = MQTTClient()
     mqttclient.connecting()
     mqttclient.loop_start()
-    
-    url = make_local_url()
-    device_id = get_cpu_serial()
-    shared_state.set_serial_info(device_id)
-    print(f"url: {url} , device_id: {device_id}")
-    print("[Main] Modbus 폴러와 데이터 시뮬레이터를 시작합니다.")
-    app.start_background_capture()
-    app.start_server()
-    koceti_poller.start()
-    can_data.start()
-    data_simulator.start()
-    
-    # mDNS 서비스 등록 (여기서 네트워크에 방송 시작)
+    supervisor = Supervisor(telemetry_units(shared_state, mqttclient))
+    scheduler = default_scheduler()
+    # 이 프로세스의 계측은 부모의 /metrics 에서 보이지 않으므로 스냅샷을 1초마다 부모로 보냄
+    export = scheduler.every("stats_export", 1.0, lambda: remote_stats.publish({
+        "metrics": REGISTRY.collect(),
+        "units": supervisor.stats(),
+        "scheduler": scheduler.stats(),
+    }))
+    try:
+        supervisor.run(stop_event=stop_evt)
+    finally:
+        export.cancel()
+        mqttclient.loop_stop()
+        mqttclient.disconnect()
+        shared_state.close()
+
+
+def http_unit(app):
+    def start():
+        with startup.phase("http_start"):
+            app.start_server()
+
+    def stop():
+        try:
+            # 서버 스레드를 종료시키기 위해 shutdown API를 호출합니다.
+            requests.post(f"http://127.0.0.1:{app.port}/shutdown", timeout=2.0)
+            print("[Main] 서버 종료 요청 전송 완료.")
+        except requests.exceptions.RequestException:
+            # 서버가 이미 내려갔거나 다른 이유로 연결이 안될 수 있습니다.
+            print("[Main] 서버에 연결할 수 없어 종료 요청을 보내지 못했습니다.")
+        if app.server_thread and app.server_thread.is_alive():
+            print("[Main] 서버 스레드가 종료될 때까지 대기합니다...")
+            app.server_thread.join(timeout=2.0) # 타임아웃과 함께 대기
+
+    return Unit("http", start=start, stop=stop,
+                is_alive=lambda: app.server_thread is not None and app.server_thread.is_alive())
+
+
+def vision_unit(app):
+    # 비전: import -> 모델/카메라 -> 워밍업 추론 -> 캡처 시작 (백그라운드)
+    return Unit("vision", start=lambda: app.start_vision_async(warmup=2),
+                stop=app.stop_background_capture, is_alive=app.is_vision_alive)
+
+
+def register_mdns(id_addr):
+    """ mDNS 서비스 등록 (여기서 네트워크에 방송 시작). 실패하면 None """
     try:
         desc = {'path': '/radar.png'}
         info = ServiceInfo(
@@ -101,61 +149,94 @@ try:
         zeroconf = Zeroconf()
         zeroconf.register_service(info)
         print(f"[Main] mDNS Broadcasting started on {id_addr}:5000 (RadarServer)")
+        return zeroconf
     except Exception as e:
         print(f"[Main] [WARNING] mDNS 등록 실패: {e}")
-            
-    # 3. 메인 프로그램은 최종 통합된 데이터를 큐에서 꺼내 사용합니다.
-    while True:
-        try:
-            detections = app.get_current_detections_list()
-            if detections:  # 리스트가 비어있지 않으면 True
-                print(detections)
-            #time.sleep(0.2)
-        except Exception:
-            # 워커들이 살아있는지 확인
-            if not koceti_poller._th.is_alive() or not data_simulator._th.is_alive():
-                print("[Main] [ERROR] 하나 이상의 워커 쓰레드가 중지되었습니다.")
-                break
-            continue
-            
-except KeyboardInterrupt:
-    print("\n[Main] 종료 요청 수신.")
-finally:
-    print("[Main] 모든 워커와 리소스를 정리합니다...")
-    if zeroconf: # mDNS 방송 종료
-        try:
-            print("[Main] mDNS 방송을 중단합니다.")
-            zeroconf.unregister_all_services()
-            zeroconf.close()
-        except Exception as e:
-            print(f"mDNS 해제 중 에러: {e}")
-                
-    # 2. 서버 종료 API 호출
+        return None
+
+
+def main():
+    id_addr = send_ip()
+    shared_state = SharedMemoryState() if MULTIPROCESS else SharedState()
+    # MQTT 클라이언트와 같은 내부 객체는 여기서 생성합니다. (MULTIPROCESS 면 텔레메트리 프로세스에서 생성)
+    mqttclient = None if MULTIPROCESS else MQTTClient()
+
+    app = AnalysisApp(
+        host="0.0.0.0",
+        port=5000,
+        shared_state=shared_state,
+        pipelined=True,  # 취득/추론/후처리 단계를 병렬로 실행
+        defer_vision=True,  # 모델/카메라 로드는 텔레메트리 워커 기동 후 백그라운드에서
+        processor_options={
+            "detect_interval": 3,  # YOLO 는 3프레임마다, 사이는 트래커로 추적
+            "motion_gate": MotionGate(max_stale_sec=5.0),  # 장면 변화가 없으면 추론 생략 (최대 5초)
+        },
+        startup_profile=startup,
+        # 처리 지연/CPU/SoC 온도로 추론 FPS 조절 (최소 5fps 는 유지)
+        # 카메라 FPS 도 목표 이상인 가장 낮은 단계로 맞춰 취득 단계(정렬/필터) 부하까지 줄인다
+        governor=RateGovernor(min_fps=5.0, max_fps=15.0, adjust_camera_fps=True),
+        cameras=CAMERAS,
+        camera_processes=True,  # 카메라별 추론을 별도 프로세스로 (코어 분산)
+    )
+
+    # 기동 순서: 텔레메트리 -> HTTP -> 비전 (비전 스택 로딩을 기다리지 않음), 종료는 역순
+    supervisor = Supervisor(check_sec=1.0, backoff_base=1.0, backoff_max=60.0)
+    if MULTIPROCESS:
+        remote_stats = RemoteStats()
+        supervisor.add(ProcessUnit("telemetry", telemetry_process_main, args=(shared_state, remote_stats)))
+        latest = lambda: remote_stats.latest(max_age_sec=REMOTE_STATS_MAX_AGE_SEC)
+        REGISTRY.add_remote("telemetry", lambda: (latest() or {}).get("metrics"))
+        app.remote_stats = latest
+    else:
+        for unit in telemetry_units(shared_state, mqttclient):
+            supervisor.add(unit)
+    supervisor.add(http_unit(app))
+    supervisor.add(vision_unit(app))
+    app.supervisor = supervisor
+    if not MULTIPROCESS:
+        app.scheduler = default_scheduler()   # 텔레메트리 주기 작업 (koceti 20Hz, 업링크 2Hz)
+
+    # mDNS(ZeroConf) 객체 변수 준비
+    zeroconf = None
+
     try:
-        # 서버 스레드를 종료시키기 위해 shutdown API를 호출합니다.
-        requests.post(f"http://127.0.0.1:{app.port}/shutdown")
-        print("[Main] 서버 종료 요청 전송 완료.")
-    except requests.exceptions.ConnectionError:
-        # 서버가 이미 내려갔거나 다른 이유로 연결이 안될 수 있습니다.
-        print("[Main] 서버에 연결할 수 없어 종료 요청을 보내지 못했습니다.")
-
-    app.stop_background_capture()
-    koceti_poller.stop()
-    data_simulator.stop()
-    can_data.stop()
-    
-    # 3. 모든 스레드가 종료될 때까지 기다립니다.
-    if app.server_thread and app.server_thread.is_alive():
-        print("[Main] 서버 스레드가 종료될 때까지 대기합니다...")
-        app.server_thread.join(timeout=2.0) # 타임아웃과 함께 대기
-
-    koceti_poller.join()
-    data_simulator.join()
-    can_data.join()
-
-    print("[Main] MQTT 연결을 종료합니다.")
-    mqttclient.loop_stop()
-    mqttclient.disconnect()
-
-    print("[Main] 모든 워커가 성공적으로 종료되었습니다.")
-    print("[Main] 프로그램 종료.")
+        if mqttclient is not None:
+            # --- MQTT 연결 및 루프 시작 ---
+            with startup.phase("mqtt_connect"):
+                mqttclient.connecting()
+                mqttclient.loop_start()
+
+        url = make_local_url()
+        device_id = get_cpu_serial()
+        shared_state.set_serial_info(device_id)
+        print(f"url: {url} , device_id: {device_id}")
+        zeroconf = register_mdns(id_addr)
+
+        print("[Main] 워커를 시작합니다. (Ctrl+C 또는 SIGTERM 으로 종료)")
+        # 종료 요청까지 블록: 1초마다 유닛 상태만 확인하고, 죽은 유닛은 백오프 후 재시작
+        supervisor.run()
+    finally:
+        print("[Main] 모든 워커와 리소스를 정리합니다...")
+        if zeroconf: # mDNS 방송 종료
+            try:
+                print("[Main] mDNS 방송을 중단합니다.")
+                zeroconf.unregister_all_services()
+                zeroconf.close()
+            except Exception as e:
+                print(f"mDNS 해제 중 에러: {e}")
+
+        if mqttclient is not None:
+            print("[Main] MQTT 연결을 종료합니다.")
+            mqttclient.loop_stop()
+            mqttclient.disconnect()
+        if MULTIPROCESS:
+            shared_state.close()
+            shared_state.unlink()
+
+        print("[Main] 모든 워커가 성공적으로 종료되었습니다.")
+        print("[Main] 프로그램 종료.")
+
+
+# spawn 으로 뜨는 자식 프로세스(카메라/텔레메트리)가 이 파일을 다시 import 해도 실행되지 않도록
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+Prometheus 텍스트 형식(/metrics) 계측.
+
+카운터/히스토그램은 스레드마다 자기 칸(shard)에만 더하고 수집(render) 시에 합산한다.
+기록 경로에는 락이 없으므로 캡처/텔레메트리 루프에서 매 주기 호출해도 부담이 적다.
+(스레드가 처음 기록할 때 한 번만 락을 잡고 shard 를 등록한다)
+종료된 스레드(HTTP 연결마다 뜨는 스레드 등)의 shard 는 새 shard 등록/수집 시에 기본값으로 합쳐
+정리하므로 shard 수는 살아 있는 기록 스레드 수를 넘지 않는다.
+
+    from metrics import REGISTRY, LoopMonitor
+    sent = REGISTRY.counter("va_mqtt_publish_total", "MQTT publish 수")
+    sent.inc()
+
+다른 프로세스(MULTIPROCESS 텔레메트리)의 계측은 RemoteStats 로 주기적으로 받아서
+REGISTRY.add_remote() 로 등록하면 render 시에 process 라벨을 붙여 함께 출력한다.
+"""
+import bisect
+import math
+import multiprocessing as mp
+import queue
+import threading
+import time
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _fmt_value(v):
+    if v == math.inf:
+        return "+Inf"
+    if isinstance(v, float) and v.is_integer() and abs(v) < 1e15:
+        return str(int(v))
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Sharded:
+    """스레드별 shard 관리 (shard 는 숫자 list, 기록은 shard 안에서만)"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []      # (기록 스레드, shard)
+        self._base = None      # 종료된 스레드들의 shard 합
+        self._reg_lock = threading.Lock()
+
+    def _new_shard(self):
+        raise NotImplementedError
+
+    def _shard(self):
+        s = getattr(self._local, "s", None)
+        if s is None:
+            s = self._new_shard()
+            self._local.s = s
+            with self._reg_lock:
+                self._compact()
+                self._shards.append((threading.current_thread(), s))
+        return s
+
+    def _compact(self):
+        """ 종료된 스레드의 shard 를 _base 로 합치고 목록에서 뺀다 (_reg_lock 안에서 호출) """
+        dead = [s for th, s in self._shards if not th.is_alive()]
+        if not dead:
+            return
+        # 수집 중인 쪽이 이전 _base 를 들고 있을 수 있으므로 새 list 로 교체 (중복 합산 방지)
+        base = list(self._base) if self._base is not None else self._new_shard()
+        for s in dead:
+            for i, v in enumerate(s):
+                base[i] += v
+        self._base = base
+        self._shards = [(th, s) for th, s in self._shards if th.is_alive()]
+
+    def _all_shards(self):
+        with self._reg_lock:
+            self._compact()
+            shards = [s for _, s in self._shards]
+            if self._base is not None:
+                shards.append(self._base)
+            return shards
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def __init__(self, name, help="", labels=()):
+        super().__init__()
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def _new_shard(self):
+        return [0.0]
+
+    def inc(self, n=1):
+        self._shard()[0] += n
+
+    def value(self):
+        return sum(s[0] for s in self._all_shards())
+
+    def samples(self):
+        yield self.name, self.labels, self.value()
+
+
+class Gauge:
+    """ 현재 값. set() 으로 넣거나, fn 을 주면 수집 시점에 호출 (큐 길이 등) """
+    kind = "gauge"
+
+    def __init__(self, name, help="", labels=(), fn=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.fn = fn
+        self._value = 0.0
+
+    def set(self, v):
+        self._value = v
+
+    def value(self):
+        if self.fn is None:
+            return self._value
+        try:
+            v = self.fn()
+        except Exception:
+            return math.nan
+        return math.nan if v is None else v
+
+    def samples(self):
+        yield self.name, self.labels, self.value()
+
+
+# 기본 버킷 (초): 1ms ~ 10s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(self, name, help="", labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__()
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_shard(self):
+        # [버킷별 개수..., +Inf 개수, 합계]
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, v):
+        s = self._shard()
+        s[bisect.bisect_left(self.buckets, v)] += 1
+        s[-1] += v
+
+    def samples(self):
+        n = len(self.buckets) + 1
+        totals = [0] * n
+        total_sum = 0.0
+        for s in self._all_shards():
+            for i in range(n):
+                totals[i] += s[i]
+            total_sum += s[-1]
+        acc = 0
+        for le, c in zip(self.buckets + (math.inf,), totals):
+            acc += c
+            yield self.name + "_bucket", self.labels + (("le", _fmt_value(le)),), acc
+        yield self.name + "_sum", self.labels, total_sum
+        yield self.name + "_count", self.labels, acc
+
+
+class Registry:
+    """ 이름 + 라벨로 계측기를 등록/조회하고 Prometheus 텍스트로 출력 """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}   # (name, labels) -> metric
+        self._remotes = {}   # process 라벨 -> collect() 결과를 돌려주는 함수
+
+    def _get(self, cls, name, help, labels, **kw):
+        labels = tuple(sorted((labels or {}).items()))
+        key = (name, labels)
+        m = self._metrics.get(key)
+        if m is None:
+            with self._lock:
+                m = self._metrics.get(key)
+                if m is None:
+                    m = cls(name, help, labels, **kw)
+                    self._metrics[key] = m
+        return m
+
+    def counter(self, name, help="", labels=None):
+        return self._get(Counter, name, help, labels)
+
+    def histogram(self, name, help="", labels=None, buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def gauge(self, name, help="", labels=None, fn=None):
+        g = self._get(Gauge, name, help, labels)
+        if fn is not None:
+            g.fn = fn   # 같은 이름으로 다시 등록하면 최신 객체의 콜백으로 교체
+        return g
+
+    def collect(self):
+        """ [(name, kind, help, [(sample 이름, labels, 값), ...]), ...] (다른 프로세스로 보내는 형태) """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: (m.name, m.labels))
+        return [(m.name, m.kind, m.help, list(m.samples())) for m in metrics]
+
+    def add_remote(self, process, fn):
+        """ fn() 이 돌려주는 다른 프로세스의 collect() 결과(None 이면 생략)를 process 라벨을 붙여 함께 출력 """
+        with self._lock:
+            self._remotes[process] = fn
+
+    def render(self):
+        families = self.collect()
+        with self._lock:
+            remotes = list(self._remotes.items())
+        for process, fn in remotes:
+            try:
+                collected = fn()
+            except Exception:
+                collected = None
+            tag = (("process", process),)
+            for name, kind, help, samples in collected or ():
+                families.append((name, kind, help, [(n, tag + tuple(l), v) for n, l, v in samples]))
+        # 같은 이름은 HELP/TYPE 를 한 번만 쓰고 샘플을 모아서 출력 (이름순 안정 정렬)
+        families.sort(key=lambda f: f[0])
+        lines = []
+        seen = set()
+        for name, kind, help, samples in families:
+            if name not in seen:
+                seen.add(name)
+                if help:
+                    lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+            for sample, labels, v in samples:
+                lines.append(f"{sample}{_fmt_labels(labels)} {_fmt_value(v)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class RemoteStats:
+    """
+    자식 프로세스 -> 부모 프로세스로 최신 통계 스냅샷(dict) 전달.
+    자식은 publish() 를 주기적으로 호출하고 (큐에는 최신 것만 남김), 부모는 latest() 로 마지막 것을 읽는다.
+    ProcessUnit 인자로 넘기면 spawn 시 큐만 자식에게 전달된다.
+    """
+
+    def __init__(self, ctx=None):
+        self._q = (ctx or mp.get_context("spawn")).Queue(maxsize=1)
+        self._init_local()
+
+    def _init_local(self):
+        self._lock = threading.Lock()
+        self._latest = None      # (보낸 시각 time.time(), payload)
+
+    def __getstate__(self):
+        return {"q": self._q}
+
+    def __setstate__(self, state):
+        self._q = state["q"]
+        self._init_local()
+
+    def publish(self, payload):
+        """ (자식) 스냅샷 전송. 부모가 아직 안 가져간 이전 스냅샷은 버린다 """
+        for _ in range(2):
+            try:
+                self._q.put_nowait((time.time(), payload))
+                return
+            except queue.Full:
+                try:
+                    self._q.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def latest(self, max_age_sec=None):
+        """ (부모) 마지막으로 받은 스냅샷. 없거나 max_age_sec 보다 오래됐으면 None """
+        with self._lock:
+            while True:
+                try:
+                    self._latest = self._q.get_nowait()
+                except (queue.Empty, OSError, EOFError):
+                    break
+            if self._latest is None:
+                return None
+            ts, payload = self._latest
+            if max_age_sec is not None and time.time() - ts > max_age_sec:
+                return None
+            return payload
+
+
+class LoopMonitor:
+    """
+    주기 루프의 실제 주기와 지터(목표 주기와의 차이) 기록.
+    루프 시작마다 tick() 을 호출한다.
+    """
+
+    def __init__(self, loop, period_sec=None, registry=None):
+        reg = registry or REGISTRY
+        labels = {"loop": loop}
+        self.period_sec = period_sec
+        self._period = reg.histogram("va_loop_period_seconds", "루프 시작 간격", labels)
+        self._jitter = reg.histogram("va_loop_jitter_seconds", "루프 시작 간격과 목표 주기의 차이 (절댓값)",
+                                     labels, buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                                                      0.05, 0.1, 0.25, 0.5, 1.0))
+        self._overruns = reg.counter("va_loop_overrun_total", "목표 주기를 넘긴 루프 수", labels)
+        self._last = None
+
+    def tick(self, now=None):
+        now = time.monotonic() if now is None else now
+        last, self._last = self._last, now
+        if last is None:
+            return
+        period = now - last
+        self._period.observe(period)
+        if self.period_sec:
+            self._jitter.observe(abs(period - self.period_sec))
+            if period > self.period_sec * 1.5:
+                self._overruns.inc()
+
+
+class StageMetricsTimer:
+    """ StageTimer 와 같은 record(stage, seconds) 인터페이스로 단계별 히스토그램에 기록 """
+
+    def __init__(self, name="va_vision_stage_seconds", help="비전 처리 단계별 소요 시간", registry=None):
+        self._reg = registry or REGISTRY
+        self.name = name
+        self.help = help
+        self._hist = {}
+
+    def record(self, stage, seconds):
+        h = self._hist.get(stage)
+        if h is None:
+            h = self._reg.histogram(self.name, self.help, {"stage": stage})
+            self._hist[stage] = h
+        h.observe(seconds)
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+try:
+    import fcntl  # 리눅스/파이: 동시 export 방지용 파일 잠금
+except ImportError:
+    fcntl = None
+
+# 캐시 위치: 환경변수 VA_MODEL_CACHE 로 변경 가능
+DEFAULT_CACHE_DIR = os.environ.get(
+    "VA_MODEL_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "video-analysis", "models"),
+)
+MANIFEST_FILE = "manifest.json"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(weights_sha256, fmt, imgsz, half=False, int8=False):
+    """가중치 해시 + export 옵션으로 만든 캐시 항목 이름"""
+    opts = f"{fmt}-{int(imgsz)}"
+    if half:
+        opts += "-half"
+    if int8:
+        opts += "-int8"
+    return f"{weights_sha256[:16]}-{opts}"
+
+
+def _ensure_weights(model_path):
+    """가중치 파일이 없으면 ultralytics 로 한 번 로드해서 내려받는다"""
+    if os.path.exists(model_path):
+        return model_path
+    from ultralytics import YOLO
+    model = YOLO(model_path)
+    ckpt = getattr(model, "ckpt_path", None)
+    if ckpt and os.path.exists(ckpt):
+        return ckpt
+    if os.path.exists(model_path):
+        return model_path
+    raise FileNotFoundError(f"모델 가중치를 찾을 수 없습니다: {model_path}")
+
+
+class _KeyLock:
+    """캐시 항목별 파일 잠금 (같은 모델을 여러 프로세스가 동시에 export 하지 않도록)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._f = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._f = open(self.path, "w")
+            fcntl.flock(self._f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._f is not None:
+            fcntl.flock(self._f, fcntl.LOCK_UN)
+            self._f.close()
+            self._f = None
+
+
+def _lookup(entry_dir):
+    manifest = os.path.join(entry_dir, MANIFEST_FILE)
+    if not os.path.isfile(manifest):
+        return None
+    try:
+        with open(manifest, "r") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    artifact = os.path.join(entry_dir, meta.get("artifact", ""))
+    if not meta.get("artifact") or not os.path.exists(artifact):
+        return None
+    return artifact
+
+
+def get_exported_model(model_path, fmt="ncnn", imgsz=640, half=False, int8=False, cache_dir=None):
+    """
+    export 된 모델 경로를 돌려준다. 같은 가중치/옵션으로 export 한 적이 있으면 캐시를 재사용.
+
+    export 는 임시 디렉터리에서 수행한 뒤 os.replace 로 캐시 항목에 옮기므로,
+    도중에 전원이 꺼져도 반쯤 만들어진 모델이 캐시에 남지 않는다.
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+
+    weights = _ensure_weights(model_path)
+    t0 = time.time()
+    digest = file_sha256(weights)
+    key = cache_key(digest, fmt, imgsz, half=half, int8=int8)
+    entry_dir = os.path.join(cache_dir, key)
+
+    artifact = _lookup(entry_dir)
+    if artifact is not None:
+        print(f"[ModelCache] 캐시 사용: {artifact} ({time.time() - t0:.2f}s)")
+        return artifact
+
+    with _KeyLock(os.path.join(cache_dir, key + ".lock")):
+        # 잠금 대기 중 다른 프로세스가 만들었을 수 있음
+        artifact = _lookup(entry_dir)
+        if artifact is not None:
+            return artifact
+
+        print(f"[ModelCache] export 시작: {weights} -> {fmt} (imgsz={imgsz}, half={half}, int8={int8})")
+        from ultralytics import YOLO
+
+        tmp_dir = tempfile.mkdtemp(prefix=key + ".tmp-", dir=cache_dir)
+        try:
+            # ultralytics 는 가중치 옆에 결과를 만들므로 임시 디렉터리로 복사해서 export
+            tmp_weights = os.path.join(tmp_dir, os.path.basename(weights))
+            shutil.copy2(weights, tmp_weights)
+            exported = YOLO(tmp_weights).export(format=fmt, imgsz=imgsz, half=half, int8=int8)
+            exported = os.path.abspath(str(exported))
+            artifact_name = os.path.basename(exported.rstrip(os.sep))
+
+            # export 결과만 남기고 중간 산출물(복사한 가중치, torchscript 등)은 삭제
+            for name in os.listdir(tmp_dir):
+                if name == artifact_name:
+                    continue
+                p = os.path.join(tmp_dir, name)
+                if os.path.isdir(p):
+                    shutil.rmtree(p, ignore_errors=True)
+                else:
+                    os.remove(p)
+
+            meta = {
+                "source": os.path.abspath(weights),
+                "sha256": digest,
+                "format": fmt,
+                "imgsz": int(imgsz),
+                "half": bool(half),
+                "int8": bool(int8),
+                "artifact": artifact_name,
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            # manifest 를 마지막에 써서 "manifest 가 있으면 완성된 항목" 이 되도록 함
+            with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+                json.dump(meta, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+
+            if os.path.isdir(entry_dir):
+                # 깨진 이전 항목(manifest 없음 등) 정리
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+        finally:
+            if os.path.isdir(tmp_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    artifact = os.path.join(entry_dir, artifact_name)
+    print(f"[ModelCache] export 완료: {artifact} ({time.time() - t0:.1f}s)")
+    return artifact
@@ -0,0 +1,99 @@
+import time
+
+import numpy as np
+
+
+class MotionGate:
+    """
+    프레임 차분 기반 추론 게이트.
+
+    color(회색조)/depth 를 step 간격으로 다운샘플해서 마지막으로 추론한 프레임과 비교하고,
+    변화량이 임계값 이하면 추론을 건너뛰도록 한다 (정차 중인 크레인 등 정적인 장면).
+    기준 프레임은 추론할 때만 갱신하므로 천천히 누적되는 변화도 결국 감지된다.
+    max_stale_frames / max_stale_sec 를 넘기면 변화가 없어도 강제로 다시 검출한다.
+    """
+
+    def __init__(self, step=8, color_threshold=6.0, depth_threshold_m=0.15,
+                 max_stale_frames=30, max_stale_sec=5.0, depth_scale=0.001):
+        self.step = max(1, int(step))
+        self.color_threshold = color_threshold      # 회색조 평균 절대차 (0~255)
+        self.depth_threshold_m = depth_threshold_m  # 유효 depth 평균 절대차 (m)
+        self.max_stale_frames = max_stale_frames
+        self.max_stale_sec = max_stale_sec
+        self.depth_scale = depth_scale
+
+        self._ref_gray = None
+        self._ref_depth = None
+        self._frames_since_run = 0
+        self._last_run_t = 0.0
+
+        # 통계
+        self.frames = 0
+        self.inferred = 0
+        self.skipped = 0
+        self.forced = 0
+        self.last_color_score = 0.0
+        self.last_depth_score = 0.0
+
+    def reset(self):
+        self._ref_gray = None
+        self._ref_depth = None
+
+    def _downsample(self, color_img, depth_img):
+        s = self.step
+        small = color_img[::s, ::s]
+        # 채널 합으로 근사 회색조 (정수 연산, 0~765 -> 0~255 로 환산)
+        gray = small.sum(axis=2, dtype=np.int32) // 3
+        depth = None
+        if depth_img is not None:
+            depth = depth_img[::s, ::s].astype(np.int32)
+        return gray, depth
+
+    def should_infer(self, color_img, depth_img=None):
+        """True 면 추론 실행, False 면 이전 검출 결과 재사용"""
+        self.frames += 1
+        now = time.monotonic()
+        gray, depth = self._downsample(color_img, depth_img)
+
+        run = False
+        if self._ref_gray is None or self._ref_gray.shape != gray.shape:
+            run = True
+        else:
+            self.last_color_score = float(np.abs(gray - self._ref_gray).mean())
+            self.last_depth_score = 0.0
+            if depth is not None and self._ref_depth is not None:
+                valid = (depth > 0) & (self._ref_depth > 0)
+                if np.any(valid):
+                    diff = np.abs(depth[valid] - self._ref_depth[valid])
+                    self.last_depth_score = float(diff.mean()) * self.depth_scale
+            changed = (self.last_color_score > self.color_threshold
+                       or self.last_depth_score > self.depth_threshold_m)
+            if changed:
+                run = True
+            elif (self._frames_since_run + 1 >= self.max_stale_frames
+                  or now - self._last_run_t >= self.max_stale_sec):
+                # 변화가 없어도 오래된 결과는 강제로 다시 검출
+                run = True
+                self.forced += 1
+
+        if run:
+            self._ref_gray = gray
+            self._ref_depth = depth
+            self._frames_since_run = 0
+            self._last_run_t = now
+            self.inferred += 1
+        else:
+            self._frames_since_run += 1
+            self.skipped += 1
+        return run
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "inferred": self.inferred,
+            "skipped": self.skipped,
+            "forced": self.forced,
+            "skip_ratio": round(self.skipped / self.frames, 3) if self.frames else 0.0,
+            "color_score": round(self.last_color_score, 2),
+            "depth_score_m": round(self.last_depth_score, 3),
+        }
@@ -0,0 +1,96 @@
+import threading
+import time
+from contextlib import contextmanager
+from collections import deque
+
+import numpy as np
+
+
+class StageTimer:
+    """
+    단계별 소요 시간 기록기. 단계마다 최근 maxlen 개 샘플만 유지한다.
+
+    processor / frame source / AnalysisApp 에 timer 로 넘기면 각 단계가 record() 를 호출한다.
+    """
+
+    def __init__(self, maxlen=4096):
+        self.maxlen = maxlen
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        buf = self._samples.get(stage)
+        if buf is None:
+            with self._lock:
+                buf = self._samples.setdefault(stage, deque(maxlen=self.maxlen))
+        buf.append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._samples = {}
+
+    def stages(self):
+        return list(self._samples.keys())
+
+    def summary(self):
+        """단계별 count / mean / p50 / p95 / p99 / max (ms)"""
+        out = {}
+        for stage, buf in list(self._samples.items()):
+            vals = np.fromiter(list(buf), dtype=np.float64) * 1000.0
+            if vals.size == 0:
+                continue
+            p50, p95, p99 = np.percentile(vals, [50, 95, 99])
+            out[stage] = {
+                "count": int(vals.size),
+                "mean_ms": round(float(vals.mean()), 3),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(vals.max()), 3),
+            }
+        return out
+
+
+class StartupProfile:
+    """기동 단계별 소요 시간 기록 (import, 모델 로드, 카메라, 워밍업 등)"""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self._phases = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except Exception:
+            ok = False
+            raise
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self._phases.append({
+                    "phase": name,
+                    "start_sec": round(start - self.t0, 3),
+                    "duration_sec": round(end - start, 3),
+                    "ok": ok,
+                })
+            print(f"[Startup] {name}: {end - start:.2f}s (기동 후 {end - self.t0:.2f}s)")
+
+    def mark(self, name):
+        """소요 시간 없이 시점만 기록 (예: 'vision_ready')"""
+        now = time.perf_counter()
+        with self._lock:
+            self._phases.append({
+                "phase": name,
+                "start_sec": round(now - self.t0, 3),
+                "duration_sec": 0.0,
+                "ok": True,
+            })
+        print(f"[Startup] {name} (기동 후 {now - self.t0:.2f}s)")
+
+    def report(self):
+        with self._lock:
+            return list(self._phases)
@@ -1,14 +1,16 @@
 import os
 import platform
-import pyrealsense2 as rs
 import numpy as np
 import cv2
-import torch
 import math
-from ultralytics import YOLO
+import threading
+import time
+from frame_source import RealSenseFrameSource
+from model_cache import get_exported_model
+from tracker import BoxTracker
+from depth_vis import DepthColorizer
 
-# [추가] 양자화 도구 임포트
-from onnxruntime.quantization import quantize_dynamic, QuantType
+# torch / ultralytics 는 import 비용이 커서 프로세서 생성 시점에 불러온다 (main 기동 지연 방지)
 
 class YOLORealSenseProcessor:
     def __init__(
@@ -21,8 +23,20 @@ class YOLORealSenseProcessor:
         max_det=20,
         use_tta=False,
         enable_depth_filters=None,
+        frame_source=None,
+        export_format='ncnn',
+        export_half=True,
+        export_int8=False,
+        model_cache_dir=None,
+        detect_interval=1,
+        redetect_conf=0.35,
+        motion_gate=None,
     ):
 
+        import torch
+        from ultralytics import YOLO
+        self._inference_mode = torch.inference_mode
+
         self._is_raspberry_pi = self._detect_raspberry_pi()
 
         if self._is_raspberry_pi:
@@ -37,14 +51,20 @@ class YOLORealSenseProcessor:
 
         # YOLO 로드
         self.device = device
-        # 파일 경로 정의
-        base_name = model_path.replace('.pt', '')
-        ncnn_path = base_name + 'yolo11n_ncnn_model'
-        
-        # 2. 일반 ONNX 모델이 없으면 먼저 생성 (pt -> onnx)
-        if not os.path.exists(ncnn_path):
-            ncnn_path = YOLO(model_path).export(format='ncnn', half=True)
+        # export 된 모델은 (가중치 해시, 포맷, imgsz, half/int8) 로 캐시해서 재부팅 시 재사용
+        if export_format:
+            ncnn_path = get_exported_model(model_path, fmt=export_format, imgsz=imgsz,
+                                           half=export_half, int8=export_int8,
+                                           cache_dir=model_cache_dir)
+        else:
+            ncnn_path = model_path
         self.model = YOLO(ncnn_path)   # ✅ 항상 로드
+        # set_imgsz() 에서 다른 입력 크기로 다시 export/로드할 때 사용
+        self._export_args = dict(model_path=model_path, fmt=export_format, half=export_half,
+                                 int8=export_int8, cache_dir=model_cache_dir)
+        # set_imgsz() 의 백그라운드 로드가 끝나면 (model, imgsz) 를 함께 교체
+        self._model_lock = threading.Lock()
+        self._imgsz_thread = None
 
 
         # 추론 파라미터
@@ -53,30 +73,22 @@ class YOLORealSenseProcessor:
         self.imgsz = imgsz
         self.max_det = max_det
         self.use_tta = use_tta
-        
-        # [수정] 라즈베리파이인 경우 FPS를 6으로, PC면 15~30으로 설정
-        target_fps = 15 if self._is_raspberry_pi else 30
-        
-        # RealSense 파이프라인
-        self.pipeline = rs.pipeline()
-        config = rs.config()
-        config.enable_stream(rs.stream.depth, 640, 360, rs.format.z16, target_fps)
-        config.enable_stream(rs.stream.color, 640, 360, rs.format.bgr8, target_fps)
-        self.profile = self.pipeline.start(config)
-        color_stream = self.profile.get_stream(rs.stream.color).as_video_stream_profile()
-        intr = color_stream.get_intrinsics()
-        self.fy = float(intr.fy)
-        self.person_h_m = 1.7
-
-        sensor = self.profile.get_device().first_depth_sensor()
-        self.depth_scale = sensor.get_depth_scale()
-        try:
-            sensor.set_option(rs.option.laser_power, 360)  # 기기별 허용 범위 다름
-        except Exception:
-            pass
-
-        self.align = rs.align(rs.stream.color)
 
+        # 검출-추적 모드: 검출기는 detect_interval 프레임마다(또는 추적 중 감쇠된 신뢰도가
+        # redetect_conf 아래로 떨어지면) 실행하고, 그 사이는 트래커가 박스를 이어준다
+        self.detect_interval = max(1, int(detect_interval))
+        self.redetect_conf = redetect_conf
+        self.tracker = BoxTracker()
+        self._frames_since_detect = self.detect_interval  # 첫 프레임은 항상 검출
+        self._last_names_map = {}
+        self.detector_runs = 0
+        self.tracked_frames = 0
+
+        # 움직임 게이트 (motion_gate.MotionGate): 장면 변화가 없으면 마지막 검출 결과 재사용
+        self.motion_gate = motion_gate
+        self._last_result = ([], [], [], {})
+        self._gate_skipped = False   # 직전 프레임을 게이트가 건너뛰었는지
+        
         # Depth 필터
         if enable_depth_filters is None:
             # 기본값: 파이에서는 비활성화, 그 외에는 활성화
@@ -84,18 +96,85 @@ class YOLORealSenseProcessor:
         else:
             self.enable_depth_filters = bool(enable_depth_filters)
 
-        if self.enable_depth_filters:
-            self.spatial = rs.spatial_filter()
-            self.spatial.set_option(rs.option.filter_magnitude, 5)
-            self.spatial.set_option(rs.option.filter_smooth_alpha, 0.5)
-            self.spatial.set_option(rs.option.filter_smooth_delta, 20)
+        # 프레임 소스 (기본: RealSense 카메라, 녹화 파일 등으로 교체 가능)
+        if frame_source is None:
+            # [수정] 라즈베리파이인 경우 FPS를 6으로, PC면 15~30으로 설정
+            target_fps = 15 if self._is_raspberry_pi else 30
+            frame_source = RealSenseFrameSource(
+                width=640, height=360, fps=target_fps,
+                enable_depth_filters=self.enable_depth_filters,
+            )
+        self.source = frame_source
+        self._source_running = False
+        self.start()
 
-            self.temporal = rs.temporal_filter()
-        else:
-            self.spatial = None
-            self.temporal = None
-        # self.hole_filling = rs.hole_filling_filter()
-        # self.hole_filling.set_option(rs.option.holes_fill, 2)
+        self.fy = float(self.source.fy)
+        self.person_h_m = 1.7
+        self.depth_scale = self.source.depth_scale
+        if self.motion_gate is not None:
+            self.motion_gate.depth_scale = self.depth_scale
+
+        # depth 시각화용 LUT 컬러라이저 (0~4m, depth_scale 변경 시 자동 재생성)
+        self.depth_colorizer = DepthColorizer(clip_min_m=0.0, clip_max_m=4.0)
+
+        # 단계별 시간 측정 (perf_stats.StageTimer, 벤치마크/모니터링용)
+        self.timer = None
+        # 마지막 get_frame 의 처리 시간 (카메라 대기 제외, 초) - RateGovernor 입력
+        self.last_process_sec = 0.0
+
+    def warmup(self, n=2):
+        """ 더미 프레임으로 추론을 n 회 실행 (첫 추론의 그래프/메모리 초기화 비용을 미리 지불) """
+        h = int(getattr(self.source, "height", 360) or 360)
+        w = int(getattr(self.source, "width", 640) or 640)
+        dummy = np.zeros((h, w, 3), dtype=np.uint8)
+        for _ in range(max(0, int(n))):
+            self._infer(dummy)
+
+    def set_imgsz(self, imgsz):
+        """
+        추론 입력 크기 변경. export 된 모델은 입력 크기가 고정이라 해당 크기로 export 된 모델을
+        캐시에서 로드한다 (캐시에 없으면 export 하므로 처음 한 번은 오래 걸릴 수 있음).
+        export/로드는 백그라운드 스레드에서 하고, 그동안은 기존 모델로 계속 추론한다.
+        이미 로드 중이면 무시한다.
+        """
+        imgsz = int(imgsz)
+        if imgsz == self.imgsz:
+            return
+        if not self._export_args["fmt"]:
+            with self._model_lock:
+                self.imgsz = imgsz
+            return
+        if self._imgsz_thread is not None and self._imgsz_thread.is_alive():
+            return
+        self._imgsz_thread = threading.Thread(target=self._load_imgsz, args=(imgsz,),
+                                              name="imgsz-load", daemon=True)
+        self._imgsz_thread.start()
+
+    def _load_imgsz(self, imgsz):
+        args = self._export_args
+        try:
+            from ultralytics import YOLO
+            path = get_exported_model(args["model_path"], fmt=args["fmt"], imgsz=imgsz,
+                                      half=args["half"], int8=args["int8"], cache_dir=args["cache_dir"])
+            model = YOLO(path)
+        except Exception as e:
+            print(f"[Processor] [ERROR] imgsz {imgsz} 모델 로드 실패, {self.imgsz} 유지: {e}")
+            return
+        with self._model_lock:
+            self.model = model
+            self.imgsz = imgsz
+        print(f"[Processor] imgsz {imgsz} 모델로 교체")
+
+    def set_timer(self, timer):
+        """ 단계별 소요 시간 기록기 연결 (None 이면 측정 안 함) """
+        self.timer = timer
+        self.source.timer = timer
+
+    def _lap(self, stage, t0):
+        t1 = time.perf_counter()
+        if self.timer is not None:
+            self.timer.record(stage, t1 - t0)
+        return t1
 
     def _distance_from_roi_closest40_mean(self, depth_img, x1, y1, x2, y2):
         h, w = depth_img.shape[:2]
@@ -128,6 +207,69 @@ class YOLORealSenseProcessor:
         closest = np.partition(vals, k - 1)[:k]
         return float(closest.mean())
 
+    def _distances_from_rois_batch(self, depth_img, boxes_xyxy):
+        """
+        _distance_from_roi_closest40_mean 의 배치 버전. 한 프레임의 모든 박스를 한 번에 계산한다.
+
+        박스마다 cv2.resize(fx=0.25, INTER_NEAREST) 와 같은 4픽셀 간격 샘플을 모아
+        한 번의 gather 로 미터 단위 depth 벡터를 만들고, 박스(세그먼트)별 가까운 10% 평균을 구한다.
+        결과는 기존 함수와 같다 (평균 누적만 float64 라 float32 반올림 오차 수준 차이).
+        """
+        n = len(boxes_xyxy)
+        out = np.zeros(n, dtype=np.float64)
+        if n == 0:
+            return out
+
+        h, w = depth_img.shape[:2]
+        b = np.asarray(boxes_xyxy, dtype=np.int64).reshape(n, 4)
+        x1 = np.clip(b[:, 0], 0, w - 1)
+        y1 = np.clip(b[:, 1], 0, h - 1)
+        x2 = np.clip(b[:, 2], 0, w - 1)
+        y2 = np.clip(b[:, 3], 0, h - 1)
+        rw = x2 - x1
+        rh = y2 - y1
+
+        # cv2.resize 출력 크기와 동일 (반올림, half-to-even)
+        nw = np.rint(rw * 0.25).astype(np.int64)
+        nh = np.rint(rh * 0.25).astype(np.int64)
+        valid = (rw > 0) & (rh > 0) & (nw > 0) & (nh > 0)
+        counts = np.where(valid, nw * nh, 0)
+        total = int(counts.sum())
+        if total == 0:
+            return out
+
+        # 박스별 샘플 좌표 (ROI 원점 기준 4픽셀 간격)
+        seg = np.repeat(np.arange(n), counts)
+        starts = np.cumsum(counts) - counts
+        local = np.arange(total) - starts[seg]
+        nw_s = nw[seg]
+        ys = y1[seg] + np.minimum((local // nw_s) * 4, rh[seg] - 1)
+        xs = x1[seg] + np.minimum((local % nw_s) * 4, rw[seg] - 1)
+
+        # 프레임당 한 번: 샘플 gather + 미터 변환 + 노이즈 컷
+        vals = depth_img[ys, xs].astype(np.float32) * np.float32(self.depth_scale)
+        keep = (vals >= 0.1) & (vals <= 40.0)
+        vals = vals[keep]
+        seg = seg[keep]
+        if vals.size == 0:
+            return out
+
+        cnt = np.bincount(seg, minlength=n)
+        k = np.maximum(1, (0.10 * cnt).astype(np.int64))
+
+        # 세그먼트 -> 값 순 정렬 후 세그먼트별 앞쪽 k개만 합산
+        order = np.lexsort((vals, seg))
+        seg_s = seg[order]
+        vals_s = vals[order]
+        seg_starts = np.cumsum(cnt) - cnt
+        rank = np.arange(vals_s.size) - seg_starts[seg_s]
+        take = rank < k[seg_s]
+        sums = np.bincount(seg_s[take], weights=vals_s[take].astype(np.float64), minlength=n)
+
+        has = cnt > 0
+        out[has] = sums[has] / k[has]
+        return out
+
     def _estimate_distance_from_bbox(self, x1, y1, x2, y2):
         h_px = max(1, (y2 - y1))
         fy = getattr(self, "fy", None)
@@ -140,30 +282,22 @@ class YOLORealSenseProcessor:
         return Z
 
 
-    def get_frame(self, return_depth_vis=False):
-        frames = self.pipeline.wait_for_frames()
-        aligned = self.align.process(frames)
-        depth_frame = aligned.get_depth_frame()
-        color_frame = aligned.get_color_frame()
-        if not depth_frame or not color_frame:
-            return None, []
-
-        # 필터 적용
-        if self.spatial is not None:
-            depth_frame = self.spatial.process(depth_frame)
-        if self.temporal is not None:
-            depth_frame = self.temporal.process(depth_frame)
-        # depth_frame = self.hole_filling.process(depth_frame)
-
-        color_img = np.asanyarray(color_frame.get_data())
-        depth_img = np.asanyarray(depth_frame.get_data())
-        H, W = color_img.shape[:2]
-
-        # YOLO 추론 (사람만)
-        with torch.inference_mode():
-            result = self.model.predict(
+    # -------------------------------
+    # 프레임 처리 단계 (순차/파이프라인 모드 공용)
+    # -------------------------------
+    def _acquire(self):
+        """프레임 소스에서 color/depth 취득 (RealSense 는 정렬 + depth 필터 포함)"""
+        return self.source.read()
+
+    def _infer(self, color_img):
+        """YOLO 추론 (사람만). (boxes, scores, clses, names_map) 반환"""
+        t0 = time.perf_counter()
+        with self._model_lock:
+            model, imgsz = self.model, self.imgsz
+        with self._inference_mode():
+            result = model.predict(
                 source=color_img,
-                imgsz=self.imgsz,
+                imgsz=imgsz,
                 conf=self.conf_threshold,
                 iou=self.iou_threshold,
                 max_det=self.max_det,
@@ -172,6 +306,7 @@ class YOLORealSenseProcessor:
                 verbose=False,
                 augment=self.use_tta,
             )[0]
+        t0 = self._lap("predict", t0)
 
         boxes, scores, clses = [], [], []
         for box in result.boxes:
@@ -182,22 +317,93 @@ class YOLORealSenseProcessor:
             scores.append(conf)
             clses.append(cls_id)
 
+        names_map = result.names if hasattr(result, "names") else {}
+        self._lap("box_extract", t0)
+        return boxes, scores, clses, names_map
+
+    def _should_detect(self):
+        if self.detect_interval <= 1:
+            return True
+        if self._frames_since_detect + 1 >= self.detect_interval:
+            return True
+        return self.tracker.needs_redetect(self.redetect_conf)
+
+    def _infer_or_track(self, color_img, depth_img=None):
+        """
+        검출 주기면 YOLO 추론, 아니면 트래커로 이전 박스를 전파. _infer 와 같은 형태로 반환.
+        움직임 게이트가 있으면 장면 변화가 없을 때 마지막 결과를 그대로 재사용한다.
+        게이트가 건너뛰던 중에 다시 실행시키면(변화 감지 또는 max_stale 강제) 트래커 전파가 아니라
+        실제 검출을 돌린다 (건너뛴 동안 트래커는 멈춰 있었으므로).
+        """
+        if self.motion_gate is not None:
+            t0 = time.perf_counter()
+            run = self.motion_gate.should_infer(color_img, depth_img)
+            self._lap("motion_gate", t0)
+            if not run:
+                self._gate_skipped = True
+                return self._last_result
+            if self._gate_skipped:
+                self._gate_skipped = False
+                self._frames_since_detect = self.detect_interval   # 다음 _should_detect() 가 True
+
+        result = self._infer_or_track_inner(color_img)
+        self._last_result = result
+        return result
+
+    def _infer_or_track_inner(self, color_img):
+        if self._should_detect():
+            boxes, scores, clses, names_map = self._infer(color_img)
+            self.detector_runs += 1
+            self._frames_since_detect = 0
+            self._last_names_map = names_map
+            if self.detect_interval > 1:
+                H, W = color_img.shape[:2]
+                self.tracker.frame_size = (W, H)
+                self.tracker.update(boxes, scores, clses)
+            return boxes, scores, clses, names_map
+
+        t0 = time.perf_counter()
+        boxes, scores, clses = self.tracker.predict()
+        self._frames_since_detect += 1
+        self.tracked_frames += 1
+        self._lap("track", t0)
+        return boxes, scores, clses, self._last_names_map
+
+    def detection_stats(self):
+        total = self.detector_runs + self.tracked_frames
+        return {
+            "detect_interval": self.detect_interval,
+            "detector_runs": self.detector_runs,
+            "tracked_frames": self.tracked_frames,
+            "detector_ratio": round(self.detector_runs / total, 3) if total else 1.0,
+            "motion_gate": self.motion_gate.stats() if self.motion_gate is not None else None,
+        }
+
+    def _postprocess(self, color_img, depth_img, boxes, scores, clses, names_map,
+                     return_depth_vis=False, annotate=True):
+        """
+        박스별 거리 계산 + 시각화. (frame, detections) 반환.
+        annotate=False 면 그리기/depth 시각화를 생략하고 원본 color_img 를 그대로 돌려준다.
+        그릴 때는 복사본에 그리므로 원본 프레임은 변경되지 않는다.
+        """
+        H, W = color_img.shape[:2]
+
         all_boxes = []
         detections = []
 
-        names_map = result.names if hasattr(result, "names") else {}
+        int_boxes = [tuple(map(int, bx)) for bx in boxes]
+
+        # 거리 계산 (depth 기반) - 프레임의 모든 박스를 한 번에
+        t0 = time.perf_counter()
+        depth_dists = self._distances_from_rois_batch(depth_img, int_boxes)
 
-        for (x1, y1, x2, y2), _conf, cls_id in zip(boxes, scores, clses):
-            x1, y1, x2, y2 = map(int, (x1, y1, x2, y2))
+        for (x1, y1, x2, y2), d_depth, cls_id in zip(int_boxes, depth_dists, clses):
             label = names_map.get(cls_id, "obj")
 
             # bbox 크기
             w = max(1, (x2 - x1))
             h = max(1, (y2 - y1))
 
-            # 거리 계산 (depth 기반)
-            d_depth = self._distance_from_roi_closest40_mean(depth_img, x1, y1, x2, y2)
-
             # ✅ 추정거리(bbox 기반)는 항상 계산
             d_est = self._estimate_distance_from_bbox(x1, y1, x2, y2)
 
@@ -236,39 +442,63 @@ class YOLORealSenseProcessor:
                 # ✅ UI 표시용 bbox 크기
                 "bbox_w": int(w),
                 "bbox_h": int(h),
+                "bbox": (int(x1), int(y1), int(x2), int(y2)),
 
                 "center": round(center_norm, 4)
             })
 
-        # 시각화(박스 + 라벨)
+        t0 = self._lap("depth_sampling", t0)
+
+        if not annotate:
+            # 스트림 시청자가 없으면 그리기 생략 (헤드리스 운용)
+            return color_img, detections
+
+        # 시각화(박스 + 라벨) - 원본은 다른 소비자를 위해 보존
+        vis_img = color_img.copy()
         for x1, y1, x2, y2, label, d_depth_out, d_est_out, w, h, center_norm in all_boxes:
             color = (0, 255, 0)
 
             depth_txt = f"{d_depth_out:.2f}m" if isinstance(d_depth_out, (int, float)) else "N/A"
             txt = f"depth:{depth_txt}"
 
-            cv2.rectangle(color_img, (x1, y1), (x2, y2), color, 2)
-            cv2.putText(color_img, txt, (x1, y1 - 10),
+            cv2.rectangle(vis_img, (x1, y1), (x2, y2), color, 2)
+            cv2.putText(vis_img, txt, (x1, y1 - 10),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+        t0 = self._lap("draw", t0)
 
         if return_depth_vis:
-            # depth 시각화
-            depth_m = depth_img.astype(np.float32) * self.depth_scale
-            depth_clip = np.clip(depth_m, 0.0, 4.0)
-            depth_u8 = ((depth_clip / 4.0) * 255).astype(np.uint8)
-            depth_color = cv2.applyColorMap(depth_u8, cv2.COLORMAP_JET)
-            depth_color = cv2.resize(depth_color, (color_img.shape[1], color_img.shape[0]))
-
-            combined = np.hstack((color_img, depth_color))
+            # depth 시각화 (LUT 한 번으로 컬러맵 + 좌우 합성, 버퍼 재사용)
+            combined = self.depth_colorizer.compose(vis_img, depth_img, self.depth_scale)
+            self._lap("depth_vis", t0)
             return combined, detections
         else:
-            return color_img, detections
+            return vis_img, detections
+
+    def get_frame(self, return_depth_vis=False, annotate=True):
+        color_img, depth_img = self._acquire()
+        if color_img is None:
+            return None, []
+
+        t0 = time.perf_counter()
+        boxes, scores, clses, names_map = self._infer_or_track(color_img, depth_img)
+        out = self._postprocess(color_img, depth_img, boxes, scores, clses, names_map,
+                                return_depth_vis=return_depth_vis, annotate=annotate)
+        self.last_process_sec = time.perf_counter() - t0
+        return out
+
+    def start(self):
+        """ 프레임 소스 열기. stop() 후 다시 호출하면 소스를 다시 연다 """
+        if self._source_running:
+            return
+        self.source.start()
+        self._source_running = True
 
     def stop(self):
         try:
-            self.pipeline.stop()
+            self.source.stop()
         except Exception:
             pass
+        self._source_running = False
 
     def __del__(self):
         self.stop()
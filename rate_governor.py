@@ -0,0 +1,200 @@
+import glob
+import os
+import time
+
+
+class SystemSensors:
+    """
+    CPU 사용률(/proc/stat) 과 SoC 온도(/sys/class/thermal) 읽기.
+    읽을 수 없는 환경(PC, 컨테이너 등)에서는 None 을 반환한다.
+    """
+
+    def __init__(self, thermal_zone=None):
+        self._prev_cpu = None
+        self._temp_path = thermal_zone or self._find_thermal_zone()
+
+    @staticmethod
+    def _find_thermal_zone():
+        zones = sorted(glob.glob("/sys/class/thermal/thermal_zone*"))
+        # 라즈베리파이: cpu-thermal, 그 외에는 첫 번째 zone
+        for z in zones:
+            try:
+                with open(os.path.join(z, "type"), "r") as f:
+                    if "cpu" in f.read().lower():
+                        return os.path.join(z, "temp")
+            except OSError:
+                continue
+        return os.path.join(zones[0], "temp") if zones else None
+
+    def cpu_percent(self):
+        """ 직전 호출 이후의 전체 CPU 사용률 (%). 첫 호출은 None """
+        try:
+            with open("/proc/stat", "r") as f:
+                fields = [float(x) for x in f.readline().split()[1:]]
+        except (OSError, ValueError):
+            return None
+        idle = fields[3] + (fields[4] if len(fields) > 4 else 0.0)   # idle + iowait
+        total = sum(fields)
+        prev, self._prev_cpu = self._prev_cpu, (idle, total)
+        if prev is None or total <= prev[1]:
+            return None
+        return 100.0 * (1.0 - (idle - prev[0]) / (total - prev[1]))
+
+    def soc_temp_c(self):
+        if not self._temp_path:
+            return None
+        try:
+            with open(self._temp_path, "r") as f:
+                return float(f.read().strip()) / 1000.0
+        except (OSError, ValueError):
+            return None
+
+
+class RateGovernor:
+    """
+    캡처 루프 목표 FPS 를 추론 지연, CPU 부하, SoC 온도로 조절한다.
+
+    - 추론 지연(EMA)으로 낼 수 있는 상한을 잡고, CPU 가 여유 있으면 천천히 올리고(+1fps)
+      부하/온도가 높으면 빠르게 내린다(x0.8). 온도가 temp_hard_c 이상이면 min_fps 로.
+    - min_fps 는 항상 보장하는 최소 검출률. 지연 때문에 min_fps 도 못 맞추면
+      (imgsz_steps 지정 시) 입력 크기를 한 단계 줄이고, 여유가 충분하면 다시 올린다.
+    - adjust_camera_fps=True 면 카메라 FPS 를 목표 이상인 가장 낮은 단계로 맞춘다
+      (RealSense 는 파이프라인 재시작이 필요하므로 cooldown 을 둔다).
+    """
+
+    def __init__(self, min_fps=5.0, max_fps=15.0, start_fps=None, update_sec=1.0,
+                 latency_alpha=0.2, latency_headroom=1.15, cpu_high=90.0, cpu_low=70.0,
+                 temp_soft_c=70.0, temp_hard_c=80.0, imgsz_steps=None, imgsz_cooldown_sec=30.0,
+                 adjust_camera_fps=False, camera_fps_steps=(6, 15, 30), camera_cooldown_sec=10.0,
+                 sensors=None):
+        self.min_fps = float(min_fps)
+        self.max_fps = max(float(max_fps), self.min_fps)
+        self.update_sec = update_sec
+        self.latency_alpha = latency_alpha
+        self.latency_headroom = latency_headroom
+        self.cpu_high = cpu_high
+        self.cpu_low = cpu_low
+        self.temp_soft_c = temp_soft_c
+        self.temp_hard_c = temp_hard_c
+        self.imgsz_steps = sorted(imgsz_steps) if imgsz_steps else None
+        self.imgsz_cooldown_sec = imgsz_cooldown_sec
+        self.adjust_camera_fps = adjust_camera_fps
+        self.camera_fps_steps = sorted(camera_fps_steps)
+        self.camera_cooldown_sec = camera_cooldown_sec
+        self.sensors = sensors or SystemSensors()
+
+        self.processor = None
+        self.target_fps = float(start_fps) if start_fps else self.max_fps
+        self.latency = None          # 프레임 처리 시간 EMA (초)
+        self.cpu = None
+        self.temp_c = None
+        self.reason = "init"
+        self.changes = 0
+        self._last_update = 0.0
+        self._last_imgsz_change = 0.0
+        self._last_camera_change = 0.0
+
+    def attach(self, processor):
+        """ imgsz / 카메라 FPS 조절 대상 (YOLORealSenseProcessor) """
+        self.processor = processor
+
+    def observe(self, latency_sec):
+        if latency_sec <= 0:
+            return
+        if self.latency is None:
+            self.latency = latency_sec
+        else:
+            a = self.latency_alpha
+            self.latency = a * latency_sec + (1.0 - a) * self.latency
+
+    def frame_interval(self):
+        return 1.0 / self.target_fps if self.target_fps > 0 else 0.0
+
+    def latency_cap(self):
+        """ 현재 처리 지연으로 낼 수 있는 최대 FPS """
+        if not self.latency:
+            return self.max_fps
+        return 1.0 / (self.latency * self.latency_headroom)
+
+    def update(self, now=None):
+        """ update_sec 마다 목표 FPS 재계산. 캡처 루프에서 매 프레임 호출해도 된다 """
+        now = time.monotonic() if now is None else now
+        if now - self._last_update < self.update_sec:
+            return self.target_fps
+        self._last_update = now
+
+        self.cpu = self.sensors.cpu_percent()
+        self.temp_c = self.sensors.soc_temp_c()
+        cap = self.latency_cap()
+        fps = self.target_fps
+
+        if self.temp_c is not None and self.temp_c >= self.temp_hard_c:
+            fps, reason = self.min_fps, "thermal_hard"
+        elif self.temp_c is not None and self.temp_c >= self.temp_soft_c:
+            fps, reason = fps * 0.8, "thermal_soft"
+        elif self.cpu is not None and self.cpu >= self.cpu_high:
+            fps, reason = fps * 0.8, "cpu_high"
+        elif self.cpu is None or self.cpu <= self.cpu_low:
+            fps, reason = fps + 1.0, "headroom"
+        else:
+            reason = "hold"
+
+        if fps > cap:
+            fps, reason = cap, "latency"
+        fps = max(self.min_fps, min(self.max_fps, fps))
+        if abs(fps - self.target_fps) >= 0.05:
+            self.changes += 1
+        self.target_fps = fps
+        self.reason = reason
+
+        if self.processor is not None:
+            self._adjust_imgsz(now, cap)
+            self._adjust_camera_fps(now)
+        return self.target_fps
+
+    def _adjust_imgsz(self, now, cap):
+        if not self.imgsz_steps or now - self._last_imgsz_change < self.imgsz_cooldown_sec:
+            return
+        cur = int(self.processor.imgsz)
+        smaller = [s for s in self.imgsz_steps if s < cur]
+        larger = [s for s in self.imgsz_steps if s > cur]
+        hot = self.temp_c is not None and self.temp_c >= self.temp_soft_c
+        if (cap < self.min_fps or (hot and self.target_fps <= self.min_fps)) and smaller:
+            new = smaller[-1]
+        elif (cap > self.max_fps * 1.5 and not hot and larger
+              and (self.cpu is None or self.cpu <= self.cpu_low)):
+            new = larger[0]
+        else:
+            return
+        print(f"[Governor] imgsz {cur} -> {new} (cap={cap:.1f}fps, temp={self.temp_c})")
+        self.processor.set_imgsz(new)
+        self.latency = None   # 새 크기로 다시 측정
+        self._last_imgsz_change = now
+
+    def _adjust_camera_fps(self, now):
+        if not self.adjust_camera_fps or now - self._last_camera_change < self.camera_cooldown_sec:
+            return
+        source = getattr(self.processor, "source", None)
+        if source is None:
+            return
+        want = next((s for s in self.camera_fps_steps if s >= self.target_fps), self.camera_fps_steps[-1])
+        if int(source.fps) == int(want):
+            return
+        print(f"[Governor] camera fps {source.fps} -> {want}")
+        source.set_fps(want)
+        self._last_camera_change = now
+
+    def stats(self):
+        return {
+            "target_fps": round(self.target_fps, 2),
+            "min_fps": self.min_fps,
+            "max_fps": self.max_fps,
+            "latency_ms": round(self.latency * 1000.0, 2) if self.latency else None,
+            "latency_cap_fps": round(self.latency_cap(), 2),
+            "cpu_percent": round(self.cpu, 1) if self.cpu is not None else None,
+            "soc_temp_c": round(self.temp_c, 1) if self.temp_c is not None else None,
+            "imgsz": int(self.processor.imgsz) if self.processor is not None else None,
+            "camera_fps": getattr(getattr(self.processor, "source", None), "fps", None),
+            "reason": self.reason,
+            "changes": self.changes,
+        }
@@ -0,0 +1,283 @@
+"""
+주기 작업 스케줄러 (monotonic 시계 + heap).
+
+워커마다 스레드를 두고 time.time() 차이와 0.1초 sleep 으로 주기를 맞추던 방식 대신, 하나의
+스케줄러 스레드가 모든 주기 작업의 마감 시각을 heap 으로 관리한다.
+
+- 마감 시각은 시작 시각 + n * period 로만 계산하므로 실행 시간/지연이 누적되지 않는다 (drift 없음).
+- 실행이 다음 마감을 넘기면 overrun 으로 세고, 밀린 슬롯은 건너뛰어 가장 최근 슬롯부터 다시 맞춘다.
+- 작업별로 지연(실제 시작 - 마감, = 지터), 실행 시간, overrun, 건너뛴 슬롯 수를 기록한다
+  (/metrics: va_sched_*).
+- inline=False 작업(블로킹 I/O 등)은 작업 전용 실행 스레드에서 돌리고 타이밍만 스케줄러가 잡는다.
+  이전 실행이 끝나지 않았으면 이번 슬롯은 건너뛴다.
+- 작업 예외는 잡아서 기록만 하므로, 워커의 is_alive() 는 Task.is_healthy() 로 연속 실패/멈춤을
+  판단해서 supervisor 가 재시작할 수 있게 한다.
+
+    sched = default_scheduler()
+    task = sched.every("transmit", 0.5, worker.tick)
+    sched.call_later(0.05, send_alert)   # 1회 실행
+    task.cancel()
+"""
+import heapq
+import itertools
+import threading
+import time
+
+from metrics import REGISTRY
+
+
+class Task:
+    def __init__(self, scheduler, name, fn, period_sec, inline=True):
+        self.scheduler = scheduler
+        self.name = name
+        self.fn = fn
+        self.period_sec = period_sec    # None 이면 1회 실행
+        self.inline = inline
+        self.deadline = 0.0
+        self.active = True
+
+        self.runs = 0
+        self.overruns = 0
+        self.missed = 0                 # 건너뛴 슬롯 수
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.last_error = None
+        self.last_ok = time.monotonic()  # 마지막으로 예외 없이 끝난 시각 (등록 시각으로 시작)
+        self.lateness_max = 0.0
+        self._lateness_sum = 0.0
+        self.run_max = 0.0
+        self._run_sum = 0.0
+        self._idle = threading.Event()  # 실행 중이 아니면 set
+        self._idle.set()
+        self._go = None                 # inline=False: 실행 스레드 깨우기
+        self._dispatched = 0.0          # inline=False: 실행 스레드에 넘긴 슬롯의 마감 시각
+        self._runner = None
+
+        if period_sec is not None:
+            labels = {"task": name}
+            self._m_late = REGISTRY.histogram(
+                "va_sched_lateness_seconds", "마감 대비 실제 시작 지연 (지터)", labels,
+                buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+            self._m_run = REGISTRY.histogram("va_sched_run_seconds", "작업 1회 실행 시간", labels)
+            self._m_overrun = REGISTRY.counter("va_sched_overrun_total", "다음 마감을 넘긴 실행 수", labels)
+            self._m_missed = REGISTRY.counter("va_sched_missed_total", "overrun 으로 건너뛴 슬롯 수", labels)
+        else:
+            self._m_late = self._m_run = self._m_overrun = self._m_missed = None
+
+    def cancel(self):
+        self.active = False
+        self.scheduler._wake()
+        if self._go is not None:
+            self._go.set()
+
+    def is_healthy(self, max_errors=5, stale_sec=None):
+        """
+        활성 상태이고, 연속 예외가 max_errors 미만이고, 마지막 정상 실행이 stale_sec 이내면 True.
+        stale_sec 기본값은 max(10 주기, 5초) (실행 스레드가 멈춘 inline=False 작업 등).
+        """
+        if not self.active:
+            return False
+        if self.consecutive_errors >= max_errors:
+            return False
+        if self.period_sec is None:
+            return True
+        if stale_sec is None:
+            stale_sec = max(10 * self.period_sec, 5.0)
+        return time.monotonic() - self.last_ok < stale_sec
+
+    def wait_idle(self, timeout=None):
+        """ 진행 중인 실행이 끝날 때까지 대기 (cancel 후 join 용도) """
+        return self._idle.wait(timeout)
+
+    def _execute(self, deadline):
+        start = time.monotonic()
+        late = max(0.0, start - deadline)
+        try:
+            self.fn()
+        except Exception as e:
+            self.errors += 1
+            self.consecutive_errors += 1
+            self.last_error = str(e)
+            print(f"[Scheduler] [ERROR] {self.name} 실행 중 예외: {e}")
+        else:
+            self.consecutive_errors = 0
+            self.last_ok = time.monotonic()
+        dur = time.monotonic() - start
+        self.runs += 1
+        self._lateness_sum += late
+        self.lateness_max = max(self.lateness_max, late)
+        self._run_sum += dur
+        self.run_max = max(self.run_max, dur)
+        if self._m_late is not None:
+            self._m_late.observe(late)
+            self._m_run.observe(dur)
+
+    def _note_overrun(self, missed):
+        self.overruns += 1
+        self.missed += missed
+        if self._m_overrun is not None:
+            self._m_overrun.inc()
+            if missed:
+                self._m_missed.inc(missed)
+
+    def _runner_loop(self):
+        while self.active:
+            self._go.wait()
+            self._go.clear()
+            if not self.active:
+                break
+            self._execute(self._dispatched)
+            self._idle.set()
+        self._idle.set()
+
+    def stats(self):
+        n = self.runs or 1
+        return {
+            "period_sec": self.period_sec,
+            "inline": self.inline,
+            "active": self.active,
+            "runs": self.runs,
+            "overruns": self.overruns,
+            "missed": self.missed,
+            "errors": self.errors,
+            "consecutive_errors": self.consecutive_errors,
+            "lateness_ms_avg": round(self._lateness_sum / n * 1000.0, 3),
+            "lateness_ms_max": round(self.lateness_max * 1000.0, 3),
+            "run_ms_avg": round(self._run_sum / n * 1000.0, 3),
+            "run_ms_max": round(self.run_max * 1000.0, 3),
+            "last_error": self.last_error,
+        }
+
+
+class Scheduler:
+    def __init__(self, name="scheduler"):
+        self.name = name
+        self._cond = threading.Condition()
+        self._heap = []                 # (deadline, seq, task)
+        self._seq = itertools.count()
+        self._tasks = []
+        self._running = False
+        self._th = None
+
+    # -------------------------------
+    # 작업 등록
+    # -------------------------------
+    def every(self, name, period_sec, fn, inline=True, start_delay=0.0):
+        """ period_sec 마다 fn() 실행. 첫 실행은 start_delay 후 """
+        if period_sec <= 0:
+            raise ValueError("period_sec 는 0보다 커야 합니다")
+        task = Task(self, name, fn, float(period_sec), inline=inline)
+        if not inline:
+            task._go = threading.Event()
+            task._runner = threading.Thread(target=task._runner_loop, name=f"{self.name}-{name}", daemon=True)
+            task._runner.start()
+        with self._cond:
+            self._tasks = [t for t in self._tasks if t.active] + [task]
+        self._push(task, time.monotonic() + start_delay)
+        return task
+
+    def call_later(self, delay_sec, fn, name="oneshot"):
+        """ delay_sec 후 스케줄러 스레드에서 fn() 1회 실행 """
+        task = Task(self, name, fn, None)
+        self._push(task, time.monotonic() + max(0.0, delay_sec))
+        return task
+
+    def _push(self, task, deadline):
+        task.deadline = deadline
+        with self._cond:
+            heapq.heappush(self._heap, (deadline, next(self._seq), task))
+            self._cond.notify()
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify()
+
+    # -------------------------------
+    # 실행
+    # -------------------------------
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._th = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._th.start()
+
+    def stop(self, timeout=2.0):
+        with self._cond:
+            self._running = False
+            tasks = list(self._tasks)
+            self._cond.notify_all()
+        for t in tasks:
+            t.cancel()
+        if self._th is not None:
+            self._th.join(timeout)
+
+    def is_alive(self):
+        return self._th is not None and self._th.is_alive()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    # 취소된 작업은 꺼내서 버림
+                    while self._heap and not self._heap[0][2].active:
+                        heapq.heappop(self._heap)
+                    if self._heap:
+                        wait = self._heap[0][0] - time.monotonic()
+                        if wait <= 0:
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+                if not self._running:
+                    return
+                deadline, _, task = heapq.heappop(self._heap)
+
+            if task.period_sec is None:
+                task._execute(deadline)
+                task.active = False
+                continue
+
+            if task.inline:
+                task._idle.clear()
+                task._execute(deadline)
+                task._idle.set()
+            elif task._idle.is_set():
+                task._idle.clear()
+                task._dispatched = deadline
+                task._go.set()
+            else:
+                task._note_overrun(1)   # 이전 실행이 아직 안 끝남 -> 이번 슬롯 건너뜀
+            if task.active:
+                self._push(task, self._next_deadline(task, deadline))
+
+    @staticmethod
+    def _next_deadline(task, deadline):
+        nxt = deadline + task.period_sec
+        now = time.monotonic()
+        if nxt <= now:
+            # 다음 마감을 넘김: 밀린 슬롯은 건너뛰고 now 이전의 가장 최근 슬롯을 바로 실행
+            missed = int((now - nxt) // task.period_sec)
+            task._note_overrun(missed)
+            nxt += missed * task.period_sec
+        return nxt
+
+    def stats(self):
+        with self._cond:
+            tasks = list(self._tasks)
+        return {t.name: t.stats() for t in tasks if t.active}
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler():
+    """ 프로세스 공용 스케줄러 (처음 호출 시 생성 후 시작) """
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Scheduler("periodic-scheduler")
+            _default.start()
+        return _default
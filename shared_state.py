@@ -1,239 +1,391 @@
 import threading
+import time
+from collections.abc import Mapping
+
+# 필드 이름 -> 초기값 (update() / snapshot() 에서 쓰는 키)
+FIELDS = {
+    # 기존 변수들
+    "danger_level": 0,
+    "boom_length": 0,
+    "boom_angle": 0,
+    "weight": 0,
+    "engine_speed": 0,
+    "wind_speed": 0,
+    "swing_angle": 0,
+
+    # --- 새로 추가된 변수들 ---
+    "specifications": 0,      # 제원(R)
+    "radius_main": 0,         # 반경1 MAIN
+    "radius_aux": 0,          # 반경2 AUX
+    "battery_voltage": 0,     # 축전지 전압
+    "engine_temp": 0,         # 엔진 온도
+    "oil_pressure": 0,        # 엔진 오일 압력
+    "hydraulic_oil_temp": 0,  # 작동유 온도
+    "main_height": 0,         # MAIN HEIGHT
+    "aux_height": 0,          # AUX HEIGHT
+    "rd_height": 0,           # 3RD HEIGHT (변수명 숫자 시작 불가로 rd_height 사용)
+    "status_1": 0,            # STATUS 1
+    "status_2": 0,            # STATUS 2
+    "lower_angle": 0,         # 하체 각도
+
+    "body_angle_x": 0,
+    "body_angle_y": 0,
+
+    # --- 객체 인식관련 변수 ---
+    "obj_count": 0,
+    "obj_distance": 0,
+
+    # 기기의 시리얼 넘버
+    "device_serial": "0000000000000000",
+}
+
+
+# 구독/대기에 쓰는 필드 묶음 이름
+FIELD_GROUPS = {
+    "alert": ("danger_level", "obj_count", "obj_distance"),   # 위험도 + 객체 인식 (즉시 전송 후보, 거리는 dead-band 적용)
+    "crane": ("boom_length", "boom_angle", "weight", "engine_speed", "wind_speed", "swing_angle",
+              "specifications", "radius_main", "radius_aux", "battery_voltage", "engine_temp",
+              "oil_pressure", "hydraulic_oil_temp", "main_height", "aux_height", "rd_height",
+              "status_1", "status_2", "lower_angle"),
+    "can": ("body_angle_x", "body_angle_y"),
+    "device": ("device_serial",),
+}
+
+
+def resolve_fields(fields):
+    """ None(전체) / 필드 이름 / 그룹 이름 / 그 목록 -> 필드 이름 tuple (None 은 그대로) """
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = (fields,)
+    out = []
+    for f in fields:
+        if f in FIELD_GROUPS:
+            out.extend(FIELD_GROUPS[f])
+        elif f in FIELDS:
+            out.append(f)
+        else:
+            raise KeyError(f"알 수 없는 SharedState 필드/그룹: {f}")
+    return tuple(dict.fromkeys(out))
+
+
+def _merge_changes(mapping, fields):
+    changes = dict(mapping) if mapping else {}
+    changes.update(fields)
+    unknown = [k for k in changes if k not in FIELDS]
+    if unknown:
+        raise KeyError(f"알 수 없는 SharedState 필드: {', '.join(unknown)}")
+    return changes
+
+
+class StateSnapshot(Mapping):
+    """
+    한 시점의 SharedState 값 (읽기 전용).
+    snap["boom_length"] 또는 snap.boom_length 로 읽는다.
+    version 은 값이 실제로 바뀐 update 마다 1씩 증가, ts 는 그 시각 (time.time()).
+    """
+    __slots__ = ("_data", "version", "ts")
+
+    def __init__(self, data, version, ts):
+        object.__setattr__(self, "_data", data)
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "ts", ts)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getattr__(self, name):
+        try:
+            return self._data[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("StateSnapshot 은 읽기 전용입니다")
+
+    def to_dict(self):
+        return dict(self._data)
+
+    def __repr__(self):
+        return f"StateSnapshot(version={self.version}, {self._data!r})"
+
 
 class SharedState:
+    """
+    워커들이 공유하는 크레인/객체 인식 상태.
+
+    값은 불변 StateSnapshot 하나에 들어 있고, 쓰기는 복사본을 만들어 참조를 교체한다
+    (copy-on-write). 읽기(snapshot(), get_*)는 현재 참조만 가져오므로 락을 잡지 않고,
+    한 번 가져온 스냅샷 안의 값은 항상 같은 update 묶음이다.
+
+        state.update({"boom_length": 12.3, "boom_angle": 45.0})   # 한 번에 갱신
+        snap = state.snapshot()                                  # 한 번에 읽기
+    """
+
+    # 다른 프로세스와 공유하는 구현이면 True (subscribe 콜백은 같은 프로세스의 update 에만 호출됨)
+    cross_process = False
+
     def __init__(self):
-        self._lock = threading.Lock()
-        
-        # 기존 변수들
-        self._danger_level = 0
-        self._boom_length = 0
-        self._boom_angle = 0
-        self._weight = 0
-        self._engine_speed = 0
-        self._wind_speed = 0
-        self._swing_angle = 0
-
-        # --- 새로 추가된 변수들 ---
-        self._specifications = 0      # 제원(R)
-        self._radius_main = 0         # 반경1 MAIN
-        self._radius_aux = 0          # 반경2 AUX
-        self._battery_voltage = 0     # 축전지 전압
-        self._engine_temp = 0         # 엔진 온도
-        self._oil_pressure = 0        # 엔진 오일 압력
-        self._hydraulic_oil_temp = 0  # 작동유 온도
-        self._main_height = 0         # MAIN HEIGHT
-        self._aux_height = 0          # AUX HEIGHT
-        self._rd_height = 0           # 3RD HEIGHT (변수명 숫자 시작 불가로 rd_height 사용)
-        self._status_1 = 0            # STATUS 1
-        self._status_2 = 0            # STATUS 2
-        self._lower_angle = 0         # 하체 각도
-
-        self._body_angle_x = 0
-        self._body_angle_y = 0
-                
-        # --- 객체 인식관련 변수 ---
-        self._obj_couint = 0
-        self._obj_distance = 0
-        
-        #기기의 시리얼 넘버
-        self._device_serial = "0000000000000000"
+        self._lock = threading.Lock()   # 쓰기끼리만 직렬화
+        self._cond = threading.Condition(self._lock)
+        self._snap = StateSnapshot(dict(FIELDS), 0, 0.0)
+        self._changed_at = dict.fromkeys(FIELDS, 0)   # 필드 -> 마지막으로 바뀐 version
+        self._wake_gen = 0
+        self._init_subscriptions()
+
+    def _init_subscriptions(self):
+        self._subs_lock = threading.Lock()
+        self._subs = {}   # token -> (callback, 필드 set 또는 None)
+        self._next_token = 0
+
+    # ==========================
+    # 일괄 갱신 / 스냅샷
+    # ==========================
+    def update(self, mapping=None, **fields):
+        """
+        여러 필드를 한 번에 갱신하고 현재 version 을 반환. 모르는 필드 이름은 KeyError.
+        값이 하나도 바뀌지 않았으면 version 을 올리지 않고 대기자/구독자도 깨우지 않는다.
+        """
+        changes = _merge_changes(mapping, fields)
+        with self._cond:
+            cur = self._snap
+            changed = [k for k, v in changes.items() if cur._data[k] != v]
+            if not changed:
+                return cur.version
+            data = dict(cur._data)
+            data.update(changes)
+            version = cur.version + 1
+            snap = StateSnapshot(data, version, time.time())
+            self._snap = snap
+            for k in changed:
+                self._changed_at[k] = version
+            self._cond.notify_all()
+        self._notify_subscribers(snap, changed)
+        return version
+
+    def snapshot(self):
+        """ 현재 값 전체 (불변). 참조 교체는 원자적이므로 락 없이 읽는다 """
+        return self._snap
+
+    @property
+    def version(self):
+        return self.snapshot().version
+
+    # ==========================
+    # 변경 알림
+    # ==========================
+    def last_changed(self, fields=None):
+        """ fields(필드/그룹, None 이면 전체) 중 하나라도 마지막으로 바뀐 version """
+        fields = resolve_fields(fields)
+        if fields is None:
+            return self.snapshot().version
+        return max(self._changed_at[f] for f in fields)
+
+    def changed_since(self, version, fields=None):
+        return self.last_changed(fields) > version
+
+    def wait_for_change(self, since_version, fields=None, timeout=None):
+        """
+        since_version 이후 fields 중 하나가 바뀌거나, timeout(초)이 지나거나, wake() 가 호출될
+        때까지 대기하고 그 시점의 스냅샷을 반환한다. 바뀌었는지는 changed_since() 로 확인.
+        """
+        fields = resolve_fields(fields)
+        with self._cond:
+            gen = self._wake_gen
+            self._cond.wait_for(lambda: self.last_changed(fields) > since_version or self._wake_gen != gen,
+                                timeout=timeout)
+            return self._snap
+
+    def wake(self):
+        """ wait_for_change() 로 대기 중인 스레드를 모두 깨움 (워커 종료 시) """
+        with self._cond:
+            self._wake_gen += 1
+            self._cond.notify_all()
+
+    def subscribe(self, callback, fields=None):
+        """
+        fields 중 하나가 바뀔 때마다 callback(snapshot, changed_fields) 호출 (update 한 스레드에서).
+        반환한 token 으로 unsubscribe. 콜백은 짧게 끝나야 한다.
+        """
+        fields = resolve_fields(fields)
+        with self._subs_lock:
+            self._next_token += 1
+            token = self._next_token
+            self._subs[token] = (callback, frozenset(fields) if fields is not None else None)
+        return token
+
+    def unsubscribe(self, token):
+        with self._subs_lock:
+            self._subs.pop(token, None)
+
+    def _notify_subscribers(self, snap, changed):
+        if not self._subs:
+            return
+        with self._subs_lock:
+            subs = list(self._subs.values())
+        for callback, fields in subs:
+            if fields is not None and fields.isdisjoint(changed):
+                continue
+            try:
+                callback(snap, changed)
+            except Exception as e:
+                print(f"[SharedState] [ERROR] 구독 콜백 예외: {e}")
+
     # ==========================
     # Setter 메소드
     # ==========================
     def set_danger_level(self, level):
-        with self._lock:
-            self._danger_level = level
-    
+        self.update(danger_level=level)
+
     def set_boom_length(self, boom_length):
-        with self._lock:
-            self._boom_length = boom_length
+        self.update(boom_length=boom_length)
 
     def set_boom_angle(self, boom_angle):
-        with self._lock:
-            self._boom_angle = boom_angle
-    
+        self.update(boom_angle=boom_angle)
+
     def set_weight(self, weight):
-        with self._lock:
-            self._weight = weight
+        self.update(weight=weight)
 
     def set_engine_speed(self, engine_speed):
-        with self._lock:
-            self._engine_speed = engine_speed
+        self.update(engine_speed=engine_speed)
 
     def set_wind_speed(self, wind_speed):
-        with self._lock:
-            self._wind_speed = wind_speed
-    
+        self.update(wind_speed=wind_speed)
+
     def set_swing_angle(self, swing_angle):
-        with self._lock:
-            self._swing_angle = swing_angle
+        self.update(swing_angle=swing_angle)
 
     # --- 추가된 Setter ---
     def set_specifications(self, specifications):
-        with self._lock:
-            self._specifications = specifications
+        self.update(specifications=specifications)
 
     def set_radius_main(self, radius):
-        with self._lock:
-            self._radius_main = radius
+        self.update(radius_main=radius)
 
     def set_radius_aux(self, radius):
-        with self._lock:
-            self._radius_aux = radius
+        self.update(radius_aux=radius)
 
     def set_battery_voltage(self, voltage):
-        with self._lock:
-            self._battery_voltage = voltage
+        self.update(battery_voltage=voltage)
 
     def set_engine_temp(self, temp):
-        with self._lock:
-            self._engine_temp = temp
+        self.update(engine_temp=temp)
 
     def set_oil_pressure(self, pressure):
-        with self._lock:
-            self._oil_pressure = pressure
+        self.update(oil_pressure=pressure)
 
     def set_hydraulic_oil_temp(self, temp):
-        with self._lock:
-            self._hydraulic_oil_temp = temp
+        self.update(hydraulic_oil_temp=temp)
 
     def set_main_height(self, height):
-        with self._lock:
-            self._main_height = height
+        self.update(main_height=height)
 
     def set_aux_height(self, height):
-        with self._lock:
-            self._aux_height = height
+        self.update(aux_height=height)
 
     def set_rd_height(self, height): # 3rd height
-        with self._lock:
-            self._rd_height = height
+        self.update(rd_height=height)
 
     def set_status_1(self, status):
-        with self._lock:
-            self._status_1 = status
+        self.update(status_1=status)
 
     def set_status_2(self, status):
-        with self._lock:
-            self._status_2 = status
+        self.update(status_2=status)
 
     def set_lower_angle(self, angle):
-        with self._lock:
-            self._lower_angle = angle
+        self.update(lower_angle=angle)
 
     def set_obj_info(self, count, distance):
-        with self._lock:
-            self._obj_couint = count
-            self._obj_distance = distance
+        self.update(obj_count=count, obj_distance=distance)
 
     def set_serial_info(self, device_serial):
-        with self._lock:
-            self._device_serial = device_serial            
+        self.update(device_serial=device_serial)
 
     def set_body_angle_x(self, _body_angle_x):
-        with self._lock:
-            self._body_angle_x = _body_angle_x
+        self.update(body_angle_x=_body_angle_x)
 
     def set_body_angle_y(self, _body_angle_y):
-        with self._lock:
-            self._body_angle_y = _body_angle_y
-            
+        self.update(body_angle_y=_body_angle_y)
+
     # ==========================
     # Getter 메소드
     # ==========================
     def get_danger_level(self):
-        with self._lock:
-            return self._danger_level
+        return self.snapshot()["danger_level"]
 
     def get_boom_length(self):
-        with self._lock:
-            return self._boom_length
+        return self.snapshot()["boom_length"]
 
     def get_boom_angle(self):
-        with self._lock:
-            return self._boom_angle
-    
+        return self.snapshot()["boom_angle"]
+
     def get_weight(self):
-        with self._lock:
-            return self._weight
- 
+        return self.snapshot()["weight"]
+
     def get_engine_speed(self):
-        with self._lock:
-            return self._engine_speed
+        return self.snapshot()["engine_speed"]
 
     def get_wind_speed(self):
-        with self._lock:
-            return self._wind_speed
-    
+        return self.snapshot()["wind_speed"]
+
     def get_swing_angle(self):
-        with self._lock:
-            return self._swing_angle
+        return self.snapshot()["swing_angle"]
 
     # --- 추가된 Getter ---
     def get_specifications(self):
-        with self._lock:
-            return self._specifications
+        return self.snapshot()["specifications"]
 
     def get_radius_main(self):
-        with self._lock:
-            return self._radius_main
+        return self.snapshot()["radius_main"]
 
     def get_radius_aux(self):
-        with self._lock:
-            return self._radius_aux
+        return self.snapshot()["radius_aux"]
 
     def get_battery_voltage(self):
-        with self._lock:
-            return self._battery_voltage
+        return self.snapshot()["battery_voltage"]
 
     def get_engine_temp(self):
-        with self._lock:
-            return self._engine_temp
+        return self.snapshot()["engine_temp"]
 
     def get_oil_pressure(self):
-        with self._lock:
-            return self._oil_pressure
+        return self.snapshot()["oil_pressure"]
 
     def get_hydraulic_oil_temp(self):
-        with self._lock:
-            return self._hydraulic_oil_temp
+        return self.snapshot()["hydraulic_oil_temp"]
 
     def get_main_height(self):
-        with self._lock:
-            return self._main_height
+        return self.snapshot()["main_height"]
 
     def get_aux_height(self):
-        with self._lock:
-            return self._aux_height
+        return self.snapshot()["aux_height"]
 
     def get_rd_height(self):
-        with self._lock:
-            return self._rd_height
+        return self.snapshot()["rd_height"]
 
     def get_status_1(self):
-        with self._lock:
-            return self._status_1
+        return self.snapshot()["status_1"]
 
     def get_status_2(self):
-        with self._lock:
-            return self._status_2
+        return self.snapshot()["status_2"]
 
     def get_lower_angle(self):
-        with self._lock:
-            return self._lower_angle
-            
+        return self.snapshot()["lower_angle"]
+
     def get_obj_info(self):
-        with self._lock:
-            return self._obj_couint, self._obj_distance       
+        snap = self.snapshot()
+        return snap["obj_count"], snap["obj_distance"]
 
     def get_serial_info(self):
-        with self._lock:
-            return self._device_serial        
+        return self.snapshot()["device_serial"]
 
     def get_body_angle_x(self):
-        with self._lock:
-            return self._body_angle_x         
+        return self.snapshot()["body_angle_x"]
 
     def get_body_angle_y(self):
-        with self._lock:
-            return self._body_angle_y       
\ No newline at end of file
+        return self.snapshot()["body_angle_y"]
@@ -0,0 +1,200 @@
+"""
+multiprocessing.shared_memory 기반 SharedState.
+
+SharedState 와 같은 update() / snapshot() / set_* / get_* 를 제공하므로 워커 코드는 그대로 두고
+AnalysisApp 과 텔레메트리 워커를 서로 다른 프로세스(= 다른 코어, 다른 GIL)에서 돌릴 수 있다.
+
+메모리 배치 (고정):
+    [seq u64][version u64][ts f64] [float 필드 f64 x N] [int 필드 i64 x M] [serial 길이 u64][serial 32B]
+    [필드별 마지막 변경 version i64 x (N+M+1)]
+
+쓰기는 프로세스 간 Lock 으로 직렬화하고 seqlock 으로 표시한다 (seq 홀수 = 쓰는 중).
+읽기는 락 없이 seq 확인 -> 값 복사 -> seq 재확인, 그 사이 바뀌었으면 다시 읽는다.
+wait_for_change() 는 프로세스 간 조건 변수가 없으므로 poll_sec 간격으로 변경 version 을 확인하고,
+subscribe() 콜백은 같은 프로세스에서 한 update 에 대해서만 호출된다.
+
+    state = SharedMemoryState()                       # 부모 프로세스에서 생성
+    ctx.Process(target=worker_main, args=(state,))    # 자식에는 인자로 넘김 (spawn 시 이름으로 재연결)
+"""
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from shared_state import FIELDS, SharedState, StateSnapshot, _merge_changes, resolve_fields
+
+# 정수로 보관하는 필드 (위험 단계/개수). 나머지 숫자 필드는 float64
+# 제원/STATUS 는 Modbus 에서 float 로 들어오므로 float 로 보관하고, 정수 변환은 패킷을 만들 때 한다
+# (SharedState 와 같은 값을 돌려주도록)
+INT_FIELDS = ("danger_level", "obj_count")
+STR_FIELDS = ("device_serial",)
+FLOAT_FIELDS = tuple(k for k in FIELDS if k not in INT_FIELDS and k not in STR_FIELDS)
+SERIAL_MAX = 32
+
+_HDR = 3 * 8
+_F_OFF = _HDR
+_I_OFF = _F_OFF + 8 * len(FLOAT_FIELDS)
+_S_OFF = _I_OFF + 8 * len(INT_FIELDS)
+_C_OFF = _S_OFF + 8 + SERIAL_MAX
+SIZE = _C_OFF + 8 * len(FIELDS)
+_FIELD_INDEX = {k: n for n, k in enumerate(FIELDS)}
+
+
+class SharedMemoryState(SharedState):
+    """
+    name 을 주면 기존 공유 메모리에 연결, 없으면 새로 만든다 (만든 쪽이 unlink 책임).
+    lock 은 쓰기 직렬화용 multiprocessing.Lock. 연결하는 쪽은 만든 쪽의 lock 을 받아야 하므로
+    보통은 객체 자체를 Process 인자로 넘긴다.
+    """
+
+    cross_process = True
+
+    def __init__(self, name=None, lock=None, poll_sec=0.005):
+        self._owner = name is None
+        if self._owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=SIZE)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._lock = lock if lock is not None else mp.get_context("spawn").Lock()
+        buf = self._shm.buf
+        self._seq = np.ndarray((2,), dtype=np.uint64, buffer=buf, offset=0)   # [seq, version]
+        self._ts = np.ndarray((1,), dtype=np.float64, buffer=buf, offset=16)
+        self._f = np.ndarray((len(FLOAT_FIELDS),), dtype=np.float64, buffer=buf, offset=_F_OFF)
+        self._i = np.ndarray((len(INT_FIELDS),), dtype=np.int64, buffer=buf, offset=_I_OFF)
+        self._slen = np.ndarray((1,), dtype=np.uint64, buffer=buf, offset=_S_OFF)
+        self._cv = np.ndarray((len(FIELDS),), dtype=np.int64, buffer=buf, offset=_C_OFF)
+        self._fidx = {k: n for n, k in enumerate(FLOAT_FIELDS)}
+        self._iidx = {k: n for n, k in enumerate(INT_FIELDS)}
+        self._cache = None   # (seq, StateSnapshot): 바뀌지 않았으면 같은 객체를 돌려줌
+        self.poll_sec = poll_sec
+        self._wake_gen = 0
+        self._init_subscriptions()
+        if self._owner:
+            self._i[:] = [FIELDS[k] for k in INT_FIELDS]
+            self._f[:] = [FIELDS[k] for k in FLOAT_FIELDS]
+            self._write_serial(FIELDS["device_serial"])
+            self._cv[:] = 0
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    # spawn 된 자식 프로세스로 넘길 때: 이름과 락만 보내고 자식에서 다시 연결
+    def __getstate__(self):
+        return {"name": self._shm.name, "lock": self._lock, "poll_sec": self.poll_sec}
+
+    def __setstate__(self, state):
+        self.__init__(name=state["name"], lock=state["lock"], poll_sec=state["poll_sec"])
+
+    # ==========================
+    # 일괄 갱신 / 스냅샷
+    # ==========================
+    def update(self, mapping=None, **fields):
+        changes = _merge_changes(mapping, fields)
+        with self._lock:
+            cur = self.snapshot()
+            changed = [k for k, v in changes.items() if cur[k] != _stored(k, v)]
+            if not changed:
+                return cur.version
+            seq = self._seq
+            seq[0] += 1               # 홀수: 쓰는 중
+            version = int(seq[1]) + 1
+            for k in changed:
+                v = changes[k]
+                if k in self._fidx:
+                    self._f[self._fidx[k]] = float(v)
+                elif k in self._iidx:
+                    self._i[self._iidx[k]] = int(v)
+                else:
+                    self._write_serial(v)
+                self._cv[_FIELD_INDEX[k]] = version
+            seq[1] = version
+            self._ts[0] = time.time()
+            seq[0] += 1               # 짝수: 완료
+        self._notify_subscribers(self.snapshot(), changed)
+        return version
+
+    def snapshot(self):
+        while True:
+            s1 = int(self._seq[0])
+            cache = self._cache
+            if cache is not None and cache[0] == s1:
+                return cache[1]
+            if s1 & 1:
+                time.sleep(0)         # 다른 프로세스가 쓰는 중
+                continue
+            version = int(self._seq[1])
+            ts = float(self._ts[0])
+            f = self._f.tolist()
+            i = self._i.tolist()
+            serial = self._read_serial()
+            if int(self._seq[0]) != s1:
+                continue              # 읽는 도중 바뀜 -> 다시
+            data = dict(zip(FLOAT_FIELDS, f))
+            data.update(zip(INT_FIELDS, i))
+            data["device_serial"] = serial
+            snap = StateSnapshot({k: data[k] for k in FIELDS}, version, ts)
+            self._cache = (s1, snap)
+            return snap
+
+    # ==========================
+    # 변경 알림 (폴링)
+    # ==========================
+    def last_changed(self, fields=None):
+        fields = resolve_fields(fields)
+        if fields is None:
+            return int(self._seq[1])
+        return max(int(self._cv[_FIELD_INDEX[f]]) for f in fields)
+
+    def wait_for_change(self, since_version, fields=None, timeout=None):
+        fields = resolve_fields(fields)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        gen = self._wake_gen
+        while self.last_changed(fields) <= since_version and self._wake_gen == gen:
+            if deadline is None:
+                time.sleep(self.poll_sec)
+                continue
+            remain = deadline - time.monotonic()
+            if remain <= 0:
+                break
+            time.sleep(min(self.poll_sec, remain))
+        return self.snapshot()
+
+    def wake(self):
+        self._wake_gen += 1
+
+    # ==========================
+    # 시리얼 (고정 길이 바이트)
+    # ==========================
+    def _write_serial(self, value):
+        raw = str(value).encode("utf-8")[:SERIAL_MAX]
+        self._shm.buf[_S_OFF + 8:_S_OFF + 8 + len(raw)] = raw
+        self._slen[0] = len(raw)
+
+    def _read_serial(self):
+        n = min(int(self._slen[0]), SERIAL_MAX)
+        return bytes(self._shm.buf[_S_OFF + 8:_S_OFF + 8 + n]).decode("utf-8", "replace")
+
+    # ==========================
+    # 정리
+    # ==========================
+    def close(self):
+        """ 이 프로세스의 매핑 해제 (numpy 뷰를 먼저 놓아야 close 가능) """
+        self._seq = self._ts = self._f = self._i = self._slen = self._cv = None
+        self._cache = None
+        self._shm.close()
+
+    def unlink(self):
+        """ 공유 메모리 삭제 (만든 프로세스에서 모든 사용이 끝난 뒤 호출) """
+        if self._owner:
+            self._shm.unlink()
+
+
+def _stored(field, value):
+    """ 공유 메모리에 저장될 때의 값 (변경 여부 비교용) """
+    if field in INT_FIELDS:
+        return int(value)
+    if field in STR_FIELDS:
+        return str(value).encode("utf-8")[:SERIAL_MAX].decode("utf-8", "replace")
+    return float(value)
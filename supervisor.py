@@ -0,0 +1,247 @@
+"""
+서브시스템(비전, 텔레메트리 워커, HTTP 등) 관리.
+
+각 서브시스템을 Unit 으로 등록하면 Supervisor 가 순서대로 기동하고, check_sec 마다 살아 있는지
+확인해서 죽은 유닛은 지수 백오프(backoff_base * 2^(연속 실패-1), 최대 backoff_max)로 재시작한다.
+stable_sec 이상 살아 있으면 연속 실패 횟수를 초기화한다.
+run() 은 종료 요청(Ctrl+C, SIGTERM, request_stop())이 올 때까지 Event 에서 블록되므로
+확인 주기 외에는 CPU 를 쓰지 않는다.
+
+    sup = Supervisor()
+    sup.add(ThreadUnit("uplink", lambda: transmit_Crane_Data_Worker(...)))
+    sup.add(ProcessUnit("telemetry", telemetry_main, args=(shared_state,)))
+    sup.run()
+"""
+import multiprocessing as mp
+import signal
+import threading
+import time
+
+
+class Unit:
+    """
+    관리 단위. start / stop / is_alive 콜백으로 구성한다.
+    is_alive 가 None 이면 항상 살아 있다고 보고 재시작하지 않는다.
+    """
+
+    def __init__(self, name, start, stop=None, is_alive=None, restart=True):
+        self.name = name
+        self._start = start
+        self._stop = stop
+        self._is_alive = is_alive
+        self.restart = restart
+
+    def start(self):
+        self._start()
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop()
+
+    def is_alive(self):
+        return True if self._is_alive is None else bool(self._is_alive())
+
+
+class ThreadUnit(Unit):
+    """
+    start() / stop() / join() 과 is_alive() 또는 _th 를 가진 워커 (koceti_worker, Update_Can_Data 등).
+    factory 는 워커 객체를 만드는 함수로, 재시작할 때마다 새 객체를 만든다.
+    """
+
+    def __init__(self, name, factory, stop_timeout=2.0, restart=True):
+        super().__init__(name, start=None, restart=restart)
+        self.factory = factory
+        self.stop_timeout = stop_timeout
+        self.worker = None
+
+    def start(self):
+        self.worker = self.factory()
+        self.worker.start()
+
+    def stop(self):
+        w = self.worker
+        if w is None:
+            return
+        w.stop()
+        if hasattr(w, "join"):
+            w.join(timeout=self.stop_timeout)
+
+    def is_alive(self):
+        if hasattr(self.worker, "is_alive"):
+            return self.worker.is_alive()   # 스케줄러에 등록된 주기 워커
+        th = getattr(self.worker, "_th", None)
+        return th is not None and th.is_alive()
+
+
+def _process_entry(target, stop_evt, args, kwargs):
+    # 자식은 부모가 종료를 알려줄 때까지 돌고, Ctrl+C 는 부모만 처리한다
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    target(stop_evt, *args, **kwargs)
+
+
+class ProcessUnit(Unit):
+    """
+    별도 프로세스(spawn)로 실행하는 유닛.
+    target(stop_evt, *args, **kwargs) 는 모듈 최상위 함수여야 하고, stop_evt 가 설정될 때까지 블록한다.
+    (프로세스 사이 상태 공유는 SharedMemoryState 사용)
+    """
+
+    def __init__(self, name, target, args=(), kwargs=None, stop_timeout=5.0, restart=True, ctx=None):
+        super().__init__(name, start=None, restart=restart)
+        self.target = target
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs or {})
+        self.stop_timeout = stop_timeout
+        self._ctx = ctx or mp.get_context("spawn")
+        self._stop_evt = None
+        self.proc = None
+
+    def start(self):
+        self._stop_evt = self._ctx.Event()
+        self.proc = self._ctx.Process(target=_process_entry, name=self.name,
+                                      args=(self.target, self._stop_evt, self.args, self.kwargs),
+                                      daemon=False)
+        self.proc.start()
+
+    def stop(self):
+        if self.proc is None:
+            return
+        self._stop_evt.set()
+        self.proc.join(timeout=self.stop_timeout)
+        if self.proc.is_alive():
+            print(f"[Supervisor] {self.name}: 제때 종료되지 않아 terminate")
+            self.proc.terminate()
+            self.proc.join(timeout=1.0)
+
+    def is_alive(self):
+        return self.proc is not None and self.proc.is_alive()
+
+    @property
+    def exitcode(self):
+        return self.proc.exitcode if self.proc is not None else None
+
+
+class _UnitState:
+    def __init__(self, unit):
+        self.unit = unit
+        self.running = False
+        self.started_at = 0.0
+        self.failures = 0          # 연속 실패 횟수
+        self.restarts = 0
+        self.restart_at = None     # 재시작 예정 시각 (monotonic)
+        self.last_error = None
+
+
+class Supervisor:
+    def __init__(self, units=(), check_sec=1.0, backoff_base=1.0, backoff_max=60.0, stable_sec=30.0):
+        self.check_sec = check_sec
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stable_sec = stable_sec
+        self._states = []
+        self._stop_evt = threading.Event()
+        for u in units:
+            self.add(u)
+
+    def add(self, unit):
+        self._states.append(_UnitState(unit))
+        return unit
+
+    def request_stop(self, *_):
+        """ 시그널 핸들러로도 사용 """
+        self._stop_evt.set()
+
+    # -------------------------------
+    # 기동 / 감시 / 종료
+    # -------------------------------
+    def start(self):
+        for st in self._states:
+            self._start_unit(st, time.monotonic())
+
+    def _start_unit(self, st, now):
+        st.restart_at = None
+        try:
+            st.unit.start()
+        except Exception as e:
+            st.last_error = str(e)
+            print(f"[Supervisor] [ERROR] {st.unit.name} 기동 실패: {e}")
+            self._schedule_restart(st, now)
+            return
+        st.running = True
+        st.started_at = now
+
+    def _schedule_restart(self, st, now):
+        st.running = False
+        st.failures += 1
+        if not st.unit.restart:
+            print(f"[Supervisor] {st.unit.name} 중지됨 (재시작 안 함)")
+            return
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (st.failures - 1)))
+        st.restart_at = now + delay
+        print(f"[Supervisor] {st.unit.name} 중지됨 -> {delay:.1f}초 후 재시작 (연속 실패 {st.failures})")
+
+    def check(self, now=None):
+        now = time.monotonic() if now is None else now
+        for st in self._states:
+            if st.running:
+                if st.unit.is_alive():
+                    if st.failures and now - st.started_at >= self.stable_sec:
+                        st.failures = 0
+                    continue
+                code = getattr(st.unit, "exitcode", None)
+                if code is not None:
+                    st.last_error = f"exitcode={code}"
+                try:
+                    st.unit.stop()   # 남은 자원 정리
+                except Exception as e:
+                    print(f"[Supervisor] {st.unit.name} 정리 중 예외: {e}")
+                self._schedule_restart(st, now)
+            elif st.restart_at is not None and now >= st.restart_at:
+                print(f"[Supervisor] {st.unit.name} 재시작")
+                st.restarts += 1
+                self._start_unit(st, now)
+
+    def stop(self):
+        """ 기동 역순으로 종료 """
+        for st in reversed(self._states):
+            st.restart_at = None
+            if not st.running:
+                continue
+            try:
+                st.unit.stop()
+            except Exception as e:
+                print(f"[Supervisor] {st.unit.name} 종료 중 예외: {e}")
+            st.running = False
+
+    def run(self, stop_event=None, install_signals=True):
+        """
+        모든 유닛을 기동하고 종료 요청까지 블록한다. 반환 전에 모든 유닛을 종료한다.
+        stop_event: 외부 종료 신호 (ProcessUnit 자식 안에서 부모의 Event 를 넘길 때)
+        """
+        if stop_event is not None:
+            self._stop_evt = stop_event
+        if install_signals and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.request_stop)
+        self.start()
+        try:
+            while not self._stop_evt.wait(self.check_sec):
+                self.check()
+        except KeyboardInterrupt:
+            print("\n[Supervisor] 종료 요청 수신.")
+        finally:
+            self.stop()
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            st.unit.name: {
+                "running": st.running,
+                "alive": st.unit.is_alive() if st.running else False,
+                "uptime_sec": round(now - st.started_at, 1) if st.running else None,
+                "restarts": st.restarts,
+                "failures": st.failures,
+                "next_restart_sec": round(st.restart_at - now, 1) if st.restart_at is not None else None,
+                "last_error": st.last_error,
+            }
+            for st in self._states
+        }
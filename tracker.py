@@ -0,0 +1,107 @@
+import numpy as np
+
+
+def iou_matrix(a, b):
+    """a: (N,4), b: (M,4) xyxy -> (N,M) IoU"""
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    if a.size == 0 or b.size == 0:
+        return np.zeros((a.shape[0], b.shape[0]), dtype=np.float64)
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+class BoxTracker:
+    """
+    검출 사이 프레임의 박스를 등속 모델로 이어주는 가벼운 트래커.
+
+    update() 는 검출 결과로 트랙을 갱신(IoU 그리디 매칭으로 속도 추정)하고,
+    predict() 는 검출 없이 한 프레임 앞으로 박스를 이동시키며 신뢰도를 감쇠시킨다.
+    검출기가 기준이므로 update() 에서 매칭되지 않은 트랙은 버린다.
+    """
+
+    def __init__(self, iou_match=0.3, velocity_alpha=0.6, conf_decay=0.92, frame_size=None):
+        self.iou_match = iou_match
+        self.velocity_alpha = velocity_alpha
+        self.conf_decay = conf_decay
+        self.frame_size = frame_size  # (W, H), 박스가 화면 밖으로 나가지 않도록
+
+        self.boxes = np.zeros((0, 4), dtype=np.float64)
+        self.velocity = np.zeros((0, 4), dtype=np.float64)
+        self.scores = np.zeros((0,), dtype=np.float64)
+        self._det_scores = np.zeros((0,), dtype=np.float64)   # 검출 시점 신뢰도 (감쇠 전)
+        self.clses = np.zeros((0,), dtype=np.int64)
+        # 마지막 검출 시점의 박스와 그 이후 지난 프레임 수 (속도 추정용)
+        self._anchor = np.zeros((0, 4), dtype=np.float64)
+        self._age = np.zeros((0,), dtype=np.int64)
+
+    def __len__(self):
+        return int(self.boxes.shape[0])
+
+    def reset(self):
+        self.__init__(self.iou_match, self.velocity_alpha, self.conf_decay, self.frame_size)
+
+    def min_score(self):
+        return float(self.scores.min()) if len(self) else 1.0
+
+    def needs_redetect(self, threshold):
+        """
+        검출 때는 threshold 이상이던 트랙의 신뢰도가 추적 중 감쇠로 threshold 아래로 떨어졌으면 True.
+        처음부터 threshold 아래로 검출된 트랙은 여기서 재검출을 강제하지 않는다 (매 프레임 검출 방지).
+        """
+        if not len(self):
+            return False
+        return bool(np.any((self.scores < threshold) & (self._det_scores >= threshold)))
+
+    def update(self, boxes, scores, clses):
+        new_boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        new_scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+        new_clses = np.asarray(clses, dtype=np.int64).reshape(-1)
+        n_new = new_boxes.shape[0]
+        new_vel = np.zeros((n_new, 4), dtype=np.float64)
+
+        if len(self) and n_new:
+            iou = iou_matrix(self.boxes, new_boxes)
+            # 그리디 매칭: IoU 큰 순서대로, 트랙/검출 각각 한 번만
+            order = np.argsort(iou, axis=None)[::-1]
+            used_t = np.zeros(len(self), dtype=bool)
+            used_d = np.zeros(n_new, dtype=bool)
+            for flat in order:
+                ti, di = divmod(int(flat), n_new)
+                if iou[ti, di] < self.iou_match:
+                    break
+                if used_t[ti] or used_d[di] or self.clses[ti] != new_clses[di]:
+                    continue
+                used_t[ti] = used_d[di] = True
+                # _age 는 검출 이후 predict() 횟수 -> 검출 사이 프레임 간격은 _age + 1
+                steps = int(self._age[ti]) + 1
+                measured = (new_boxes[di] - self._anchor[ti]) / steps
+                a = self.velocity_alpha
+                new_vel[di] = a * measured + (1.0 - a) * self.velocity[ti]
+
+        self.boxes = new_boxes.copy()
+        self.velocity = new_vel
+        self.scores = new_scores.copy()
+        self._det_scores = new_scores.copy()
+        self.clses = new_clses.copy()
+        self._anchor = new_boxes.copy()
+        self._age = np.zeros(n_new, dtype=np.int64)
+
+    def predict(self):
+        """검출 없이 한 프레임 진행. (boxes, scores, clses) 리스트로 반환"""
+        if len(self):
+            self.boxes = self.boxes + self.velocity
+            if self.frame_size is not None:
+                W, H = self.frame_size
+                self.boxes[:, [0, 2]] = np.clip(self.boxes[:, [0, 2]], 0, W - 1)
+                self.boxes[:, [1, 3]] = np.clip(self.boxes[:, [1, 3]], 0, H - 1)
+            self.scores = self.scores * self.conf_decay
+            self._age += 1
+        return self.boxes.tolist(), self.scores.tolist(), self.clses.tolist()
@@ -3,9 +3,14 @@ import time
 import struct
 import json
 import zlib  # CRC32 계산을 위한 zlib 모듈 임포트
+from metrics import REGISTRY, LoopMonitor
+from scheduler import default_scheduler
+from shared_state import resolve_fields
 
 class transmit_Crane_Data_Worker:
-    def __init__(self,shared_state, mqttclient, period_sec=1):
+    def __init__(self,shared_state, mqttclient, period_sec=1, heartbeat_sec=5.0,
+                 alert_fields="alert", alert_deadband=None, count_hold_sec=1.0, min_interval_sec=0.05,
+                 alert_poll_sec=0.02, scheduler=None):
         # 시리얼 넘버
         self.device_serial = ""
         # 인식된 객체 정보
@@ -38,128 +43,234 @@ class transmit_Crane_Data_Worker:
         self.boom_angle = 0.0 # 붐각도
         self.danger = 0 # 위험도
         self.period_sec = period_sec
-        self._stop = threading.Event()
-        self._th = None
+        self.heartbeat_sec = heartbeat_sec        # 변화가 없어도 이 간격으로는 전송
+        self.alert_fields = alert_fields          # 바뀌면 주기를 기다리지 않고 바로 전송
+        # 필드별 즉시 전송 기준: 마지막 전송값에서 이만큼 이상 움직였을 때만 (없으면 값이 바뀌면 바로)
+        # 최근접 거리는 depth 노이즈로 매 프레임 조금씩 바뀌므로 작은 변화는 주기 전송에 맡긴다
+        self.alert_deadband = {"obj_distance": 0.5} if alert_deadband is None else dict(alert_deadband)
+        # 객체 수는 0 -> N (새로 나타남) 만 바로 보내고, 그것도 직전에 이 시간 이상 비어 있었을 때만
+        # (검출 경계에서 0 <-> 1 이 매 프레임 깜빡여도 alert 가 프레임마다 나가지 않게)
+        self.count_hold_sec = count_hold_sec
+        self.min_interval_sec = min_interval_sec  # alert 전송 최소 간격
+        self.alert_poll_sec = alert_poll_sec      # 프로세스 간 공유(SharedMemoryState)일 때 alert 확인 간격
+        self.scheduler = scheduler or default_scheduler()   # 주기 실행 (drift 없는 마감 시각)
+        self._task = None
+        self._poll_task = None
+        self._sub = None
+        self._alert_lock = threading.Lock()
+        self._alert_pending = False
+        self._sent_version = -1
+        self._sent_snap = None
+        self._last_send = 0.0
+        self._count = 0              # 마지막으로 본 obj_count
+        self._empty_since = 0.0      # obj_count 가 0 이 된 시각 (monotonic)
+        self._empty_held = True      # 마지막 0 -> N 직전에 count_hold_sec 이상 비어 있었는지
 
         # MQTT 클라이언트와 같은 내부 객체는 여기서 생성합니다.
         self.mqtt = mqttclient
         self.shared_state =shared_state
+        self.loop_monitor = LoopMonitor("transmit")   # 이벤트 기반이라 목표 주기 없음 (전송 간격만 기록)
+        self._published = {r: REGISTRY.counter("va_transmit_publish_total", "텔레메트리 전송 수", {"reason": r})
+                            for r in ("alert", "periodic", "heartbeat")}
+        self._skipped = REGISTRY.counter("va_transmit_skipped_total", "바뀐 값이 없어 생략한 주기 수")
     
-    def _run(self):
-        try:
-            """
-            백그라운드 쓰레드에서 실행될 메인 로직.
-            기존 main() 함수의 while 루프가 여기에 들어옵니다.
-            """
-            print("[Worker] 데이터 시뮬레이터 쓰레드 시작.")
+    # -------------------------------
+    # 전송 판단
+    #  위험도가 바뀌거나, 객체가 새로 나타나거나 (0 -> N, 직전에 count_hold_sec 이상 비어 있었을 때만),
+    #  최근접 거리가 alert_deadband 이상 움직이면 주기를 기다리지 않고 바로 보낸다 (min_interval_sec 이내
+    #  연속 변화는 묶음). 객체 수의 나머지 변화 (N -> 0, N -> M, 깜빡임) 와 다른 값은 period_sec 마다
+    #  바뀐 것이 있을 때만 보낸다. 아무것도 안 바뀌어도 heartbeat_sec 마다 한 번은 보낸다.
+    # -------------------------------
+    def _on_period(self):
+        """ 스케줄러가 period_sec 마다 호출 """
+        snap = self.shared_state.snapshot()
+        if snap.version != self._sent_version:
+            self._send(snap, "periodic")
+        elif time.monotonic() - self._last_send >= self.heartbeat_sec:
+            self._send(snap, "heartbeat")
+        else:
+            self._skipped.inc()   # 바뀐 값이 없어 이번 주기는 생략
 
-            # 3. 주기 루프
-            while not self._stop.is_set():
-                start = time.time()
-                # CAN Data
-                self.body_angle_x = self.shared_state.get_body_angle_x()
-                self.body_angle_y = self.shared_state.get_body_angle_y()
-                
-                # 장치 의 ID        
-                self.device_serial = self.shared_state.get_serial_info()
-                
-                # AML Data
-                self.boom_length = self.shared_state.get_boom_length()
-                self.actual_load = self.shared_state.get_weight()
-                self.fluid_temp =  self.shared_state.get_hydraulic_oil_temp() #작동유 온도
-                
-                self.STATUS1 = 0#STATUS1
-                self.STATUS2 = 0#STATUS2
-                self.STATUS3 = 0#STATUS3(예비)
-                    
-                self.voltage = self.shared_state.get_battery_voltage() # 축전지 전압
-                self.MAIN_HEIGHT = self.shared_state.get_main_height()
-                self.spec = self.shared_state.get_specifications() #제원
-                self.engine_rpm = self.shared_state.get_engine_speed() # 엔진 RPM
-                self.AUX_HEIGHT = self.shared_state.get_aux_height() #AUX HEIGHT
-                self.wind = self.shared_state.get_wind_speed() #풍속/풍향
-                self.MAIN_radius1 = self.shared_state.get_radius_main() #반경1 MAIN
-                self.engine_temp = self.shared_state.get_engine_temp() #엔진 온도
-                self.RD_HEIGHT = self.shared_state.get_rd_height() #
-                self.turning_angle =self.shared_state.get_swing_angle() #선회각도/속도
-                self.turning_speed = 0
-                self.AUX_radius2 = self.shared_state.get_radius_aux()
-                self.oil_pressure = self.shared_state.get_oil_pressure() # 엔진오일 압력
-                self.body_angle = self.shared_state.get_lower_angle() # 하체 각도
-                self.boom_angle = self.shared_state.get_boom_angle()
-                self.danger = self.shared_state.get_danger_level()
-             
-                # 객체 인식정보
-                self.obj_couint, self.obj_distance = self.shared_state.get_obj_info()
-                
-                fmt = '<19f8i'
-                fixed_data = struct.pack(fmt,
-                    # --- [Float 영역 20개] ---
-                    float(self.boom_length), # self.boom_length
-                    float(self.actual_load),
-                    float(self.fluid_temp), # self.fluid_temp
-                    float(self.angle),
-                    float(self.voltage),
-                    float(self.MAIN_HEIGHT),
-                    float(self.engine_rpm), # self.engine_rpm
-                    float(self.AUX_HEIGHT),
-                    float(self.wind), # self.wind
-                    float(self.MAIN_radius1),
-                    float(self.engine_temp), # self.engine_temp
-                    float(self.RD_HEIGHT),
-                    float(self.turning_angle),
-                    float(self.turning_speed),
-                    float(self.AUX_radius2),
-                    float(self.oil_pressure),
-                    float(self.boom_angle), # self.boom_angle
-                    float(self.body_angle), # 하체 각도
-                    float(self.obj_distance),  # 추가된 거리 값
+    def _alert_due(self, snap):
+        """ 마지막 전송 이후 alert 필드가 즉시 전송할 만큼 바뀌었으면 True """
+        sent = self._sent_snap
+        if sent is None:
+            return True
+        for f in resolve_fields(self.alert_fields):
+            band = self.alert_deadband.get(f)
+            if f == "obj_count":
+                if sent[f] == 0 and snap[f] > 0 and self._empty_held:
+                    return True
+            elif band:
+                if abs(snap[f] - sent[f]) >= band:
+                    return True
+            elif snap[f] != sent[f]:
+                return True
+        return False
 
-                    # --- [Int 영역 5개] ---
-                    int(self.body_angle_x),
-                    int(self.body_angle_y),
-                    int(self.STATUS1),
-                    int(self.STATUS2),
-                    int(self.STATUS3),
-                    int(self.spec), # 정수 인지? 문자열 인지..???
-                    int(self.danger), # self.danger
-                    int(self.obj_couint) # 추가된 카운트 값 (오타 그대로 반영함)
-                )                
-                
-                serial_bytes = str(self.device_serial).encode('utf-8')
-                serial_pack = struct.pack('<I', len(serial_bytes)) + serial_bytes
-                payload_body = serial_pack + fixed_data
-                
-                crc_value = zlib.crc32(payload_body) & 0xffffffff
-                payload_with_crc = payload_body + struct.pack('<I', crc_value)
-                
-                total_len = len(payload_with_crc) + 4  # 헤더(4byte) 포함한 전체 길이
-                final_packet = struct.pack('<I', total_len) + payload_with_crc
-                
-                #print(f"[Worker] 시뮬레이터 데이터 생성 및 큐에 저장: {message}")
-                self.mqtt.Analysis_msg("Event/CraneTest/", final_packet)
+    def _track_count(self, snap):
+        """ obj_count 가 비어 있던 시간 기록 (0 -> N 즉시 전송 판단용) """
+        now = time.monotonic()
+        with self._alert_lock:
+            count = snap["obj_count"]
+            if count == 0 and self._count != 0:
+                self._empty_since = now
+            elif count != 0 and self._count == 0:
+                self._empty_held = now - self._empty_since >= self.count_hold_sec
+            self._count = count
 
-                # --- 3-3. 주기 맞추기 ---
-                elapsed = time.time() - start
-                remain = self.period_sec - elapsed
-                if remain > 0:
-                    end = time.time() + remain
-                    while not self._stop.is_set() and time.time() < end:
-                        time.sleep(0.1)
-        finally:
-            print("[Worker] 데이터 시뮬레이터 쓰레드 종료.")
+    def _on_alert(self, snap=None, changed=None):
+        """ alert 필드 변경 시 (update 한 스레드에서 호출): 전송은 스케줄러 스레드에서 """
+        if snap is not None:
+            self._track_count(snap)
+        if snap is not None and not self._alert_due(snap):
+            return   # 작은 거리 변화 등은 주기 전송에서
+        with self._alert_lock:
+            if self._alert_pending or not self._running():
+                return
+            self._alert_pending = True
+        delay = self._last_send + self.min_interval_sec - time.monotonic()
+        self.scheduler.call_later(delay, self._send_alert, name="transmit_alert")
 
-    # --- start, stop, join 메소드는 modbus_worker와 동일 ---
+    def _poll_alert(self):
+        # 다른 프로세스의 변경은 구독 콜백이 오지 않으므로 version 으로 확인
+        if self.shared_state.changed_since(self._sent_version, self.alert_fields):
+            self._on_alert(self.shared_state.snapshot())
+
+    def _send_alert(self):
+        with self._alert_lock:
+            self._alert_pending = False
+        if not self._running():
+            return
+        snap = self.shared_state.snapshot()
+        if self._alert_due(snap):
+            self._send(snap, "alert")
+
+    def _send(self, snap, reason):
+        self.loop_monitor.tick()
+        self._publish(snap)
+        self._published[reason].inc()
+        self._sent_version = snap.version
+        self._sent_snap = snap
+        self._last_send = time.monotonic()
+
+    def _publish(self, snap):
+        # CAN Data
+        self.body_angle_x = snap["body_angle_x"]
+        self.body_angle_y = snap["body_angle_y"]
+        
+        # 장치 의 ID        
+        self.device_serial = snap["device_serial"]
+        
+        # AML Data
+        self.boom_length = snap["boom_length"]
+        self.actual_load = snap["weight"]
+        self.fluid_temp =  snap["hydraulic_oil_temp"] #작동유 온도
+        
+        self.STATUS1 = 0#STATUS1
+        self.STATUS2 = 0#STATUS2
+        self.STATUS3 = 0#STATUS3(예비)
+            
+        self.voltage = snap["battery_voltage"] # 축전지 전압
+        self.MAIN_HEIGHT = snap["main_height"]
+        self.spec = snap["specifications"] #제원
+        self.engine_rpm = snap["engine_speed"] # 엔진 RPM
+        self.AUX_HEIGHT = snap["aux_height"] #AUX HEIGHT
+        self.wind = snap["wind_speed"] #풍속/풍향
+        self.MAIN_radius1 = snap["radius_main"] #반경1 MAIN
+        self.engine_temp = snap["engine_temp"] #엔진 온도
+        self.RD_HEIGHT = snap["rd_height"] #
+        self.turning_angle = snap["swing_angle"] #선회각도/속도
+        self.turning_speed = 0
+        self.AUX_radius2 = snap["radius_aux"]
+        self.oil_pressure = snap["oil_pressure"] # 엔진오일 압력
+        self.body_angle = snap["lower_angle"] # 하체 각도
+        self.boom_angle = snap["boom_angle"]
+        self.danger = snap["danger_level"]
+     
+        # 객체 인식정보
+        self.obj_couint, self.obj_distance = snap["obj_count"], snap["obj_distance"]
+        
+        fmt = '<19f8i'
+        fixed_data = struct.pack(fmt,
+            # --- [Float 영역 20개] ---
+            float(self.boom_length), # self.boom_length
+            float(self.actual_load),
+            float(self.fluid_temp), # self.fluid_temp
+            float(self.angle),
+            float(self.voltage),
+            float(self.MAIN_HEIGHT),
+            float(self.engine_rpm), # self.engine_rpm
+            float(self.AUX_HEIGHT),
+            float(self.wind), # self.wind
+            float(self.MAIN_radius1),
+            float(self.engine_temp), # self.engine_temp
+            float(self.RD_HEIGHT),
+            float(self.turning_angle),
+            float(self.turning_speed),
+            float(self.AUX_radius2),
+            float(self.oil_pressure),
+            float(self.boom_angle), # self.boom_angle
+            float(self.body_angle), # 하체 각도
+            float(self.obj_distance),  # 추가된 거리 값
+
+            # --- [Int 영역 5개] ---
+            int(self.body_angle_x),
+            int(self.body_angle_y),
+            int(self.STATUS1),
+            int(self.STATUS2),
+            int(self.STATUS3),
+            int(self.spec), # 정수 인지? 문자열 인지..???
+            int(self.danger), # self.danger
+            int(self.obj_couint) # 추가된 카운트 값 (오타 그대로 반영함)
+        )                
+        
+        serial_bytes = str(self.device_serial).encode('utf-8')
+        serial_pack = struct.pack('<I', len(serial_bytes)) + serial_bytes
+        payload_body = serial_pack + fixed_data
+        
+        crc_value = zlib.crc32(payload_body) & 0xffffffff
+        payload_with_crc = payload_body + struct.pack('<I', crc_value)
+        
+        total_len = len(payload_with_crc) + 4  # 헤더(4byte) 포함한 전체 길이
+        final_packet = struct.pack('<I', total_len) + payload_with_crc
+        
+        #print(f"[Worker] 시뮬레이터 데이터 생성 및 큐에 저장: {message}")
+        self.mqtt.Analysis_msg("Event/CraneTest/", final_packet)
+
+    # --- start, stop, join: 스케줄러에 주기 작업 등록/해제 ---
     def start(self, daemon=True):
-        if self._th and self._th.is_alive():
+        if self.is_alive():
             return
-        self._stop.clear()
-        self._th = threading.Thread(target=self._run, daemon=daemon)
-        self._th.start()
+        print("[Worker] 데이터 시뮬레이터 쓰레드 시작.")
+        self._sent_version = -1
+        self._sent_snap = None
+        self._last_send = 0.0
+        self._alert_pending = False
+        self._count, self._empty_since, self._empty_held = 0, 0.0, True
+        self._task = self.scheduler.every("transmit", self.period_sec, self._on_period)
+        self._sub = self.shared_state.subscribe(self._on_alert, self.alert_fields)
+        if self.shared_state.cross_process:
+            self._poll_task = self.scheduler.every("transmit_alert_poll", self.alert_poll_sec, self._poll_alert)
+        self.scheduler.start()
+
+    def _running(self):
+        return self._task is not None and self._task.active
+
+    def is_alive(self):
+        # 예외가 계속되거나 멈추면 False -> supervisor 가 워커를 새로 만든다
+        return self._running() and self._task.is_healthy() and self.scheduler.is_alive()
 
     def stop(self):
-        self._stop.set()
+        if not self._running():
+            return
+        self._task.cancel()
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+        self.shared_state.unsubscribe(self._sub)
+        print("[Worker] 데이터 시뮬레이터 쓰레드 종료.")
 
     def join(self, timeout=None):
-        if self._th:
-            self._th.join(timeout)
\ No newline at end of file
+        if self._task is not None:
+            self._task.wait_idle(timeout)